@@ -0,0 +1,262 @@
+import argparse
+import math
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from CrashBatch import CAP, batch_chunks
+from FairRNG import FairRandom, server_seed_from_int
+from GameMath import MODES, VARIANTS, calculate_fireproof_cost, compile_mode
+from Instrument import count as count_metric
+from ShardRunner import split_rounds
+from StreamStats import add_round, merge_stats, new_stats, stats_from_payouts, summarize
+
+MIN_HITS = 30  # Hits a mode needs before its normal intervals are trusted to stop it
+
+
+def interval_widths(s, z=1.96):
+    """Full widths, in percentage points, of the normal confidence intervals on a mode's RTP and hit rate."""
+    n = s["rounds"]
+    if n < 2:
+        return math.inf, math.inf
+    bet = s["total_spent"] / n
+    sd = math.sqrt(s["m2"] / (n - 1))
+    hit_rate = s["hits"] / n
+    return 2 * z * sd / bet * 100 / math.sqrt(n), 2 * z * math.sqrt(hit_rate * (1 - hit_rate) / n) * 100
+
+
+def rounds_needed(s, rtp_width, hit_width=None, z=1.96, min_hits=MIN_HITS):
+    """
+    Rounds the mode needs in total for both intervals to reach their targets,
+    assuming widths shrink as 1 / sqrt(rounds). Until the mode has min_hits
+    hits and some spread in its payouts its intervals say nothing (a run of
+    misses has width 0), so it needs at least twice the rounds it has.
+    """
+    if s["hits"] < min_hits or s["rounds"] < 2 or s["m2"] <= 0:
+        return max(2 * s["rounds"], s["rounds"] + 1)
+    widths = interval_widths(s, z)
+    ratios = [widths[0] / rtp_width]
+    if hit_width is not None:
+        ratios.append(widths[1] / hit_width)
+    return math.ceil(s["rounds"] * max(ratios) ** 2)
+
+
+def allocate(needs, batch):
+    """Split `batch` rounds over the modes in proportion to the rounds each still needs (largest remainders)."""
+    total = sum(needs.values())
+    if total <= 0:
+        return {mode: 0 for mode in needs}
+    exact = {mode: batch * need / total for mode, need in needs.items()}
+    shares = {mode: int(x) for mode, x in exact.items()}
+    for mode in sorted(exact, key=lambda m: shares[m] - exact[m])[:batch - sum(shares.values())]:
+        shares[mode] += 1
+    return shares
+
+
+def play_scalar(variant, rtp, base_bet, mode, first, count, server_seed, metered=False):
+    """
+    Rounds first .. first + count - 1 of a mode, one at a time. The k-th
+    round of mode m is FairRNG round k * len(MODES) + m, so every round can be
+    recomputed however the runner happened to allocate its batches.
+    Returns (accumulator, counters); metered counts the 0.1 steps climbed and
+    the RNG draws.
+    """
+    compiled = compile_mode(VARIANTS[variant][mode], rtp)
+    mode_index = MODES.index(mode)
+    rng = FairRandom(server_seed)
+    s = new_stats()
+    steps = draws = 0
+    for k in range(first, first + count):
+        rng.set_round(k * len(MODES) + mode_index)
+        bet, payout, hit, max_win, crash_point, cashout = compiled.play(base_bet, rng)[:6]
+        add_round(s, bet, payout, hit, max_win)
+        if metered:
+            steps += compiled.grid.index(min(cashout, crash_point))
+            draws += rng.draws()
+    return s, Counter(steps=steps, rng_draws=draws) if metered else Counter()
+
+
+def play_batch(variant, rtp, base_bet, mode, count, rng, metered=False):
+    """
+    count rounds of a mode from its vectorized path; returns (accumulator,
+    counters) as play_scalar does, the draws being the values requested
+    from rng (cashout, crash point and meta count per round, then each meta).
+    """
+    config = VARIANTS[variant][mode]
+    compiled = compile_mode(config, rtp)
+    rounds = compiled.play_batch(base_bet, count, rng)
+    counters = Counter()
+    if metered:
+        counters["steps"] = int(compiled.grid.indexes(np.minimum(rounds["cashout"], rounds["crash_point"])).sum())
+        counters["rng_draws"] = (3 if config["meta_prob"] else 2) * count + int(rounds["counts"].sum())
+    return stats_from_payouts(rounds["payout"], rounds["bet"], base_bet * config["cap"]), counters
+
+
+def play_crash(rtp, bet, count, rng, metered=False):
+    """
+    count GameStats.py cycles from CrashBatch's chunks; returns (accumulator,
+    counters) as play_batch does. A cycle's stake includes its fireproof cost.
+    """
+    fireproof_cost = calculate_fireproof_cost(bet, 1.0, rtp)  # The same for every M_f
+    s = new_stats()
+    for payouts, _, fireproofs in batch_chunks(rtp, count, bet, rng=rng):
+        chunk = stats_from_payouts(payouts, bet, CAP * bet)
+        chunk["total_spent"] += fireproofs * fireproof_cost
+        s = merge_stats(s, chunk)
+    return s, Counter(rng_draws=7 * count) if metered else Counter()
+
+
+def interval_status(s, converged, z=1.96):
+    """An accumulator's RTP and hit-rate confidence intervals and whether it met its targets."""
+    r = summarize(s)
+    rtp_w, hit_w = interval_widths(s, z)
+    return {"rtp_ci": (r["rtp"] - rtp_w / 2, r["rtp"] + rtp_w / 2),
+            "hit_rate_ci": (r["hit_rate"] - hit_w / 2, r["hit_rate"] + hit_w / 2), "converged": converged}
+
+
+def run_adaptive(variant, rtp, base_bet, rtp_width, hit_width=None, max_rounds=100_000_000, batch=200_000,
+                 pilot=20_000, engine="batch", seed=None, workers=1, z=1.96, progress=None, metrics=None,
+                 min_hits=MIN_HITS):
+    """
+    Simulate until every mode's RTP (and, with hit_width, hit-rate) confidence
+    interval is at most the target width in percentage points, or max_rounds
+    rounds have been played in total.
+
+    Each mode first plays `pilot` rounds (an equal share of max_rounds if
+    that is smaller). After that every batch is shared
+    among the modes still short of their targets in proportion to the rounds
+    each is estimated to still need, so the widest intervals get the most
+    rounds, and a mode stops as soon as it meets its targets (with at least
+    min_hits hits, see rounds_needed). The scalar
+    engine plays FairRNG rounds one at a time (split over `workers`
+    processes); the batch engine draws from NumPy, one generator per mode.
+    progress(summary, needs) is called after every batch. With metrics
+    (Instrument.new_metrics), the rounds, steps and RNG draws are counted.
+
+    Returns ({mode: accumulator}, {mode: status}); the per-mode shares are
+    the runner's, not the game's, so there is no overall row.
+    """
+    if max_rounds < 2 * len(MODES):
+        raise ValueError(f"max_rounds must allow at least 2 rounds per mode ({2 * len(MODES)})")
+    if seed is None:
+        seed = int(np.random.SeedSequence().entropy)
+    server_seed = server_seed_from_int(seed)
+    rngs = {mode: np.random.default_rng([seed, i]) for i, mode in enumerate(MODES)}
+    summary = {mode: new_stats() for mode in MODES}
+    shares = dict(zip(MODES, split_rounds(min(pilot * len(MODES), max_rounds), len(MODES))))
+    played = 0
+    metered = metrics is not None
+    pool = ProcessPoolExecutor(max_workers=workers) if engine == "scalar" and workers > 1 else None
+    try:
+        while True:
+            if engine == "batch":
+                results = [(mode, *play_batch(variant, rtp, base_bet, mode, count, rngs[mode], metered))
+                           for mode, count in shares.items() if count]
+            else:
+                jobs = []
+                for mode, count in shares.items():
+                    first = summary[mode]["rounds"]
+                    for size in split_rounds(count, workers):
+                        if size:
+                            jobs.append((mode, first, size))
+                            first += size
+                args = [(variant, rtp, base_bet, mode, first, size, server_seed, metered)
+                        for mode, first, size in jobs]
+                stats = pool.map(play_scalar, *zip(*args)) if pool else [play_scalar(*a) for a in args]
+                results = [(job[0], *played_job) for job, played_job in zip(jobs, stats)]
+            for mode, s, counters in results:  # In job order, so the merge is reproducible
+                summary[mode] = merge_stats(summary[mode], s)
+                played += s["rounds"]
+                count_metric(metrics, "rounds", s["rounds"])
+                for name, n in counters.items():
+                    count_metric(metrics, name, n)
+
+            needs = {mode: max(rounds_needed(s, rtp_width, hit_width, z, min_hits) - s["rounds"], 0)
+                     for mode, s in summary.items()}
+            if progress is not None:
+                progress(summary, needs)
+            if not any(needs.values()) or played >= max_rounds:
+                break
+            shares = allocate(needs, min(batch, max_rounds - played))
+            # A mode close to its target may need fewer rounds than its share
+            shares = {mode: min(count, needs[mode]) for mode, count in shares.items()}
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    return summary, {mode: interval_status(summary[mode], needs[mode] == 0, z) for mode in MODES}
+
+
+def run_adaptive_crash(rtp, bet, rtp_width, hit_width=None, max_rounds=100_000_000, batch=1_000_000, pilot=100_000,
+                       seed=None, z=1.96, progress=None, metrics=None, min_hits=MIN_HITS):
+    """
+    run_adaptive for Bathyscaphe Depths (GameStats.py's random cycles): plays
+    CrashBatch chunks from one NumPy generator, `pilot` cycles and then
+    batches of up to `batch`, until the cycles' RTP (and hit-rate) interval
+    meets its target or max_rounds cycles have been played. The RTP interval
+    treats the mean stake (bet plus fireproof costs) as fixed.
+
+    Returns ({"Overall": accumulator}, {"Overall": status}) in run_adaptive's
+    shapes, and calls progress with them after every batch.
+    """
+    if seed is None:
+        seed = int(np.random.SeedSequence().entropy)
+    rng = np.random.default_rng(seed)
+    s = new_stats()
+    share = min(pilot, max_rounds)
+    while True:
+        played, counters = play_crash(rtp, bet, share, rng, metrics is not None)
+        s = merge_stats(s, played)
+        count_metric(metrics, "rounds", share)
+        for name, n in counters.items():
+            count_metric(metrics, name, n)
+        need = max(rounds_needed(s, rtp_width, hit_width, z, min_hits) - s["rounds"], 0)
+        if progress is not None:
+            progress({"Overall": s}, {"Overall": need})
+        if not need or s["rounds"] >= max_rounds:
+            break
+        share = min(need, batch, max_rounds - s["rounds"])
+    return {"Overall": s}, {"Overall": interval_status(s, need == 0, z)}
+
+
+def print_progress(summary, needs, z=1.96):
+    widths = [f"{group} {s['rounds']:,} rounds, RTP ±{interval_widths(s, z)[0] / 2:.3f}"
+              + ("" if needs[group] else " (done)") for group, s in summary.items()]
+    print("; ".join(widths), flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate each mode until its RTP and hit-rate intervals are narrow.")
+    parser.add_argument("--game", choices=["knight", "crash"], default="knight",
+                        help="Knight's Ascent modes, or Bathyscaphe Depths cycles (GameStats.py)")
+    parser.add_argument("--variant", choices=list(VARIANTS), default="KnightStats")
+    parser.add_argument("--rtp", type=float, help="target RTP (95 for knight, 97 for crash)")
+    parser.add_argument("--bet", type=float, default=1.0)
+    parser.add_argument("--rtp-width", type=float, default=1.0, help="target RTP CI width (percentage points)")
+    parser.add_argument("--hit-width", type=float, help="target hit-rate CI width (percentage points)")
+    parser.add_argument("--max-rounds", type=int, default=100_000_000)
+    parser.add_argument("--batch", type=int, help="rounds per batch (200,000 for knight, 1,000,000 for crash)")
+    parser.add_argument("--engine", choices=["batch", "scalar"], default="batch", help="knight only")
+    parser.add_argument("--workers", type=int, default=1, help="knight only")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.game == "crash":
+        summary, status = run_adaptive_crash(args.rtp or 97.0, args.bet, args.rtp_width, args.hit_width,
+                                             args.max_rounds, args.batch or 1_000_000, seed=args.seed,
+                                             progress=print_progress)
+    else:
+        summary, status = run_adaptive(args.variant, args.rtp or 95.0, args.bet, args.rtp_width, args.hit_width,
+                                       args.max_rounds, args.batch or 200_000, engine=args.engine, seed=args.seed,
+                                       workers=args.workers, progress=print_progress)
+    for group in summary:
+        s = summarize(summary[group])
+        st = status[group]
+        print(f"{group}: {s['rounds']:,} rounds, RTP {s['rtp']:.2f}% [{st['rtp_ci'][0]:.2f}, {st['rtp_ci'][1]:.2f}], "
+              f"hit rate {s['hit_rate']:.3f}% [{st['hit_rate_ci'][0]:.3f}, {st['hit_rate_ci'][1]:.3f}]"
+              + ("" if st["converged"] else " (round budget reached)"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+import argparse
+import asyncio
+import heapq
+import random
+import time
+
+from AscentRound import cashout_win, climb
+from CrashRound import step_grid
+from FairRNG import FairRandom, new_server_seed, seed_commitment
+from GameMath import ASCENT, MODES, STEP, generate_crash_point
+
+STEPS_PER_SECOND = 10  # The game's 0.1x every 0.1 s
+
+
+class Climb:
+    """
+    One knight's climb on an AscentEngine.
+
+    The crash point (and so the step the tower collapses on) is drawn when the
+    climb starts; the steps themselves, with their meta-multiplier draws, are
+    only played when someone needs them: a watcher (on_step), a cashout or the
+    collapse. Draws come from the climb's own FairRNG round, in the same order
+    as Knight's Ascent Game.py, so a journal replay gives the same round.
+    """
+
+    def __init__(self, engine, round_index, mode, base_bet, cashout_at=None, on_step=None):
+        self.engine = engine
+        self.round_index = round_index
+        self.mode = mode
+        self.base_bet = base_bet
+        self.bet = base_bet * ASCENT[mode]["bet_multiplier"]
+        self.on_step = on_step
+        rng = FairRandom(engine.server_seed, round_index)
+        self.crash_point = generate_crash_point(engine.rtp, rng, ASCENT[mode])
+        self.crash_step = step_grid(STEP).index(self.crash_point)
+        self.cashout_step = step_grid(STEP).index(cashout_at) if cashout_at is not None else None
+        self.meta_multipliers = list(ASCENT[mode]["initial_metas"])
+        self.steps = []  # (multiplier, new_meta) of every step played so far
+        self._climb = climb(self.crash_point, mode, rng)
+        self.start = engine.clock()
+        self.result = None
+        self.done = asyncio.get_running_loop().create_future()
+
+    def step_time(self, step_num):
+        """Clock time at which step step_num is reached."""
+        return self.start + step_num * self.engine.step_seconds
+
+    def current_step(self, now):
+        return int((now - self.start) / self.engine.step_seconds) if self.engine.step_seconds else 0
+
+    def play_to(self, step_num):
+        """Play the steps up to and including step_num (never past the collapse)."""
+        while len(self.steps) <= min(step_num, self.crash_step):
+            multiplier, new_meta, _ = next(self._climb)
+            if new_meta is not None:
+                self.meta_multipliers.append(new_meta)
+            self.steps.append((multiplier, new_meta))
+            if self.on_step is not None:
+                self.on_step(self, multiplier, new_meta)
+
+    def finish(self, step_num):
+        """Cash out at step_num, or collapse if that is the crash step."""
+        if self.result is not None:
+            return
+        self.play_to(step_num)
+        multiplier = self.steps[step_num][0]
+        if step_num < self.crash_step:
+            total_win, total_meta = cashout_win(self.mode, self.bet, multiplier, self.meta_multipliers)
+        else:
+            step_num, total_win, total_meta = -1, 0, None
+        self.result = {
+            "round_index": self.round_index, "mode": self.mode, "bet": self.bet,
+            "base_bet": self.base_bet, "crash_point": self.crash_point, "multiplier": multiplier,
+            "cashout_step": step_num, "meta_multipliers": self.meta_multipliers,
+            "total_meta": total_meta, "total_win": total_win,
+        }
+        self.engine.finished(self)
+        self.done.set_result(self.result)
+
+
+class AscentEngine:
+    """
+    Many concurrent Knight's Ascent climbs on one event loop.
+
+    Each climb advances one 0.1 step every 1 / (STEPS_PER_SECOND * speed)
+    seconds of the monotonic clock; speed > 1 accelerates every climb and
+    speed=0 ends each climb as soon as its outcome is known (instant mode, for
+    bots and tests). Collapses and auto-cashouts sit in one heap keyed by the
+    clock time they fall due, so a tick only touches climbs whose outcome is
+    due plus the climbs somebody is watching step by step, and it stops
+    settling after tick_budget seconds of CPU; anything left over waits for
+    the next tick but is still settled at its scheduled step. Cashout
+    commands are settled at the step showing when they arrive.
+    """
+
+    def __init__(self, rtp=97.0, speed=1.0, tick_seconds=0.02, tick_budget=0.01, server_seed=None,
+                 clock=time.monotonic):
+        self.rtp = rtp
+        self.speed = speed
+        self.step_seconds = 1 / (STEPS_PER_SECOND * speed) if speed else 0
+        self.tick_seconds = tick_seconds
+        self.tick_budget = tick_budget
+        self.server_seed = server_seed if server_seed is not None else new_server_seed()
+        self.clock = clock
+        self.next_round = 0
+        self.climbs = {}
+        self.watched = set()
+        self._heap = []  # (due time, round index, step)
+        self._wakeup = None
+        self.tick_times = []
+
+    @property
+    def commitment(self):
+        return seed_commitment(self.server_seed)
+
+    def start_climb(self, mode, base_bet, cashout_at=None, on_step=None):
+        """
+        Start a climb (its own FairRNG round) and return it; await climb.done
+        for the result. cashout_at is an optional auto-cashout multiplier and
+        on_step(climb, multiplier, new_meta) is called for every step as it is
+        reached.
+        """
+        climb_ = Climb(self, self.next_round, mode, base_bet, cashout_at, on_step)
+        self.next_round += 1
+        self.climbs[climb_.round_index] = climb_
+        end = climb_.crash_step
+        if climb_.cashout_step is not None:
+            end = min(end, climb_.cashout_step)
+        if not self.step_seconds:
+            climb_.finish(end)
+            return climb_
+        heapq.heappush(self._heap, (climb_.step_time(end), climb_.round_index, end))
+        if on_step is not None:
+            self.watched.add(climb_.round_index)
+            climb_.play_to(0)
+        if self._wakeup is not None and not self._wakeup.done():
+            self._wakeup.set_result(None)
+        return climb_
+
+    def cashout(self, climb_, now=None):
+        """Cash out at the step showing now (too late once the tower has collapsed)."""
+        if climb_.result is None:
+            climb_.finish(min(climb_.current_step(self.clock() if now is None else now), climb_.crash_step))
+        return climb_.result
+
+    def finished(self, climb_):
+        del self.climbs[climb_.round_index]
+        self.watched.discard(climb_.round_index)
+
+    def tick(self, now=None):
+        """Settle due climbs (within tick_budget) and step the watched ones."""
+        now = self.clock() if now is None else now
+        began = time.perf_counter()
+        deadline = began + self.tick_budget
+        heap = self._heap
+        settled = 0
+        while heap and heap[0][0] <= now and (not settled or time.perf_counter() < deadline):
+            _, round_index, step_num = heapq.heappop(heap)
+            climb_ = self.climbs.get(round_index)
+            if climb_ is not None:  # Otherwise cashed out by command already
+                climb_.finish(step_num)
+                settled += 1
+        for round_index in list(self.watched):
+            climb_ = self.climbs[round_index]
+            climb_.play_to(climb_.current_step(now))
+        self.tick_times.append(time.perf_counter() - began)
+        return settled
+
+    async def run(self, until_idle=False):
+        """Tick every tick_seconds; with until_idle, return once no climbs are left."""
+        loop = asyncio.get_running_loop()
+        while True:
+            self.tick()
+            if not self.climbs:
+                if until_idle:
+                    return
+                self._wakeup = loop.create_future()
+                await self._wakeup  # Sleep until the next climb starts
+                continue
+            await asyncio.sleep(self.tick_seconds)
+
+
+def random_mode_bet(rng):
+    """A bot's round: random mode and an auto-cashout target between 1.1x and 10x."""
+    return rng.choice(MODES), round(rng.uniform(1.1, 10.0), 1)
+
+
+async def run_bots(climbs, speed, concurrency, seed=0, rtp=97.0):
+    """Play `climbs` bot rounds, keeping `concurrency` climbs going at once."""
+    engine = AscentEngine(rtp, speed)
+    rng = random.Random(seed)
+    runner = asyncio.create_task(engine.run())
+    results = []
+
+    async def bot(count):
+        for _ in range(count):
+            mode, target = random_mode_bet(rng)
+            results.append(await engine.start_climb(mode, 1.0, cashout_at=target).done)
+
+    began = time.perf_counter()
+    shares = [climbs // concurrency + (1 if i < climbs % concurrency else 0) for i in range(concurrency)]
+    await asyncio.gather(*(bot(n) for n in shares))
+    elapsed = time.perf_counter() - began
+    runner.cancel()
+    return engine, results, elapsed
+
+
+def check_replays(engine, results, count=200):
+    """Replay results with AscentRound exactly as RoundJournal does; count the mismatches."""
+    mismatches = 0
+    for result in results[:count]:
+        rng = FairRandom(engine.server_seed, result["round_index"])
+        crash_point = generate_crash_point(engine.rtp, rng, ASCENT[result["mode"]])
+        metas = list(ASCENT[result["mode"]]["initial_metas"])
+        win = 0
+        for step_num, (multiplier, new_meta, _) in enumerate(climb(crash_point, result["mode"], rng)):
+            if new_meta is not None:
+                metas.append(new_meta)
+            if step_num == result["cashout_step"]:
+                win = cashout_win(result["mode"], result["bet"], multiplier, metas)[0]
+                break
+        mismatches += win != result["total_win"]
+    return mismatches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run bot climbs on the Knight's Ascent engine.")
+    parser.add_argument("--climbs", type=int, default=10000)
+    parser.add_argument("--concurrency", type=int, default=1000)
+    parser.add_argument("--speed", type=float, default=0, help="1 real time, >1 accelerated, 0 instant")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    engine, results, elapsed = asyncio.run(run_bots(args.climbs, args.speed, args.concurrency, args.seed))
+    ticks = sorted(engine.tick_times)
+    print(f"{len(results)} climbs, {args.concurrency} at a time, speed {args.speed or 'instant'}: "
+          f"{elapsed:.2f} s ({len(results) / elapsed:,.0f} climbs/s)")
+    for mode in MODES:
+        played = [r for r in results if r["mode"] == mode]
+        if played:
+            rtp = sum(r["total_win"] for r in played) / sum(r["bet"] for r in played) * 100
+            print(f"  {mode}: {len(played)} climbs, RTP {rtp:.2f}%")
+    if ticks:
+        print(f"{len(ticks)} ticks: median {ticks[len(ticks) // 2] * 1e6:.0f} us, max {ticks[-1] * 1e3:.2f} ms")
+    print(f"Replay mismatches: {check_replays(engine, results)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+import random
+
+from GameMath import ASCENT, STEP, combine_meta_multipliers, generate_meta_multiplier
+
+
+def climb(crash_point, mode, rng=random):
+    """
+    The knight's climb, one 0.1 step at a time.
+    Yields (multiplier, new_meta or None, crashed) for each step; the caller
+    decides whether to cash out before asking for the next one. The meta draw
+    happens before the crash check, as in the game.
+    """
+    config = ASCENT[mode]
+    meta_prob = config["meta_prob"]
+    multiplier = 1.0
+    while True:
+        new_meta = None
+        # Chance to get a meta-multiplier in Additional modes (10% per step)
+        if meta_prob and rng.random() < meta_prob:
+            new_meta = generate_meta_multiplier(config, rng)
+        crashed = multiplier >= crash_point
+        yield multiplier, new_meta, crashed
+        if crashed:
+            return
+        multiplier += STEP
+
+
+def cashout_win(mode, bet, multiplier, meta_multipliers):
+    """Win for cashing out at multiplier holding meta_multipliers (returns win, total meta)."""
+    total_meta = combine_meta_multipliers(ASCENT[mode], meta_multipliers)
+    return bet * multiplier * total_meta, total_meta
+
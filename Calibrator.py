@@ -0,0 +1,201 @@
+import copy
+import hashlib
+import json
+import math
+import os
+
+# $CALIBRATION_CACHE, or the user's cache directory (not the source tree, which may be read-only)
+CACHE_PATH = os.environ.get("CALIBRATION_CACHE") or os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"), "gamecrush",
+    "calibration_cache.json")
+
+
+def bracket_root(f, lo, hi, bounds, growth=1.6, max_expansions=60):
+    """
+    Widen [lo, hi] geometrically inside bounds until f changes sign.
+    Returns (a, fa, b, fb) with fa and fb of opposite sign (or one of them zero).
+    """
+    lower, upper = bounds
+    a, b = max(lo, lower), min(hi, upper)
+    fa, fb = f(a), f(b)
+    for _ in range(max_expansions):
+        if fa * fb <= 0:
+            return a, fa, b, fb
+        width = (b - a) * growth
+        # Step towards the end whose value is closer to zero
+        if abs(fa) < abs(fb):
+            a = max(a - width, lower)
+            fa = f(a)
+        else:
+            b = min(b + width, upper)
+            fb = f(b)
+        if a == lower and b == upper and fa * fb > 0:
+            break
+    raise ValueError(f"No sign change of the calibration objective in [{lower}, {upper}]")
+
+
+def brent_root(f, a, b, fa=None, fb=None, x_tol=1e-12, f_tol=0.0, max_iter=100):
+    """
+    Root of f in the bracket [a, b] by Brent's method (bisection, secant and
+    inverse quadratic interpolation). Stops once |f(x)| <= f_tol, the bracket
+    is narrower than x_tol, or after max_iter evaluations.
+    Returns (root, f(root), iterations).
+    """
+    fa = f(a) if fa is None else fa
+    fb = f(b) if fb is None else fb
+    if fa * fb > 0:
+        raise ValueError("Root is not bracketed")
+    if abs(fa) < abs(fb):
+        a, b, fa, fb = b, a, fb, fa
+    c, fc = a, fa
+    d = e = b - a
+    for iteration in range(1, max_iter + 1):
+        if abs(fb) <= f_tol or fb == 0:
+            return b, fb, iteration - 1
+        if fa * fb > 0:
+            a, fa = c, fc
+            d = e = b - a
+        if abs(fa) < abs(fb):
+            c, fc = b, fb
+            b, fb = a, fa
+            a, fa = c, fc
+        tol = 2 * 2.2e-16 * abs(b) + x_tol / 2
+        m = (a - b) / 2
+        if abs(m) <= tol:
+            return b, fb, iteration - 1
+        if abs(e) >= tol and abs(fc) > abs(fb):
+            s = fb / fc
+            if a == c:  # Secant step
+                p, q = 2 * m * s, 1 - s
+            else:  # Inverse quadratic interpolation
+                q, r = fc / fa, fb / fa
+                p = s * (2 * m * q * (q - r) - (b - c) * (r - 1))
+                q = (q - 1) * (r - 1) * (s - 1)
+            if p > 0:
+                q = -q
+            p = abs(p)
+            if 2 * p < min(3 * m * q - abs(tol * q), abs(e * q)):
+                e, d = d, p / q
+            else:
+                d = e = m
+        else:
+            d = e = m
+        c, fc = b, fb
+        b += d if abs(d) > tol else math.copysign(tol, m)
+        fb = f(b)
+    return b, fb, max_iter
+
+
+def calibrate(rtp_of, target_rtp, guess, bounds, rel_tol=1e-6, max_iter=100):
+    """
+    Solve rtp_of(x) = target_rtp for a model parameter x.
+
+    rtp_of returns the model's RTP in percent for a parameter value, guess is a
+    starting value inside bounds (the parameter's valid range). The tolerance is
+    relative to the target, so it means the same for a 1x and a 300x bet.
+    """
+    evaluations = [0]
+
+    def objective(x):
+        evaluations[0] += 1
+        return rtp_of(x) - target_rtp
+
+    lower, upper = bounds
+    half_width = max(abs(guess) * 0.05, (upper - lower) * 1e-4)
+    a, fa, b, fb = bracket_root(objective, guess - half_width, guess + half_width, bounds)
+    x, fx, iterations = brent_root(objective, a, b, fa, fb, f_tol=rel_tol * abs(target_rtp), max_iter=max_iter)
+    if abs(fx) > rel_tol * abs(target_rtp):
+        raise ValueError(f"Calibration did not converge in {max_iter} iterations (RTP off by {fx:.3g})")
+    return {"value": float(x), "rtp": float(fx + target_rtp), "iterations": iterations,
+            "evaluations": evaluations[0]}
+
+
+def load_cache(path=CACHE_PATH):
+    """Calibration cache file contents ({} if missing or unreadable)."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def cache_key(model, mode, rtp, params):
+    """Stable cache key for a calibration problem."""
+    return json.dumps([model, mode, rtp, params], sort_keys=True)
+
+
+def fingerprint(value):
+    """Short digest of a large JSON-serializable input (a table, a list of multipliers) for a cache key."""
+    return hashlib.sha256(json.dumps(value, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def cached_calibrate(model, mode, rtp, params, solve, path=CACHE_PATH):
+    """
+    Look up a calibration result by (model, mode, rtp, params), running
+    solve() and storing its result on a miss. params must be JSON-serializable
+    and include everything the result depends on. A cache that can't be
+    written only costs the next run the solve.
+    """
+    key = cache_key(model, mode, rtp, params)
+    cache = load_cache(path)
+    if key in cache:
+        return dict(cache[key], cached=True)
+    result = solve()
+    cache[key] = result
+    tmp_path = f"{path}.tmp"
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(tmp_path, "w") as f:
+            json.dump(cache, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+    return dict(result, cached=False)
+
+
+def calibrate_knight_parameter(variant, mode, rtp, parameter, base_bet=1.0, bounds=None, rel_tol=1e-6,
+                               path=CACHE_PATH):
+    """
+    Solve a Knight's Ascent mode parameter ("crash_scale" - the scripts'
+    scale_factor - or "meta_divisor") so that the exact RTP from
+    KnightAnalytic matches rtp.
+    """
+    from GameMath import VARIANTS
+    from KnightAnalytic import analyze_mode
+
+    config = VARIANTS[variant][mode]
+    if bounds is None:
+        bounds = {"crash_scale": (1e-6, 100.0 / rtp), "meta_divisor": (1e-3, 1e6)}[parameter]
+
+    def rtp_of(value):
+        trial = copy.deepcopy(config)
+        trial[parameter] = value
+        return analyze_mode(trial, rtp, base_bet)["rtp"]
+
+    params = {"parameter": parameter, "base_bet": base_bet, "rel_tol": rel_tol, "bounds": list(bounds),
+              "guess": config[parameter], "config": {k: v for k, v in config.items() if k != parameter}}
+    return cached_calibrate("knight", f"{variant}/{mode}", rtp, params,
+                            lambda: calibrate(rtp_of, rtp, config[parameter], bounds, rel_tol), path)
+
+
+if __name__ == "__main__":
+    from GameMath import MODES, VARIANTS
+
+    print("Welcome to the Knight's Ascent RTP Calibrator!")
+
+    variants = list(VARIANTS)
+    for i, name in enumerate(variants, 1):
+        print(f"{i}. {name}")
+    variant = variants[int(input(f"Enter variant (1-{len(variants)}): ")) - 1]
+    parameter = input("Enter parameter to solve (crash_scale or meta_divisor): ").strip()
+    rtp = float(input("Enter desired RTP (e.g., 95 for 95%): "))
+
+    for mode in MODES:
+        config = VARIANTS[variant][mode]
+        if parameter == "meta_divisor" and (config["meta_rule"] != "sum" or config["meta_prob"] == 0):
+            print(f"{mode} Mode: meta_divisor has no effect, skipped")
+            continue
+        r = calibrate_knight_parameter(variant, mode, rtp, parameter)
+        source = "cached" if r["cached"] else f"{r['evaluations']} evaluations"
+        print(f"{mode} Mode: {parameter} = {r['value']:.8g} (was {config[parameter]}), "
+              f"RTP = {r['rtp']:.6f}% ({source})")
@@ -0,0 +1,183 @@
+import numpy as np
+
+from GameMath import calculate_fireproof_cost
+from Instrument import count as count_metric, phase, report_progress
+
+CAP = 11000  # GameStats.py caps a cycle's payout at 11000x bet
+
+
+def cycle_payouts(M, send_multiplier, send_fraction, M_f, C, bet=1.0, cap=CAP):
+    """
+    Payouts of GameStats.py cycles from their parameter arrays (send_multiplier
+    and M_f 0 where the cycle doesn't use them), capped at cap x bet.
+    """
+    cycle_payout = np.where((M_f > 0) & (C >= M_f), M_f, 0.0)
+    sent = (send_multiplier > 0) & (C >= send_multiplier)
+    cycle_payout += sent * send_fraction * send_multiplier
+    remaining_bet = 1 - sent * send_fraction
+    cycle_payout += (C >= M) * remaining_bet * M
+    cycle_payout *= bet
+    np.minimum(cycle_payout, cap * bet, out=cycle_payout)
+    return cycle_payout
+
+
+def batch_chunks(rtp, num_cycles, bet=1.0, chunk_size=65_536, rng=None, server_seed=None, first_cycle=0,
+                 metrics=None):
+    """
+    Yield (payouts, crash points, fireproofs bought) of GameStats.py cycles,
+    chunk_size cycles at a time, drawn from rng (a NumPy Generator) or, with
+    a server_seed, from the first block of FairRNG rounds first_cycle on.
+    The arrays are buffers reused for the next chunk.
+
+    The payouts are cycle_payouts' and the crash points crash_points', worked
+    out in place in buffers allocated once: a chunk of the default size fits
+    in cache, and every pass over it is a single ufunc call. With metrics, the
+    draw and payout phases are timed.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    scaled_rtp = rtp / 100
+    size = max(min(chunk_size, num_cycles), 1)
+    draws = np.empty((7, size))
+    payout_buffer = np.empty(size)
+    hit_buffer = np.empty(size, dtype=bool)
+    use_buffer = np.empty(size, dtype=bool)
+
+    remaining_cycles = num_cycles
+    while remaining_cycles > 0:
+        n = min(size, remaining_cycles)
+        remaining_cycles -= n
+
+        # Random game parameters (same distributions as the scalar loop),
+        # drawn as one block of uniforms and transformed in place
+        with phase(metrics, "draw"):
+            d = draws[:, :n]
+            if server_seed is not None:
+                from FairRNG import round_blocks
+                d[...] = round_blocks(server_seed, first_cycle, n)[:, :7].T
+                first_cycle += n
+            elif n == size:
+                rng.random(out=d)
+            else:
+                d[...] = rng.random((7, n))
+        with phase(metrics, "payout"):
+            M, use_send, send_multiplier, sent, use_fireproof, M_f, C = d
+            payout, hit, use = payout_buffer[:n], hit_buffer[:n], use_buffer[:n]
+
+            # Crash points: RTP / (1 - U), or 1.0 below the instant-crash threshold 1 - RTP,
+            # which is exactly where RTP / (1 - U) < 1
+            np.subtract(1.0, C, out=C)
+            np.divide(scaled_rtp, C, out=C)
+            np.maximum(C, 1.0, out=C)
+
+            # M = 1.1 + 8.9 U0, send multiplier 1.1 + (M - 1.1) U2, M_f = 1.1 + 1.9 U5
+            np.multiply(M, 8.9, out=M)
+            np.multiply(send_multiplier, M, out=send_multiplier)
+            np.add(send_multiplier, 1.1, out=send_multiplier)
+            np.add(M, 1.1, out=M)
+            np.multiply(M_f, 1.9, out=M_f)
+            np.add(M_f, 1.1, out=M_f)
+
+            # Fireproof: M_f once the crash point reaches it
+            np.less(use_fireproof, 0.5, out=use)
+            fireproofs = int(np.count_nonzero(use))
+            np.greater_equal(C, M_f, out=hit)
+            np.logical_and(hit, use, out=hit)
+            np.multiply(M_f, hit, out=payout)
+
+            # Send: the fraction sent (U3 if the send fires, else 0) at the send multiplier
+            np.less(use_send, 0.5, out=use)
+            np.greater_equal(C, send_multiplier, out=hit)
+            np.logical_and(hit, use, out=hit)
+            np.multiply(sent, hit, out=sent)
+            np.multiply(send_multiplier, sent, out=send_multiplier)
+            np.add(payout, send_multiplier, out=payout)
+
+            # Cashout: the rest of the bet at M
+            np.greater_equal(C, M, out=hit)
+            np.subtract(1.0, sent, out=sent)
+            np.multiply(M, sent, out=M)
+            np.multiply(M, hit, out=M)
+            np.add(payout, M, out=payout)
+            if bet != 1.0:
+                np.multiply(payout, bet, out=payout)
+            np.minimum(payout, CAP * bet, out=payout)
+        yield payout, C, fireproofs
+
+
+def simulate_batch(rtp, num_cycles, bet=1.0, chunk_size=65_536, seed=None, server_seed=None, metrics=None):
+    """
+    Vectorized version of the GameStats.py cycle loop.
+    Draws every cycle parameter as a NumPy array, chunk_size cycles at a time
+    (batch_chunks), and reduces each chunk to running totals so memory stays
+    O(chunk_size). With a server_seed, cycle i's draws are the first block of
+    FairRNG round i (slower, but any cycle can be recomputed on its own).
+    With metrics, each chunk's draw, payout and reduce phases are timed.
+    """
+    # bet x M_f x P(C >= M_f) with P(C >= M_f) = (RTP / 100) / M_f: the same for every M_f
+    fireproof_cost = calculate_fireproof_cost(bet, 1.0, rtp)
+
+    total_spent = 0.0
+    total_winnings = 0.0
+    max_win = 0.0
+    max_crash = 0.0
+    count = 0
+    mean = 0.0
+    m2 = 0.0  # Sum of squared deviations, merged across chunks (Chan et al.)
+
+    chunks = batch_chunks(rtp, num_cycles, bet, chunk_size, np.random.default_rng(seed), server_seed,
+                          metrics=metrics)
+    for payout, C, fireproofs in chunks:
+        n = len(payout)
+        count_metric(metrics, "rounds", n)
+        count_metric(metrics, "rng_draws", 7 * n)
+        report_progress(metrics, count + n, num_cycles, "cycles")
+
+        # Reduce the chunk
+        with phase(metrics, "reduce"):
+            total_spent += n * bet + fireproofs * fireproof_cost
+            chunk_total = float(payout.sum())
+            total_winnings += chunk_total
+            max_win = max(max_win, float(payout.max()))
+            max_crash = max(max_crash, float(C.max()))
+
+            chunk_mean = chunk_total / n
+            payout -= chunk_mean
+            chunk_m2 = float(np.dot(payout, payout))
+            delta = chunk_mean - mean
+            combined = count + n
+            mean += delta * n / combined
+            m2 += chunk_m2 + delta ** 2 * count * n / combined
+            count = combined
+
+    return {
+        "total_spent": total_spent,
+        "total_winnings": total_winnings,
+        "achieved_rtp": (total_winnings / total_spent) * 100 if total_spent > 0 else 0,
+        "max_win": max_win,
+        "max_potential_win": min(bet * max_crash, CAP * bet),
+        "average_win": mean,
+        "std_dev": (m2 / (count - 1)) ** 0.5 if count > 1 else 0,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    from GameStats import simulate_cycles
+
+    # python CrashBatch.py [--cycles N]: the batch engine's speed against the scalar cycle loop
+    parser = argparse.ArgumentParser(description="Time the batch engine against the scalar GameStats loop.")
+    parser.add_argument("--cycles", type=int, default=1_000_000)
+    parser.add_argument("--rtp", type=float, default=97.0)
+    args = parser.parse_args()
+
+    simulate_batch(args.rtp, 100_000, seed=0)  # Warm up
+    began = time.perf_counter()
+    batch = simulate_batch(args.rtp, args.cycles, seed=0)
+    batch_seconds = time.perf_counter() - began
+    began = time.perf_counter()
+    scalar = simulate_cycles(args.rtp, args.cycles)
+    scalar_seconds = time.perf_counter() - began
+    print(f"{args.cycles:,} cycles: scalar {scalar_seconds:.2f} s (RTP {scalar['achieved_rtp']:.2f}%), "
+          f"batch {batch_seconds:.3f} s (RTP {batch['achieved_rtp']:.2f}%), {scalar_seconds / batch_seconds:.0f}x")
@@ -0,0 +1,188 @@
+import bisect
+import math
+from fractions import Fraction
+
+# Largest auto-cashout, send or fireproof multiplier a bet may set: far beyond any
+# sensible target, and far below where a 0.01 step stops changing the multiplier
+MAX_MULTIPLIER = 1_000_000
+
+
+class StepGrid:
+    """
+    The multiplier values produced by `multiplier = 1.0; multiplier += step`.
+
+    Inside one binade [2^e, 2^(e+1)) every float is a multiple of the same ulp,
+    so each `+= step` adds the same rounded increment. The grid is therefore a
+    short list of arithmetic segments (one per binade) and any grid value or
+    grid index can be found in O(1) without replaying the additions.
+    """
+
+    def __init__(self, step):
+        self.step = step
+        self._starts = []   # First step index of each segment
+        self._ends = []     # Last value of each segment
+        self._segments = []  # (first index, first value, increment, last index)
+        self._next_index = 0
+        self._next_value = 1.0
+
+    def _extend(self):
+        """Append the segment that starts at the next unbuilt grid value."""
+        k, v = self._next_index, self._next_value
+        hi = 2.0 ** math.frexp(v)[1]  # Upper edge of v's binade
+        ulp = Fraction(math.ulp(v))
+        q, r = divmod(Fraction(self.step), ulp)
+        if r == ulp / 2:
+            raise ValueError(f"step {self.step} rounds to even inside binade of {v}")
+        inc = float((q + (1 if r > ulp / 2 else 0)) * ulp)
+        if inc == 0:
+            raise ValueError(f"step {self.step} no longer changes the multiplier at {v}")
+
+        if v + inc >= hi:
+            count = 0
+        else:
+            count = int((hi - v) / inc)
+            while v + count * inc >= hi:
+                count -= 1
+            while v + (count + 1) * inc < hi:
+                count += 1
+        last = v + count * inc
+
+        self._segments.append((k, v, inc, k + count))
+        self._starts.append(k)
+        self._ends.append(last)
+        self._next_index = k + count + 1
+        self._next_value = last + self.step  # Crossing step rounds like the real loop
+
+    def value(self, k):
+        """Multiplier after k steps."""
+        while self._next_index <= k:
+            self._extend()
+        k0, v0, inc, _ = self._segments[bisect.bisect_right(self._starts, k) - 1]
+        return v0 + (k - k0) * inc
+
+    def index(self, x):
+        """Smallest k whose grid value is >= x."""
+        if not math.isfinite(x):
+            raise ValueError(f"Multiplier {x} is not finite")
+        if x <= 1.0:
+            return 0
+        while not self._ends or self._ends[-1] < x:
+            self._extend()
+        k0, v0, inc, k1 = self._segments[bisect.bisect_left(self._ends, x)]
+        j = min(max(math.ceil((x - v0) / inc), 0), k1 - k0)
+        while j > 0 and v0 + (j - 1) * inc >= x:
+            j -= 1
+        while v0 + j * inc < x:
+            j += 1
+        return k0 + j
+
+    def _segment_arrays(self):
+        import numpy as np
+
+        if not self._segments:
+            self._extend()
+        k0, v0, inc, k1 = (np.array(column) for column in zip(*self._segments))
+        return k0.astype(np.int64), v0, inc, k1.astype(np.int64)
+
+    def values(self, k):
+        """value() for a NumPy array of step indexes."""
+        import numpy as np
+
+        k = np.asarray(k, dtype=np.int64)
+        if k.size:
+            self.value(int(k.max()))
+        k0, v0, inc, _ = self._segment_arrays()
+        s = np.searchsorted(np.array(self._starts), k, side="right") - 1
+        return v0[s] + (k - k0[s]) * inc[s]
+
+    def indexes(self, x):
+        """index() for a NumPy array of multipliers, with the same rounding fix-ups."""
+        import numpy as np
+
+        x = np.asarray(x, dtype=np.float64)
+        if not x.size:
+            return np.zeros(0, dtype=np.int64)
+        self.index(float(x.max()))
+        k0, v0, inc, k1 = self._segment_arrays()
+        s = np.searchsorted(np.array(self._ends), np.maximum(x, 1.0), side="left")
+        k0, v0, inc, k1 = k0[s], v0[s], inc[s], k1[s]
+        j = np.ceil((x - v0) / inc)
+        j = np.minimum(np.maximum(j, 0), k1 - k0).astype(np.int64)
+        while True:
+            back = (j > 0) & (v0 + (j - 1) * inc >= x)
+            if not back.any():
+                break
+            j[back] -= 1
+        while True:
+            forward = v0 + j * inc < x
+            if not forward.any():
+                break
+            j[forward] += 1
+        return np.where(x <= 1.0, 0, k0 + j)
+
+
+_grids = {}
+
+
+def step_grid(step):
+    """Shared StepGrid for a given step size."""
+    if step not in _grids:
+        _grids[step] = StepGrid(step)
+    return _grids[step]
+
+
+def resolve_round(bet, M, send_multiplier, send_percentage, M_f, C, step=0.01):
+    """
+    Resolve one Game.py round directly from its thresholds and crash point.
+
+    Replays the `while multiplier < C and not cashed_out` loop exactly: an event
+    fires at the first grid value >= its threshold, provided that value is still
+    below C and the round has not already cashed out. Returns the events in the
+    order the loop would produce them as (kind, multiplier, amount) tuples,
+    together with the round's total winnings.
+    """
+    grid = step_grid(step)
+
+    def fire_index(threshold):
+        if threshold >= C:
+            return None
+        k = grid.index(threshold)
+        return k if grid.value(k) < C else None
+
+    k_cashout = fire_index(M)
+    k_fireproof = fire_index(M_f) if M_f > 0 else None
+    k_send = fire_index(send_multiplier) if send_multiplier > 0 else None
+    if k_cashout is not None:
+        if k_fireproof is not None and k_fireproof > k_cashout:
+            k_fireproof = None
+        if k_send is not None and k_send > k_cashout:
+            k_send = None
+
+    events = []
+    remaining_bet = bet
+    if k_fireproof is not None:
+        fireproof_payout = bet * M_f
+        events.append((k_fireproof, 0, "fireproof", grid.value(k_fireproof), fireproof_payout))
+    if k_send is not None:
+        multiplier = grid.value(k_send)
+        send_amount = (send_percentage / 100) * bet * multiplier
+        remaining_bet = (1 - send_percentage / 100) * bet
+        events.append((k_send, 1, "send", multiplier, send_amount))
+    if k_cashout is not None:
+        multiplier = grid.value(k_cashout)
+        payout = remaining_bet * multiplier
+        events.append((k_cashout, 2, "cashout", multiplier, payout))
+    events.sort()
+    events = [event[2:] for event in events]
+    winnings = 0
+    for _, _, amount in events:
+        winnings += amount  # Same summation order as the step loop
+    if k_cashout is None:
+        events.append(("crash", C, remaining_bet))
+
+    return {
+        "events": events,
+        "winnings": winnings,
+        "remaining_bet": remaining_bet,
+        "cashed_out": k_cashout is not None,
+    }
@@ -0,0 +1,345 @@
+import argparse
+import asyncio
+import json
+import math
+import random
+import statistics
+import sys
+import time
+
+from CrashRound import MAX_MULTIPLIER, step_grid
+from FairRNG import FairRandom, new_server_seed, seed_commitment
+from GameMath import calculate_fireproof_cost, generate_crash_point
+from ThresholdIndex import KINDS, ArrayThresholdIndex, benchmark
+
+HOST = "127.0.0.1"
+PORT = 8765
+LINE_LIMIT = 2 ** 24
+# Event lines are the bulk of the traffic, so they skip json.dumps (floats repr as valid JSON)
+EVENT = '{{"type": "event", "round": {}, "player": {}, "kind": "{}", "multiplier": {!r}, "amount": {!r}}}\n'
+
+
+def check_bet(message):
+    """Game.py's settings from a bet message, with Game.py's input validation."""
+    bet = float(message["bet"])
+    M = float(message["M"])
+    send_multiplier = float(message.get("Ms", 0))
+    send_percentage = float(message.get("P", 0)) if send_multiplier > 0 else 0
+    M_f = float(message.get("Mf", 0))
+    if not all(math.isfinite(x) for x in (bet, M, send_multiplier, send_percentage, M_f)):
+        raise ValueError("Bet settings must be finite numbers")
+    if max(M, send_multiplier, M_f) > MAX_MULTIPLIER:
+        raise ValueError(f"Multipliers must be at most {MAX_MULTIPLIER:g}")
+    if bet <= 0:
+        raise ValueError("Bet must be positive")
+    if M < 1.0:
+        raise ValueError("Auto-cashout must be at least 1.0")
+    if send_multiplier > 0 and (send_percentage <= 0 or send_percentage > 100):
+        raise ValueError("Send percentage must be between 0 and 100")
+    if M_f > 0 and M_f < 1.0:
+        raise ValueError("Fireproof multiplier must be at least 1.0")
+    return bet, M, send_multiplier, send_percentage, M_f
+
+
+def encode(message):
+    return (json.dumps(message) + "\n").encode()
+
+
+class CrashServer:
+    """
+    Bathyscaphe Depths rounds shared by every connected player.
+
+    Clients speak JSON lines over TCP. Bets ({"op": "bet", "player", "bet",
+    "M", "Ms", "P", "Mf"}, or {"op": "bets", "bets": [...]} for a connection
+    carrying many players) go into the round that is open for betting; once
+    betting closes, the multiplier climbs one grid step every
+    1 / steps_per_second seconds (steps_per_second=0 plays the round
+    instantly) and each tick sends only the events that tick reached, taken
+    from the round's ArrayThresholdIndex. Crash points come from FairRNG rounds of
+    one server seed, committed to when a client connects and printed when the
+    server stops.
+    """
+
+    def __init__(self, rtp=97.0, betting_seconds=2.0, steps_per_second=100, tick_seconds=0.05,
+                 step=0.01, log=print):
+        self.rtp = rtp
+        self.betting_seconds = betting_seconds
+        self.steps_per_second = steps_per_second
+        self.tick_seconds = tick_seconds
+        self.step = step
+        self.log = log
+        self.server_seed = new_server_seed()
+        self.rng = FairRandom(self.server_seed)
+        self.round_num = 1
+        self.index = ArrayThresholdIndex(step)  # The round open for betting
+        self.clients = {}
+        self._next_client = 0
+
+    def send(self, client, message):
+        writer = self.clients.get(client)
+        if writer is not None:
+            writer.write(encode(message))
+
+    def broadcast(self, message):
+        data = encode(message)
+        for writer in self.clients.values():
+            writer.write(data)
+
+    async def flush(self):
+        """Wait for every client's buffer to drain (slow readers hold back the tick, not memory)."""
+        writers = list(self.clients.values())
+        await asyncio.gather(*(writer.drain() for writer in writers), return_exceptions=True)
+
+    def place_bet(self, client, message):
+        if not isinstance(message, dict):
+            return {"type": "error", "message": "A bet must be a JSON object"}
+        try:
+            bet, M, send_multiplier, send_percentage, M_f = check_bet(message)
+        except (KeyError, TypeError, ValueError) as e:
+            return {"type": "error", "player": message.get("player"), "message": str(e)}
+        self.index.add_bet((client, json.dumps(message.get("player"))), bet, M, send_multiplier, send_percentage, M_f)
+        fireproof_cost = calculate_fireproof_cost(bet, M_f, self.rtp) if M_f > 0 else 0
+        return {"type": "accepted", "player": message.get("player"), "round": self.round_num,
+                "cost": bet + fireproof_cost}
+
+    async def handle(self, reader, writer):
+        client = self._next_client
+        self._next_client += 1
+        self.clients[client] = writer
+        self.send(client, {"type": "welcome", "client": client, "rtp": self.rtp,
+                           "commitment": seed_commitment(self.server_seed)})
+        try:
+            while line := await reader.readline():
+                try:
+                    message = json.loads(line)
+                except json.JSONDecodeError:
+                    self.send(client, {"type": "error", "message": "Invalid JSON"})
+                    continue
+                if not isinstance(message, dict):
+                    self.send(client, {"type": "error", "message": "A message must be a JSON object"})
+                elif message.get("op") == "bet":
+                    self.send(client, self.place_bet(client, message))
+                elif message.get("op") == "bets":
+                    # Many players on one connection: one line each way
+                    bets = message.get("bets", [])
+                    if not isinstance(bets, list):
+                        self.send(client, {"type": "error", "message": "bets must be a list of bet objects"})
+                        continue
+                    self.send(client, {"type": "batch", "results": [self.place_bet(client, bet) for bet in bets]})
+                else:
+                    self.send(client, {"type": "error", "message": f"Unknown op {message.get('op')!r}"})
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            del self.clients[client]
+            writer.close()
+
+    def dispatch(self, round_num, index, fired):
+        """Send fired events to their players, one write per client."""
+        keys = index.keys
+        lines = {}
+        for number, kind, multiplier, amount in zip(*(column.tolist() for column in fired)):
+            client, player = keys[number]
+            lines.setdefault(client, []).append(EVENT.format(round_num, player, KINDS[kind], multiplier, amount))
+        for client, chunk in lines.items():
+            writer = self.clients.get(client)
+            if writer is not None:
+                writer.write("".join(chunk).encode())
+
+    async def play_round(self):
+        """Take bets for betting_seconds, then climb to the crash point tick by tick."""
+        round_num = self.round_num
+        self.broadcast({"type": "betting", "round": round_num, "seconds": self.betting_seconds})
+        await self.flush()
+        await asyncio.sleep(self.betting_seconds)
+
+        index = self.index
+        self.index = ArrayThresholdIndex(self.step)  # Later bets go to the next round
+        self.round_num += 1
+        index.start()
+        self.rng.set_round(round_num)
+        C = generate_crash_point(self.rtp, self.rng)
+        last_tick = index.crash_tick(C) - 1
+
+        start = time.monotonic()
+        self.broadcast({"type": "start", "round": round_num, "start": start,
+                        "steps_per_second": self.steps_per_second})
+        events = 0
+        tick_times = []
+        tick = -1
+        while tick < last_tick:
+            if self.steps_per_second:
+                await asyncio.sleep(self.tick_seconds)
+                tick = min(int((time.monotonic() - start) * self.steps_per_second), last_tick)
+            else:
+                tick = last_tick
+            began = time.perf_counter()
+            fired = index.advance(tick)
+            self.dispatch(round_num, index, fired)
+            tick_times.append(time.perf_counter() - began)
+            events += len(fired[0])
+            await self.flush()
+
+        began = time.perf_counter()
+        lost = index.crash(C)
+        self.dispatch(round_num, index, lost)
+        self.broadcast({"type": "crash", "round": round_num, "crash_point": C})
+        tick_times.append(time.perf_counter() - began)
+        await self.flush()
+        self.log(f"Round {round_num}: crashed at {C:.2f}, {len(index)} bets, {events + len(lost[0])} events, "
+                 f"{len(tick_times)} ticks, slowest tick {max(tick_times) * 1000:.2f} ms")
+
+    async def serve(self, host=HOST, port=PORT, rounds=None):
+        """Accept players on host:port and play rounds (forever if rounds is None)."""
+        server = await asyncio.start_server(self.handle, host, port, limit=LINE_LIMIT)
+        self.log(f"Listening on {host}:{port}, server seed hash {seed_commitment(self.server_seed)}")
+        try:
+            async with server:
+                played = 0
+                while rounds is None or played < rounds:
+                    await self.play_round()
+                    played += 1
+        finally:
+            for writer in self.clients.values():
+                writer.close()
+            await asyncio.sleep(0)  # Let the handlers see their connections close
+            self.log(f"Server seed: {self.server_seed.hex()}")
+
+
+def random_bet(rng, player):
+    """A bettor with random auto-cashout and, sometimes, send and fireproof settings."""
+    M = round(1 + rng.expovariate(1 / 1.5), 2)
+    message = {"op": "bet", "player": player, "bet": 1.0, "M": M}
+    if rng.random() < 0.2:
+        message["Ms"] = round(rng.uniform(1.0, M), 2)
+        message["P"] = rng.randint(10, 90)
+    if rng.random() < 0.1:
+        message["Mf"] = round(rng.uniform(1.0, 3.0), 2)
+    return message
+
+
+async def load_client(host, port, players, rounds, seed, step, results):
+    """One connection betting for `players` players in each of `rounds` rounds."""
+    rng = random.Random(seed)
+    grid = step_grid(step)
+    reader, writer = await asyncio.open_connection(host, port, limit=LINE_LIMIT)
+    played = 0
+    betting = False
+    start = None
+    try:
+        while line := await reader.readline():
+            message = json.loads(line)
+            kind = message["type"]
+            if kind == "betting":
+                writer.write(encode({"op": "bets", "bets": [random_bet(rng, p) for p in range(players)]}))
+                await writer.drain()
+                betting = True
+            elif kind == "batch":
+                results["bets"] += sum(result["type"] == "accepted" for result in message["results"])
+            elif kind == "start":
+                start = message
+            elif kind == "event" and betting:
+                now = time.monotonic()
+                sps = start["steps_per_second"]
+                due = start["start"] + (grid.index(message["multiplier"]) / sps if sps else 0)
+                results["latencies"].append(now - due)
+                results["events"] += 1
+            elif kind == "crash" and betting:
+                played += 1
+                betting = False
+                if played == rounds:
+                    break
+    finally:
+        writer.close()
+
+
+async def run_load(host=HOST, port=PORT, players=10000, connections=10, rounds=3, seed=None, step=0.01):
+    """
+    Bet for `players` simulated players spread over `connections` connections
+    and measure how late each event arrives after its tick was due.
+    """
+    seed = random.randrange(2 ** 32) if seed is None else seed
+    results = {"bets": 0, "events": 0, "latencies": []}
+    shares = [players // connections + (1 if i < players % connections else 0) for i in range(connections)]
+    began = time.perf_counter()
+    await asyncio.gather(*(load_client(host, port, n, rounds, seed + i, step, results)
+                           for i, n in enumerate(shares)))
+    results["seconds"] = time.perf_counter() - began
+    return results
+
+
+def report_load(players, results):
+    latencies = sorted(results["latencies"])
+    print(f"{players} players: {results['bets']} bets accepted, {results['events']} events in "
+          f"{results['seconds']:.1f} s")
+    if latencies:
+        p50, p99 = statistics.quantiles(latencies, n=100)[49], statistics.quantiles(latencies, n=100)[98]
+        print(f"  Event latency after due tick: p50 {p50 * 1000:.1f} ms, p99 {p99 * 1000:.1f} ms, "
+              f"max {latencies[-1] * 1000:.1f} ms")
+
+
+async def bench(players_list, connections, rounds, betting_seconds, steps_per_second, port):
+    """Index benchmark, then end-to-end: a server subprocess per player count driven by the load generator."""
+    benchmark(players_list)
+    for players in players_list:
+        server = await asyncio.create_subprocess_exec(
+            sys.executable, __file__, "serve", "--port", str(port), "--rounds", str(rounds + 1),
+            "--betting-seconds", str(betting_seconds), "--steps-per-second", str(steps_per_second),
+            stdout=asyncio.subprocess.PIPE)
+        print(f"  {(await server.stdout.readline()).decode().strip()}")
+        results = await run_load(HOST, port, players, connections, rounds)
+        report_load(players, results)
+        print("  " + (await server.stdout.read()).decode().strip().replace("\n", "\n  "))
+        await server.wait()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Multi-player Bathyscaphe Depths crash rounds over TCP.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="run the round server")
+    serve.add_argument("--host", default=HOST)
+    serve.add_argument("--port", type=int, default=PORT)
+    serve.add_argument("--rtp", type=float, default=97.0)
+    serve.add_argument("--rounds", type=int, help="stop after this many rounds")
+    serve.add_argument("--betting-seconds", type=float, default=2.0)
+    serve.add_argument("--steps-per-second", type=float, default=100, help="0.01 steps per second (0: instant)")
+    serve.add_argument("--tick-seconds", type=float, default=0.05)
+
+    load = commands.add_parser("load", help="bet for many simulated players against a running server")
+    load.add_argument("--host", default=HOST)
+    load.add_argument("--port", type=int, default=PORT)
+    load.add_argument("--players", type=int, default=10000)
+    load.add_argument("--connections", type=int, default=10)
+    load.add_argument("--rounds", type=int, default=3)
+    load.add_argument("--seed", type=int)
+
+    bench_cmd = commands.add_parser("bench", help="index and end-to-end benchmarks")
+    bench_cmd.add_argument("--players", type=int, nargs="+", default=[10000, 100000])
+    bench_cmd.add_argument("--connections", type=int, default=20)
+    bench_cmd.add_argument("--rounds", type=int, default=3)
+    bench_cmd.add_argument("--betting-seconds", type=float, default=3.0)
+    bench_cmd.add_argument("--steps-per-second", type=float, default=100)
+    bench_cmd.add_argument("--port", type=int, default=PORT + 1)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        if args.command == "serve":
+            server = CrashServer(args.rtp, args.betting_seconds, args.steps_per_second, args.tick_seconds,
+                                 log=lambda text: print(text, flush=True))
+            asyncio.run(server.serve(args.host, args.port, args.rounds))
+        elif args.command == "load":
+            report_load(args.players, asyncio.run(
+                run_load(args.host, args.port, args.players, args.connections, args.rounds, args.seed)))
+        else:
+            asyncio.run(bench(args.players, args.connections, args.rounds, args.betting_seconds,
+                              args.steps_per_second, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
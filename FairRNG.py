@@ -0,0 +1,153 @@
+import hashlib
+import random
+import secrets
+import struct
+
+# Each (round, block) counter is hashed with BLAKE2b keyed by the server seed (a
+# keyed PRF, so outputs reveal nothing about the seed or other rounds). One
+# 64-byte digest gives eight 64-bit words, i.e. eight uniforms.
+COUNTER = struct.Struct(">QI")
+WORDS = struct.Struct(">8Q")
+PER_BLOCK = 8
+SCALE = 2.0 ** -53
+
+
+def keyed_hash(server_seed):
+    """The keyed BLAKE2b state that every block of a server seed is hashed from."""
+    return hashlib.blake2b(key=server_seed, digest_size=64)
+
+
+def block_digest(base, round_index, block):
+    """Digest of one (round, block) counter, from a keyed_hash state."""
+    h = base.copy()
+    h.update(COUNTER.pack(round_index, block))
+    return h.digest()
+
+
+def new_server_seed():
+    """Fresh secret 32-byte server seed."""
+    return secrets.token_bytes(32)
+
+
+def server_seed_from_int(seed):
+    """Server seed for a reproducible (non-secret) simulation seed."""
+    return hashlib.sha256(f"seed:{seed}".encode()).digest()
+
+
+def seed_commitment(server_seed):
+    """SHA-256 of the server seed, published before play so it can't be swapped later."""
+    return hashlib.sha256(server_seed).hexdigest()
+
+
+def round_block(server_seed, round_index, block):
+    """
+    Eight uniforms in [0, 1) for block `block` of round `round_index`:
+    BLAKE2b(key=server_seed, round || block) split into eight words, 53 bits each.
+    """
+    digest = block_digest(keyed_hash(server_seed), round_index, block)
+    return [(w >> 11) * SCALE for w in WORDS.unpack(digest)]
+
+
+def round_uniform(server_seed, round_index, draw=0):
+    """Uniform number `draw` of round `round_index`, computed directly (no earlier rounds needed)."""
+    return round_block(server_seed, round_index, draw // PER_BLOCK)[draw % PER_BLOCK]
+
+
+def round_blocks(server_seed, first_round, count, block=0):
+    """
+    Block `block` of rounds first_round .. first_round + count - 1 as a
+    (count, 8) NumPy array of uniforms. Every round is independent, so ranges
+    can be generated in parallel.
+    """
+    import numpy as np
+
+    base = keyed_hash(server_seed)
+    digests = b"".join([block_digest(base, r, block) for r in range(first_round, first_round + count)])
+    words = np.frombuffer(digests, dtype=">u8").reshape(count, PER_BLOCK)
+    return (words >> np.uint64(11)).astype(np.float64) * SCALE
+
+
+def round_uniforms(server_seed, first_round, count, draw=0):
+    """round_uniform for rounds first_round .. first_round + count - 1 as a NumPy array."""
+    block, word = divmod(draw, PER_BLOCK)
+    return round_blocks(server_seed, first_round, count, block)[:, word].copy()
+
+
+class FairRandom(random.Random):
+    """
+    random.Random whose draws for a round come from that round's hash blocks,
+    so every round is a fixed, independent stream: uniform, randint, choice etc.
+    for round N can be recomputed (or checked) without replaying rounds 0..N-1.
+    """
+
+    def __init__(self, server_seed, round_index=0):
+        self._server_seed = server_seed
+        self._base = keyed_hash(server_seed)
+        super().__init__()
+        self.set_round(round_index)
+
+    def seed(self, *args, **kwargs):
+        """Rounds are keyed by the server seed, not reseeded."""
+
+    def set_round(self, round_index):
+        """Start reading round `round_index`'s stream from its first draw."""
+        self.round_index = round_index
+        self._block = 0
+        self._buffer = []
+
+    def draws(self):
+        """Uniforms read from the current round's stream so far."""
+        return self._block * PER_BLOCK - len(self._buffer)
+
+    def _refill(self):
+        words = WORDS.unpack(block_digest(self._base, self.round_index, self._block))
+        self._block += 1
+        self._buffer = [(w >> 11) * SCALE for w in reversed(words)]
+
+    def random(self):
+        try:
+            return self._buffer.pop()
+        except IndexError:
+            self._refill()
+            return self._buffer.pop()
+
+    def getrandbits(self, k):
+        if k <= 53:
+            return int(self.random() * 9007199254740992.0) >> (53 - k)  # Top k of 53 bits
+        # 53 bits per uniform, least significant chunk first
+        bits = 0
+        filled = 0
+        while filled < k:
+            bits |= int(self.random() * 2.0 ** 53) << filled
+            filled += 53
+        return bits & ((1 << k) - 1)
+
+    def getstate(self):
+        return self._server_seed, self.round_index, self._block, list(self._buffer)
+
+    def setstate(self, state):
+        self._server_seed, self.round_index, self._block, buffer = state
+        self._base = keyed_hash(self._server_seed)
+        self._buffer = list(buffer)
+
+
+def verify_round(server_seed, commitment, round_index, generate, claimed):
+    """
+    Check a published round: the revealed server seed must hash to the
+    commitment and generate(FairRandom(server_seed, round_index)) must give
+    the claimed result (e.g. lambda rng: generate_crash_point(97, rng)).
+    """
+    if seed_commitment(server_seed) != commitment:
+        return False
+    return generate(FairRandom(server_seed, round_index)) == claimed
+
+
+if __name__ == "__main__":
+    import sys
+
+    from GameMath import generate_crash_point
+
+    # python FairRNG.py SERVER_SEED_HEX ROUND RTP: the Bathyscaphe Depths crash point of a round
+    server_seed, round_index, rtp = bytes.fromhex(sys.argv[1]), int(sys.argv[2]), float(sys.argv[3])
+    print(f"Commitment: {seed_commitment(server_seed)}")
+    print(f"Round {round_index} crash point: {generate_crash_point(rtp, FairRandom(server_seed, round_index)):.6f}")
@@ -1,23 +1,7 @@
-import random
-
-
-def generate_crash_point(rtp):
-    """
-    Generate a random crash point based on the desired RTP.
-    - If U < 1 - (RTP/100), crash at 1.0.
-    - Otherwise, C = (RTP/100) / (1 - U).
-    """
-    u = random.random()
-    if u < 1 - (rtp / 100):
-        return 1.0
-    else:
-        return (rtp / 100) / (1 - u)
-
-
-def calculate_fireproof_cost(bet, M_f, rtp):
-    """Calculate cost of fireproof level to maintain RTP."""
-    probability = (rtp / 100) / M_f
-    return bet * M_f * probability
+from CrashRound import resolve_round
+from FairRNG import FairRandom, new_server_seed, seed_commitment
+from GameMath import calculate_fireproof_cost, generate_crash_point
+from RoundJournal import CRASH_JOURNAL, append_round, open_journal
 
 
 # Welcome message
@@ -28,6 +12,12 @@ rtp = float(input("Enter desired RTP (e.g., 97 for 97%): "))
 num_rounds = int(input("Enter number of rounds to play: "))
 total_winnings = 0
 total_spent = 0
+journal = open_journal(CRASH_JOURNAL, "crash")  # Every played round, for replay
+
+# Provably fair crash points: commit to the session's server seed now, reveal it at the end
+server_seed = new_server_seed()
+rng = FairRandom(server_seed)
+print(f"Server seed hash: {seed_commitment(server_seed)}")
 
 # Main game loop
 for round_num in range(1, num_rounds + 1):
@@ -64,54 +54,36 @@ for round_num in range(1, num_rounds + 1):
         fireproof_cost = calculate_fireproof_cost(bet, M_f, rtp)
         print(f"Fireproof level at {M_f:.2f} costs {fireproof_cost:.2f}")
 
-    # Generate crash point
-    C = generate_crash_point(rtp)
-
-    # Initialize game state
-    multiplier = 1.00
-    step = 0.01  # Small step for precision
-    sent = False
-    cashed_out = False
-    fireproof_reached = False
-    original_bet = bet
-    remaining_bet = bet
+    # Generate crash point from this round's own stream
+    rng.set_round(round_num)
+    C = generate_crash_point(rtp, rng)
 
     total_spent += bet + fireproof_cost
 
     print(
         f"Starting with bet {bet}, auto-cashout at {M}, send {send_percentage}% at {send_multiplier if send_multiplier > 0 else 'N/A'}, fireproof at {M_f if M_f > 0 else 'N/A'}")
 
-    # Simulate multiplier increase
-    while multiplier < C and not cashed_out:
-        # Fireproof level check
-        if M_f > 0 and multiplier >= M_f and not fireproof_reached:
-            fireproof_payout = original_bet * M_f
-            total_winnings += fireproof_payout
-            fireproof_reached = True
-            print(f"Fireproof level reached at {M_f:.2f}, secured {fireproof_payout:.2f}")
-
-        # Send action
-        if send_multiplier > 0 and multiplier >= send_multiplier and not sent:
-            send_amount = (send_percentage / 100) * original_bet * multiplier
-            total_winnings += send_amount
-            remaining_bet = (1 - send_percentage / 100) * original_bet
-            sent = True
-            print(f"Sent {send_amount:.2f} at multiplier {multiplier:.2f}")
-
-        # Auto-cashout
-        if multiplier >= M:
-            payout = remaining_bet * multiplier
-            total_winnings += payout
-            cashed_out = True
-            print(f"Cashed out remaining at {multiplier:.2f}, won {payout:.2f}")
-
-        multiplier += step
-
-    # Handle crash
-    if not cashed_out:
-        print(f"Crashed at {C:.2f}, lost remaining bet {remaining_bet:.2f}")
+    # Resolve the round's events directly from the thresholds and crash point
+    result = resolve_round(bet, M, send_multiplier, send_percentage, M_f, C)
+    for event, multiplier, amount in result["events"]:
+        if event == "fireproof":
+            total_winnings += amount
+            print(f"Fireproof level reached at {M_f:.2f}, secured {amount:.2f}")
+        elif event == "send":
+            total_winnings += amount
+            print(f"Sent {amount:.2f} at multiplier {multiplier:.2f}")
+        elif event == "cashout":
+            total_winnings += amount
+            print(f"Cashed out remaining at {multiplier:.2f}, won {amount:.2f}")
+        else:
+            print(f"Crashed at {multiplier:.2f}, lost remaining bet {amount:.2f}")
+
+    index = append_round(journal, server_seed, round_num, rtp, bet, M, send_multiplier, send_percentage, M_f, result["winnings"])
+    print(f"Journal round #{index} ({CRASH_JOURNAL})")
+journal.close()
 
 # Final results
 print(f"\nTotal spent: {total_spent:.2f}")
 print(f"Total winnings after {num_rounds} rounds: {total_winnings:.2f}")
-print(f"Net result: {total_winnings - total_spent:.2f}")
\ No newline at end of file
+print(f"Net result: {total_winnings - total_spent:.2f}")
+print(f"Server seed: {server_seed.hex()} (check any round with: python FairRNG.py SEED ROUND RTP)")
\ No newline at end of file
@@ -0,0 +1,282 @@
+import math
+import random
+import time
+from bisect import bisect_right
+from collections import OrderedDict
+
+import numpy as np
+
+from CrashRound import step_grid
+
+MODES = ["Normal", "Additional", "Additional MAX"]
+BET_MULTIPLIERS = {"Normal": 1, "Additional": 150, "Additional MAX": 300}
+STEP = 0.1  # Knight's Ascent multiplier step
+CASHOUT_LOW = 1.1  # The stats scripts' cashout targets: uniform(1.1, 50.0)
+CASHOUT_HIGH = 50.0
+CRASH_CAP = 50000  # Knight crash points are capped at 50000x
+
+# Every mode of every game is one of these dicts; mode_config fills in the defaults.
+#   bet_multiplier:  cost of a round in base bets
+#   crash_scale:     scale_factor applied to the crash distribution
+#   threshold_scale: extra factor on the instant-crash threshold only (the 1.01 tweak)
+#   crash_cap:       largest crash point (None: uncapped)
+#   meta_prob:       chance per 0.1 step to collect a meta-multiplier
+#   meta_range:      randint range of a collected meta-multiplier
+#   initial_metas:   meta-multipliers held at the start of the climb
+#   meta_rule:       "product" multiplies the metas, "sum" adds them and divides by meta_divisor
+#   cap:             max win in multiples of the base bet (None: uncapped)
+MODE_DEFAULTS = {
+    "bet_multiplier": 1, "crash_scale": 1.0, "threshold_scale": 1.0, "crash_cap": CRASH_CAP, "meta_prob": 0,
+    "meta_range": (2, 20), "initial_metas": [], "meta_rule": "product", "meta_divisor": 1, "cap": 50000,
+}
+
+
+def mode_config(mode="Normal", **params):
+    """A mode's config: the defaults, the mode's bet multiplier and the given overrides."""
+    return dict(MODE_DEFAULTS, bet_multiplier=BET_MULTIPLIERS[mode], **params)
+
+
+# Bathyscaphe Depths (Game.py, GameStats.py): the plain, uncapped crash distribution
+CRASH_GAME = mode_config(crash_cap=None, cap=None)
+
+# Per-mode rules of each Knight's Ascent stats script
+VARIANTS = {
+    "KnightStats": {
+        "Normal": mode_config("Normal"),
+        "Additional": mode_config("Additional", meta_prob=0.05),
+        "Additional MAX": mode_config("Additional MAX", crash_scale=0.1, meta_prob=0.05, initial_metas=[10]),
+    },
+    "Knight Visuals": {
+        "Normal": mode_config("Normal", meta_rule="sum", meta_divisor=100),
+        "Additional": mode_config("Additional", meta_prob=0.05, meta_rule="sum", meta_divisor=100),
+        "Additional MAX": mode_config("Additional MAX", crash_scale=0.5, meta_prob=0.05, initial_metas=[10],
+                                      meta_rule="sum", meta_divisor=100),
+    },
+    "Summed Meta-Multipliers": {
+        "Normal": mode_config("Normal", threshold_scale=1.01, meta_rule="sum"),
+        "Additional": mode_config("Additional", threshold_scale=1.01, meta_prob=0.05, meta_rule="sum",
+                                  meta_divisor=180),
+        "Additional MAX": mode_config("Additional MAX", meta_prob=0.05, initial_metas=[10], meta_rule="sum",
+                                      meta_divisor=150),
+    },
+}
+
+# Knight's Ascent Game.py: 10% metas from 2x to 100x, no max win
+ASCENT = {
+    "Normal": mode_config("Normal", cap=None),
+    "Additional": mode_config("Additional", meta_prob=0.1, meta_range=(2, 100), cap=None),
+    "Additional MAX": mode_config("Additional MAX", crash_scale=0.03233, meta_prob=0.1, meta_range=(2, 100),
+                                  initial_metas=[10], cap=None),
+}
+
+
+def generate_crash_point(rtp, rng=random, config=CRASH_GAME):
+    """
+    Generate a random crash point based on the desired RTP and the mode's scale factor.
+    - If U < 1 - (RTP/100) * scale * threshold_scale, crash at 1.0.
+    - Otherwise, C = (RTP/100) * scale / (1 - U), capped at crash_cap.
+    """
+    u = rng.random()
+    scaled_rtp = (rtp / 100) * config["crash_scale"]
+    if u < 1 - scaled_rtp * config["threshold_scale"]:
+        return 1.0
+    crash_point = scaled_rtp / (1 - u)
+    return crash_point if config["crash_cap"] is None else min(crash_point, config["crash_cap"])
+
+
+def crash_points(u, rtp, config=CRASH_GAME):
+    """generate_crash_point for a NumPy array of the uniforms U."""
+    scaled_rtp = (rtp / 100) * config["crash_scale"]
+    with np.errstate(divide="ignore"):
+        crash = scaled_rtp / (1 - u)
+    if config["crash_cap"] is not None:
+        np.minimum(crash, config["crash_cap"], out=crash)
+    crash[u < 1 - scaled_rtp * config["threshold_scale"]] = 1.0
+    return crash
+
+
+def calculate_fireproof_cost(bet, M_f, rtp):
+    """Calculate cost of fireproof level to maintain RTP (elementwise for arrays)."""
+    probability = (rtp / 100) / M_f
+    return bet * M_f * probability
+
+
+def generate_meta_multiplier(config, rng=random):
+    """Generate a random meta-multiplier in the mode's range."""
+    return rng.randint(*config["meta_range"])
+
+
+def combine_meta_multipliers(config, meta_multipliers):
+    """Total meta-multiplier applied to the cashout under the mode's rule."""
+    if not meta_multipliers:
+        return 1
+    if config["meta_rule"] == "sum":
+        return sum(meta_multipliers) / config["meta_divisor"]
+    return math.prod(meta_multipliers)
+
+
+def classify_volatility(hit_rate, sd):
+    """Classify volatility based on hit rate and standard deviation."""
+    if hit_rate < 20 and sd > 1000:
+        return "High"
+    elif 20 <= hit_rate <= 40 or (sd > 500 and hit_rate < 50):
+        return "Medium"
+    else:
+        return "Low"
+
+
+class CompiledMode:
+    """
+    A stats-script mode config bound to one RTP, with everything per-round
+    code would recompute hoisted out.
+
+    play() is the scalar path: one round, drawing from rng in the scripts'
+    order (cashout target, crash point, metas), so a FairRNG round replays
+    exactly. play_batch() is the vectorized path: NumPy arrays for `size`
+    rounds from one Generator, with the same distribution.
+    """
+
+    def __init__(self, config, rtp):
+        from MetaSampler import combine_counts, count_cdf
+
+        self.config = config
+        self.rtp = rtp
+        self.scaled_rtp = (rtp / 100) * config["crash_scale"]
+        self.threshold = 1 - self.scaled_rtp * config["threshold_scale"]
+        self.crash_cap = config["crash_cap"]
+        self.meta_prob = config["meta_prob"]
+        self.meta_range = config["meta_range"]
+        self.initial_metas = list(config["initial_metas"])
+        self.grid = step_grid(STEP)
+        self._count_cdf = count_cdf
+        self._combine_counts = combine_counts
+
+    def crash_point(self, rng=random):
+        """generate_crash_point(self.rtp, rng, self.config)."""
+        u = rng.random()
+        if u < self.threshold:
+            return 1.0
+        crash_point = self.scaled_rtp / (1 - u)
+        return crash_point if self.crash_cap is None else min(crash_point, self.crash_cap)
+
+    def play(self, base_bet, rng=random):
+        """
+        Play one simulated round.
+        Returns (bet, payout, hit, max_win, crash_point, cashout_multiplier, meta_multipliers).
+        """
+        config = self.config
+        bet = base_bet * config["bet_multiplier"]
+        cashout_multiplier = rng.uniform(CASHOUT_LOW, CASHOUT_HIGH)
+        crash_point = self.crash_point(rng)
+
+        # The climb's 0.1 steps are known up front, so the metas it collects on them
+        # are drawn from the cached per-step-count tables instead of step by step
+        steps = self.grid.index(min(cashout_multiplier, crash_point))
+        meta_multipliers = list(self.initial_metas)
+        if self.meta_prob:
+            count = bisect_right(self._count_cdf(steps, self.meta_prob), rng.random())
+            for _ in range(count):
+                meta_multipliers.append(rng.randint(*self.meta_range))
+
+        if self.grid.value(steps) >= crash_point:
+            return bet, 0, False, False, crash_point, cashout_multiplier, meta_multipliers
+
+        payout = bet * cashout_multiplier * combine_meta_multipliers(config, meta_multipliers)
+        max_win = config["cap"] is not None and payout >= base_bet * config["cap"]
+        if max_win:
+            payout = base_bet * config["cap"]
+        return bet, payout, True, max_win, crash_point, cashout_multiplier, meta_multipliers
+
+    def play_batch(self, base_bet, size, rng):
+        """
+        `size` rounds as NumPy arrays: "payout", "hit", "max_win",
+        "crash_point", "cashout" and "counts" (metas collected), plus the
+        round's "bet".
+        """
+        config = self.config
+        bet = base_bet * config["bet_multiplier"]
+        cashout = CASHOUT_LOW + (CASHOUT_HIGH - CASHOUT_LOW) * rng.random(size)
+        crash = crash_points(rng.random(size), self.rtp, config)
+        steps = self.grid.indexes(np.minimum(cashout, crash))
+        hit = self.grid.values(steps) < crash
+        if self.meta_prob:
+            counts = rng.binomial(steps, self.meta_prob)
+        else:
+            counts = np.zeros(size, dtype=np.int64)
+        raw = bet * cashout * self._combine_counts(config, counts, rng)
+        if config["cap"] is None:
+            max_win = np.zeros(size, dtype=bool)
+            payout = np.where(hit, raw, 0.0)
+        else:
+            cap = base_bet * config["cap"]
+            max_win = hit & (raw >= cap)
+            payout = np.where(hit, np.minimum(raw, cap), 0.0)
+        return {"bet": bet, "payout": payout, "hit": hit, "max_win": max_win, "crash_point": crash,
+                "cashout": cashout, "counts": counts}
+
+
+_compiled = OrderedDict()
+COMPILED_CACHE_SIZE = 128
+
+
+def config_key(config):
+    """Hashable snapshot of a config's values (lists become tuples)."""
+    return tuple(sorted((key, tuple(value) if isinstance(value, list) else value) for key, value in config.items()))
+
+
+def compile_mode(config, rtp):
+    """
+    Cached CompiledMode of a config at an RTP. Configs are looked up by their
+    values, so equal configs share an entry and changing a config after
+    compiling it gives a new one; the COMPILED_CACHE_SIZE most recently used
+    entries are kept.
+    """
+    key = (config_key(config), rtp)
+    entry = _compiled.get(key)
+    if entry is None:
+        entry = _compiled[key] = CompiledMode(dict(config), rtp)
+        if len(_compiled) > COMPILED_CACHE_SIZE:
+            _compiled.popitem(last=False)
+    else:
+        _compiled.move_to_end(key)
+    return entry
+
+
+def play_round(config, rtp, base_bet, rng=random):
+    """
+    Play one simulated round of the given mode.
+    Returns (bet, payout, hit, max_win, crash_point, cashout_multiplier, meta_multipliers).
+    """
+    return compile_mode(config, rtp).play(base_bet, rng)
+
+
+def benchmark(rounds=200_000, rtp=95.0):
+    """Time each KnightStats mode's scalar and batch paths and the crash-point draws."""
+    from FairRNG import FairRandom, server_seed_from_int
+
+    rng = FairRandom(server_seed_from_int(0))
+    np_rng = np.random.default_rng(0)
+    for mode in MODES:
+        compiled = compile_mode(VARIANTS["KnightStats"][mode], rtp)
+        began = time.perf_counter()
+        for round_index in range(rounds // 10):
+            rng.set_round(round_index)
+            compiled.play(1.0, rng)
+        scalar = (time.perf_counter() - began) / (rounds // 10)
+        began = time.perf_counter()
+        compiled.play_batch(1.0, rounds, np_rng)
+        batch = (time.perf_counter() - began) / rounds
+        print(f"KnightStats {mode}: scalar {scalar * 1e6:.2f} us/round (FairRNG), batch {batch * 1e6:.3f} us/round")
+    plain = random.Random(0)
+    began = time.perf_counter()
+    for _ in range(rounds):
+        generate_crash_point(rtp, plain)
+    scalar = (time.perf_counter() - began) / rounds
+    began = time.perf_counter()
+    crash_points(np_rng.random(rounds), rtp)
+    batch = (time.perf_counter() - began) / rounds
+    print(f"Crash points: scalar {scalar * 1e9:.0f} ns, batch {batch * 1e9:.1f} ns")
+
+
+if __name__ == "__main__":
+    benchmark()
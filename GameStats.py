@@ -1,88 +1,117 @@
 import random
-import statistics
 
-# Function to generate crash point based on RTP
-def generate_crash_point(rtp):
-    u = random.random()
-    if u < 1 - (rtp / 100):
-        return 1.0
+from FairRNG import FairRandom, new_server_seed
+from GameMath import calculate_fireproof_cost, generate_crash_point
+from Instrument import count, phase, report_progress
+from StreamStats import add_round, new_stats, summarize
+
+# Function to run the cycle-by-cycle simulation and return its totals
+# (with a server_seed, cycle i draws from FairRNG round i instead of rng;
+# with metrics, cycles and FairRNG draws are counted and progress reported)
+def simulate_cycles(rtp, num_cycles, bet=1.0, rng=random, server_seed=None, metrics=None):
+    totals = new_stats()  # One-pass payout statistics
+    max_potential_win = 0  # Tracks maximum potential win
+    if server_seed is not None:
+        rng = FairRandom(server_seed)
+    draws = 0
+
+    with phase(metrics, "simulate"):
+        for cycle in range(num_cycles):
+            if server_seed is not None:
+                rng.set_round(cycle)
+            # Random game parameters
+            M = rng.uniform(1.1, 10.0)  # Auto-cashout multiplier
+            send_multiplier = rng.uniform(1.1, M) if rng.random() < 0.5 else 0
+            send_percentage = rng.uniform(0, 100) if send_multiplier > 0 else 0
+            M_f = rng.uniform(1.1, 3.0) if rng.random() < 0.5 else 0
+            fireproof_cost = calculate_fireproof_cost(bet, M_f, rtp) if M_f > 0 else 0
+
+            # Generate crash point
+            C = generate_crash_point(rtp, rng)
+
+            # Calculate payouts
+            fireproof_payout = bet * M_f if M_f > 0 and C >= M_f else 0
+            if send_multiplier > 0 and C >= send_multiplier:
+                send_amount = (send_percentage / 100) * bet * send_multiplier
+                remaining_bet = (1 - send_percentage / 100) * bet
+            else:
+                send_amount = 0
+                remaining_bet = bet
+            payout = remaining_bet * M if C >= M else 0
+
+            # Total payout for this cycle, capped at 11000x bet
+            cycle_payout = min(fireproof_payout + send_amount + payout, 11000 * bet)
+
+            # Update totals, maximum win and payout moments
+            add_round(totals, bet + fireproof_cost, cycle_payout)
+
+            # Update maximum potential win (capped at 11000x)
+            potential_win = min(bet * C, 11000 * bet)
+            if potential_win > max_potential_win:
+                max_potential_win = potential_win
+
+            if metrics is not None:
+                if server_seed is not None:
+                    draws += rng.draws()
+                if cycle & 4095 == 0:
+                    report_progress(metrics, cycle, num_cycles, "cycles")
+    count(metrics, "rounds", num_cycles)
+    if server_seed is not None:
+        count(metrics, "rng_draws", draws)
+
+    summary = summarize(totals)
+    return {
+        "total_spent": summary["total_spent"],
+        "total_winnings": summary["total_winnings"],
+        "achieved_rtp": summary["rtp"],
+        "max_win": max(summary["max"], 0),
+        "max_potential_win": max_potential_win,
+        "average_win": summary["mean"],
+        "std_dev": summary["sd"],
+    }
+
+# Interactive entry point
+def main():
+    # Welcome message
+    print("Welcome to Bathyscaphe Depths RTP Simulation!")
+
+    # Get user inputs
+    rtp = float(input("Enter desired RTP (e.g., 97 for 97%): "))
+    num_cycles = int(input("Enter number of cycles to simulate: "))
+    use_batch = input("Use the NumPy batch engine? (y/n): ").lower() == 'y'
+    # The batch engine's FairRNG path hashes every cycle, which costs most of its speed
+    fair = not use_batch or input("Draw every cycle from FairRNG (slower)? (y/n): ").lower() == 'y'
+
+    # A fair run uses a fresh server seed, so any cycle can be recomputed; a
+    # plain batch run a NumPy seed, so the whole run can be repeated
+    server_seed = new_server_seed() if fair else None
+    if use_batch:
+        import numpy as np
+
+        from CrashBatch import simulate_batch
+        if fair:
+            results = simulate_batch(rtp, num_cycles, server_seed=server_seed)
+        else:
+            seed = int(np.random.SeedSequence().entropy)
+            results = simulate_batch(rtp, num_cycles, seed=seed)
     else:
-        return (rtp / 100) / (1 - u)
-
-# Function to calculate fireproof cost
-def calculate_fireproof_cost(bet, M_f, rtp):
-    probability = (rtp / 100) / M_f
-    return bet * M_f * probability
-
-# Welcome message
-print("Welcome to Bathyscaphe Depths RTP Simulation!")
-
-# Get user inputs
-rtp = float(input("Enter desired RTP (e.g., 97 for 97%): "))
-num_cycles = int(input("Enter number of cycles to simulate: "))
-
-# Initialize tracking variables
-total_spent = 0
-total_winnings = 0
-payouts = []  # List to store all payouts
-max_win = 0   # Tracks maximum won
-max_potential_win = 0  # Tracks maximum potential win
-bet = 1.0     # Fixed bet amount for simplicity
-
-# Run the simulation
-for cycle in range(num_cycles):
-    # Random game parameters
-    M = random.uniform(1.1, 10.0)  # Auto-cashout multiplier
-    send_multiplier = random.uniform(1.1, M) if random.random() < 0.5 else 0
-    send_percentage = random.uniform(0, 100) if send_multiplier > 0 else 0
-    M_f = random.uniform(1.1, 3.0) if random.random() < 0.5 else 0
-    fireproof_cost = calculate_fireproof_cost(bet, M_f, rtp) if M_f > 0 else 0
-
-    # Update total spent
-    total_spent += bet + fireproof_cost
-
-    # Generate crash point
-    C = generate_crash_point(rtp)
-
-    # Calculate payouts
-    fireproof_payout = bet * M_f if M_f > 0 and C >= M_f else 0
-    if send_multiplier > 0 and C >= send_multiplier:
-        send_amount = (send_percentage / 100) * bet * send_multiplier
-        remaining_bet = (1 - send_percentage / 100) * bet
+        results = simulate_cycles(rtp, num_cycles, server_seed=server_seed)
+
+    # Display results
+    print(f"\nSimulation Complete")
+    print(f"Total cycles: {num_cycles}")
+    print(f"Total spent: {results['total_spent']:.2f}")
+    print(f"Total winnings: {results['total_winnings']:.2f}")
+    print(f"Achieved RTP: {results['achieved_rtp']:.2f}% (Target RTP: {rtp}%)")
+    print(f"Maximum won: {results['max_win']:.2f}")
+    print(f"Maximum potential win: {results['max_potential_win']:.2f}")
+    print(f"Mathematical expectation (RTP): {results['achieved_rtp']:.2f}%")
+    print(f"Average win: {results['average_win']:.2f}")
+    print(f"Standard deviation: {results['std_dev']:.2f}")
+    if fair:
+        print(f"Server seed: {server_seed.hex()}")
     else:
-        send_amount = 0
-        remaining_bet = bet
-    payout = remaining_bet * M if C >= M else 0
-
-    # Total payout for this cycle, capped at 11000x bet
-    cycle_payout = min(fireproof_payout + send_amount + payout, 11000 * bet)
-    payouts.append(cycle_payout)
-
-    # Update maximum win
-    if cycle_payout > max_win:
-        max_win = cycle_payout
-
-    # Update maximum potential win (capped at 11000x)
-    potential_win = min(bet * C, 11000 * bet)
-    if potential_win > max_potential_win:
-        max_potential_win = potential_win
-
-    # Update total winnings
-    total_winnings += cycle_payout
-
-# Calculate statistics
-average_win = statistics.mean(payouts) if payouts else 0
-std_dev = statistics.stdev(payouts) if len(payouts) > 1 else 0
-achieved_rtp = (total_winnings / total_spent) * 100 if total_spent > 0 else 0
-
-# Display results
-print(f"\nSimulation Complete")
-print(f"Total cycles: {num_cycles}")
-print(f"Total spent: {total_spent:.2f}")
-print(f"Total winnings: {total_winnings:.2f}")
-print(f"Achieved RTP: {achieved_rtp:.2f}% (Target RTP: {rtp}%)")
-print(f"Maximum won: {max_win:.2f}")
-print(f"Maximum potential win: {max_potential_win:.2f}")
-print(f"Mathematical expectation (RTP): {achieved_rtp:.2f}%")
-print(f"Average win: {average_win:.2f}")
-print(f"Standard deviation: {std_dev:.2f}")
\ No newline at end of file
+        print(f"NumPy seed: {seed}")
+
+if __name__ == "__main__":
+    main()
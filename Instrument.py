@@ -0,0 +1,178 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_NO_PHASE = nullcontext()
+
+
+def new_metrics(progress=0.0, profile=False, interval=0.005, label=""):
+    """
+    Run metrics of a simulation. The simulators take metrics=None to mean
+    "not instrumented", and every function here accepts None and returns at
+    once, so a run without metrics pays one `is None` check per round.
+      phases:   seconds spent in each named phase (phase())
+      counters: rounds, steps, RNG draws, ... (count())
+      progress: seconds between progress lines (0 for none; report_progress())
+      profile:  sample the running stack every `interval` seconds from a
+                background thread (start_profiler()), which costs the
+                simulation nothing per call
+    """
+    return {"label": label, "began": time.perf_counter(), "phases": {}, "counters": Counter(),
+            "progress": progress, "last_progress": time.perf_counter(), "profile": profile, "interval": interval,
+            "samples": {"self": Counter(), "total": Counter(), "count": 0}, "sampler": None}
+
+
+@contextmanager
+def _timed(metrics, name):
+    began = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases = metrics["phases"]
+        phases[name] = phases.get(name, 0.0) + time.perf_counter() - began
+
+
+def phase(metrics, name):
+    """Context manager adding the time spent in it to the named phase."""
+    return _NO_PHASE if metrics is None else _timed(metrics, name)
+
+
+def count(metrics, name, n=1):
+    """Add n to the named counter."""
+    if metrics is not None:
+        metrics["counters"][name] += int(n)
+
+
+def report_progress(metrics, done, total, unit="rounds"):
+    """Print a progress line if `progress` seconds have passed since the last one."""
+    if metrics is None or not metrics["progress"]:
+        return
+    now = time.perf_counter()
+    if now - metrics["last_progress"] < metrics["progress"]:
+        return
+    metrics["last_progress"] = now
+    elapsed = now - metrics["began"]
+    rate = done / elapsed if elapsed > 0 else 0
+    eta = f", ETA {(total - done) / rate:.0f} s" if rate and total else ""
+    label = f"{metrics['label']} " if metrics["label"] else ""
+    share = f"/{total:,} ({done / total:.0%})" if total else ""
+    print(f"[{elapsed:.1f} s] {label}{done:,}{share} {unit}, {rate:,.0f} {unit}/s{eta}",
+          file=sys.stderr, flush=True)
+
+
+def _sample(metrics, thread_id, stop):
+    samples = metrics["samples"]
+    while not stop.wait(metrics["interval"]):
+        frame = sys._current_frames().get(thread_id)
+        if frame is None:
+            continue
+        samples["count"] += 1
+        samples["self"][_where(frame)] += 1
+        seen = set()
+        while frame is not None:
+            seen.add(_where(frame))
+            frame = frame.f_back
+        samples["total"].update(seen)
+
+
+def _where(frame):
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+def start_profiler(metrics):
+    """Start sampling the calling thread's stack (if the metrics ask for profiling)."""
+    if metrics is None or not metrics["profile"] or metrics["sampler"]:
+        return
+    stop = threading.Event()
+    thread = threading.Thread(target=_sample, args=(metrics, threading.get_ident(), stop), daemon=True)
+    metrics["sampler"] = (thread, stop)
+    thread.start()
+
+
+def stop_profiler(metrics):
+    if metrics is None or not metrics["sampler"]:
+        return
+    thread, stop = metrics["sampler"]
+    stop.set()
+    thread.join()
+    metrics["sampler"] = None
+
+
+def metrics_state(metrics):
+    """The picklable part of the metrics, to send back from a worker process."""
+    stop_profiler(metrics)
+    return {key: metrics[key] for key in ("phases", "counters", "samples")}
+
+
+def merge_metrics(metrics, state):
+    """Add a worker's metrics_state (its phases as CPU seconds) into metrics."""
+    if metrics is None:
+        return
+    for name, seconds in state["phases"].items():
+        metrics["phases"][name] = metrics["phases"].get(name, 0.0) + seconds
+    metrics["counters"].update(state["counters"])
+    for key in ("self", "total"):
+        metrics["samples"][key].update(state["samples"][key])
+    metrics["samples"]["count"] += state["samples"]["count"]
+
+
+def peak_rss_mb():
+    """
+    Largest peak resident memory of a single process of the run, in MB (None
+    where unknown): this process or its largest finished worker. The OS only
+    keeps each process's maximum, so the run's total peak is not known.
+    """
+    if resource is None:
+        return None
+    peak = max(resource.getrusage(who).ru_maxrss for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN))
+    return peak / (1 << 20 if sys.platform == "darwin" else 1 << 10)  # Bytes on macOS, KB elsewhere
+
+
+def finish_metrics(metrics, top=15):
+    """Stop the profiler and return the run's metrics as a JSON-ready dict."""
+    if metrics is None:
+        return None
+    stop_profiler(metrics)
+    wall = time.perf_counter() - metrics["began"]
+    counters = dict(metrics["counters"])
+    rounds = counters.get("rounds", 0)
+    report = {
+        "wall_seconds": wall,
+        "phases": metrics["phases"],
+        "counters": counters,
+        "rates": {f"{name}_per_sec": n / wall for name, n in counters.items() if wall > 0},
+        "rng_draws_per_round": counters["rng_draws"] / rounds if rounds and "rng_draws" in counters else None,
+        "steps_per_round": counters["steps"] / rounds if rounds and "steps" in counters else None,
+        "peak_rss_mb_largest_process": peak_rss_mb(),
+    }
+    samples = metrics["samples"]
+    if samples["count"]:
+        report["profile"] = {
+            "samples": samples["count"],
+            "interval": metrics["interval"],
+            "functions": [{"function": where, "self": n / samples["count"] * 100,
+                           "total": samples["total"][where] / samples["count"] * 100}
+                          for where, n in samples["self"].most_common(top)],
+        }
+    return report
+
+
+def write_metrics(report, path="-"):
+    """Write finish_metrics' report as JSON to path ("-" for stderr)."""
+    if path == "-":
+        json.dump(report, sys.stderr, indent=2)
+        sys.stderr.write("\n")
+        return
+    with open(path, "w") as out:
+        json.dump(report, out, indent=2)
+        out.write("\n")
@@ -1,32 +1,39 @@
-import random
-import time
-
-
-def generate_crash_point(rtp, mode="Normal"):
-    """
-    Generate a random crash point based on RTP (97%).
-    For Additional MAX, scale down to balance higher cost and meta-multipliers.
-    """
-    u = random.random()
-    if mode == "Additional MAX":
-        # Scale crash point to balance 300x cost and guaranteed 10x meta-multiplier
-        # Adjusted to maintain RTP of 97% over 300x bet
-        scale_factor = 0.03233  # Approx 1/30.9 to offset 300x cost and ~10x meta-multiplier
-        if u < 1 - (rtp / 100) * scale_factor:
-            return 1.0
-        else:
-            return min((rtp / 100) * scale_factor / (1 - u), 50000)
-    else:
-        # Normal and Additional modes use standard distribution
-        if u < 1 - (rtp / 100):
-            return 1.0
-        else:
-            return min((rtp / 100) / (1 - u), 50000)
-
-
-def generate_meta_multiplier():
-    """Generate a random meta-multiplier between 2x and 100x."""
-    return random.randint(2, 100)
+import asyncio
+import sys
+import threading
+
+from AscentEngine import AscentEngine
+from GameMath import MODES
+from RoundJournal import ASCENT_JOURNAL as JOURNAL_PATH, append_round, open_journal
+
+
+def read_commands(loop, commands):
+    """Pass typed lines to the event loop so the climb never waits on input."""
+    for line in sys.stdin:
+        loop.call_soon_threadsafe(commands.put_nowait, line.strip().lower())
+
+
+def show_step(climb, multiplier, new_meta):
+    print(f"Current Multiplier: {multiplier:.1f}x")
+    if new_meta is not None:
+        print(f"Collected Meta-Multiplier: x{new_meta}")
+
+
+async def play(engine, mode, base_bet):
+    """Climb in real time until the player cashes out or the tower collapses."""
+    runner = asyncio.create_task(engine.run(until_idle=True))
+    climb = engine.start_climb(mode, base_bet, on_step=show_step)
+    commands = asyncio.Queue()
+    threading.Thread(target=read_commands, args=(asyncio.get_running_loop(), commands), daemon=True).start()
+    while not climb.done.done():
+        command = asyncio.ensure_future(commands.get())
+        await asyncio.wait([command, climb.done], return_when=asyncio.FIRST_COMPLETED)
+        if not command.done():
+            command.cancel()
+        elif command.result() == 'c':
+            engine.cashout(climb)
+    await runner
+    return climb.result
 
 
 # Welcome message
@@ -61,52 +68,32 @@ else:
 bet = base_bet * bet_multiplier
 print(f"\nMode: {mode}, Total Bet: {bet:.2f}")
 
-# Generate crash point based on mode
-crash_point = generate_crash_point(rtp, mode)
-
-# Initialize game state
-multiplier = 1.0
-step = 0.1
-meta_multipliers = []
-if mode == "Additional MAX":
-    meta_multipliers.append(10)  # Guaranteed 10x at start
-running = True
+# Provably fair round: commit to the server seed before the climb, reveal it after
+engine = AscentEngine(rtp)
+print(f"Server seed hash: {engine.commitment}")
 
-print("The knight begins climbing the tower... Press 'c' to cash out, or wait!")
-
-# Game loop
-while running:
-    print(f"Current Multiplier: {multiplier:.1f}x")
+print("The knight begins climbing the tower... Type 'c' and Enter to cash out, or wait!")
 
-    # Chance to get a meta-multiplier in Additional modes
-    if mode in ["Additional", "Additional MAX"] and random.random() < 0.1:  # 10% chance per step
-        new_meta = generate_meta_multiplier()
-        meta_multipliers.append(new_meta)
-        print(f"Collected Meta-Multiplier: x{new_meta}")
-
-    # Check for crash
-    if multiplier >= crash_point:
-        print(f"\nThe tower collapses at {crash_point:.1f}x! You lose.")
-        total_win = 0
-        running = False
-    else:
-        # Player input to cash out
-        choice = input("Press 'c' to cash out, or Enter to continue: ").lower()
-        if choice == 'c':
-            total_meta = 1
-            for m in meta_multipliers:
-                total_meta *= m
-            total_win = bet * multiplier * total_meta
-   #         total_win = min(total_win, base_bet * 50000)  # Cap at 50,000x base bet
-            print(f"\nCashed out at {multiplier:.1f}x!")
-            if meta_multipliers:
-                print(f"Meta-Multipliers: {', '.join(f'x{m}' for m in meta_multipliers)}")
-                print(f"Total Multiplier: {multiplier:.1f} * {total_meta} = {multiplier * total_meta:.1f}x")
-            print(f"Total Win: {total_win:.2f}")
-            running = False
-        else:
-            multiplier += step
-            time.sleep(0.1)  # Simulate real-time progression
+# The climb runs on the clock; cashout commands are read in the background
+result = asyncio.run(play(engine, mode, base_bet))
+total_win = result["total_win"]
+if result["cashout_step"] < 0:
+    print(f"\nThe tower collapses at {result['crash_point']:.1f}x! You lose.")
+else:
+    multiplier, meta_multipliers = result["multiplier"], result["meta_multipliers"]
+#   total_win = min(total_win, base_bet * 50000)  # Cap at 50,000x base bet
+    print(f"\nCashed out at {multiplier:.1f}x!")
+    if meta_multipliers:
+        print(f"Meta-Multipliers: {', '.join(f'x{m}' for m in meta_multipliers)}")
+        print(f"Total Multiplier: {multiplier:.1f} * {result['total_meta']} = {multiplier * result['total_meta']:.1f}x")
+    print(f"Total Win: {total_win:.2f}")
+
+# Record the round for replay
+with open_journal(JOURNAL_PATH, "ascent") as journal:
+    index = append_round(journal, engine.server_seed, result["round_index"], rtp, MODES.index(mode), base_bet,
+                         result["cashout_step"], total_win)
+print(f"Journal round #{index} ({JOURNAL_PATH})")
+print(f"Server seed: {engine.server_seed.hex()}")
 
 # End of game
-print(f"\nGame Over!")
\ No newline at end of file
+print(f"\nGame Over!")
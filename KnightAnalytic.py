@@ -0,0 +1,173 @@
+import math
+
+import numpy as np
+
+from CrashRound import step_grid
+from GameMath import CASHOUT_HIGH, CASHOUT_LOW, MODES, VARIANTS, classify_volatility
+
+
+def win_probability(config, rtp, multiplier):
+    """P(crash point > multiplier) under generate_crash_point, for multiplier >= 1."""
+    scaled_rtp = (rtp / 100) * config["crash_scale"]
+    return min(scaled_rtp / multiplier, scaled_rtp * config["threshold_scale"], 1.0)
+
+
+def meta_distributions(config, max_steps, limit=None):
+    """
+    Yield (steps, values, probs, overflow) for steps = 0..max_steps.
+
+    values/probs give the exact distribution of the total meta-multiplier after
+    that many 0.1 steps. For the product rule only products below `limit` are
+    tracked and the remaining probability is returned as overflow (every such
+    round hits the cap). The sum rule is tracked exactly.
+    """
+    p = config["meta_prob"]
+    lo, hi = config["meta_range"]
+    w = p / (hi - lo + 1)
+    initial = config["initial_metas"]
+
+    if config["meta_rule"] == "sum":
+        # dist[s] = P(collected metas sum to s); s == 0 means none collected
+        dist = np.zeros(1)
+        dist[0] = 1.0
+        init_sum = sum(initial)
+        for steps in range(max_steps + 1):
+            values = (init_sum + np.arange(len(dist))) / config["meta_divisor"]
+            if not initial:
+                values[0] = 1  # No metas at all leaves the payout unscaled
+            yield steps, values, dist, 0.0
+            if p == 0:
+                continue
+            # P(sum = s) after one more step: keep with 1 - p, or add v in [lo, hi]
+            size = len(dist) + hi
+            cumulative = np.concatenate((np.zeros(hi + 1), np.cumsum(dist), np.full(hi, dist.sum())))
+            new = w * (cumulative[hi - lo + 1:hi - lo + 1 + size] - cumulative[:size])
+            new[:len(dist)] += (1 - p) * dist
+            dist = new
+    else:
+        init_product = math.prod(initial)
+        # dist[k] = P(collected metas multiply to k), for k < limit
+        dist = np.zeros(limit)
+        dist[1] = 1.0
+        overflow = 0.0
+        index = np.arange(limit)
+        # One step: keep with 1 - p, or multiply by v in [lo, hi] (index pairs precomputed)
+        sources, targets, overflowing = [], [], []
+        for v in range(lo, hi + 1):
+            inside = index * v < limit
+            sources.append(index[inside])
+            targets.append(index[inside] * v)
+            overflowing.append(index[~inside])
+        sources, targets = np.concatenate(sources), np.concatenate(targets)
+        overflowing = np.concatenate(overflowing)
+        for steps in range(max_steps + 1):
+            yield steps, init_product * index, dist, overflow
+            if p == 0:
+                continue
+            overflow += w * dist[overflowing].sum()  # Products only grow, so overflow stays put
+            dist = (1 - p) * dist + w * np.bincount(targets, weights=dist[sources], minlength=limit)
+
+
+def analyze_mode(config, rtp, base_bet=1.0):
+    """
+    Exact expected payout, variance, hit rate and max-win rate of one mode.
+
+    The cashout target X is uniform on [1.1, 50), the climb takes k(X) 0.1 steps
+    (the first float grid value >= X), wins with P(crash point > grid value) and
+    collects metas on each of the k steps. Within each grid interval k is fixed,
+    so the min(bet * X * F, cap) payout is integrated over X in closed form.
+    """
+    bet = base_bet * config["bet_multiplier"]
+    cap = base_bet * config["cap"]
+    grid = step_grid(0.1)
+    first_step = grid.index(CASHOUT_LOW)
+    last_step = grid.index(CASHOUT_HIGH)
+    width = CASHOUT_HIGH - CASHOUT_LOW
+
+    limit = 2  # Without metas the product stays at 1
+    if config["meta_rule"] == "product" and config["meta_prob"] > 0:
+        limit = math.ceil(cap / (bet * CASHOUT_LOW * math.prod(config["initial_metas"]))) + 1
+
+    mean = second = hit = max_win = 0.0
+    for steps, values, probs, overflow in meta_distributions(config, last_step, limit):
+        if steps < first_step:
+            continue
+        lo = max(grid.value(steps - 1), CASHOUT_LOW) if steps > 0 else CASHOUT_LOW
+        hi = min(grid.value(steps), CASHOUT_HIGH)
+        if hi <= lo:
+            continue
+        weight = (hi - lo) / width * win_probability(config, rtp, grid.value(steps))
+
+        mask = probs > 0
+        slope = bet * values[mask]
+        probs = probs[mask]
+        # Cashout target above which the payout is capped, clipped to [lo, hi]
+        x_cap = np.minimum(np.maximum(cap / slope, lo), hi)
+        below = (x_cap - lo) / (hi - lo)
+        e1 = below * slope * (lo + x_cap) / 2 + (1 - below) * cap
+        e2 = below * slope ** 2 * (lo * lo + lo * x_cap + x_cap * x_cap) / 3 + (1 - below) * cap ** 2
+
+        mean += weight * (probs @ e1 + overflow * cap)
+        second += weight * (probs @ e2 + overflow * cap ** 2)
+        max_win += weight * (probs @ (1 - below) + overflow)
+        hit += weight
+
+    variance = second - mean ** 2
+    return {
+        "bet": bet,
+        "rtp": mean / bet * 100,
+        "mean": mean,
+        "second_moment": second,
+        "variance": variance,
+        "sd": math.sqrt(max(variance, 0)),
+        "hit_rate": hit * 100,
+        "max_win_rate": max_win * 100,
+    }
+
+
+def analyze_variant(variant, rtp, base_bet=1.0, mix=None):
+    """
+    Exact per-mode and overall results of a stats script.
+    mix gives each mode's share of rounds (equal shares, like random.choice, by default).
+    """
+    mix = mix or {mode: 1 / len(MODES) for mode in MODES}
+    results = {mode: analyze_mode(VARIANTS[variant][mode], rtp, base_bet) for mode in MODES}
+    for r in results.values():
+        r["volatility"] = classify_volatility(r["hit_rate"], r["sd"])
+
+    mean = sum(mix[m] * results[m]["mean"] for m in MODES)
+    second = sum(mix[m] * results[m]["second_moment"] for m in MODES)
+    sd = math.sqrt(max(second - mean ** 2, 0))
+    hit_rate = sum(mix[m] * results[m]["hit_rate"] for m in MODES)
+    results["Overall"] = {
+        "bet": sum(mix[m] * results[m]["bet"] for m in MODES),
+        "rtp": mean / sum(mix[m] * results[m]["bet"] for m in MODES) * 100,
+        "mean": mean,
+        "second_moment": second,
+        "variance": sd ** 2,
+        "sd": sd,
+        "hit_rate": hit_rate,
+        "max_win_rate": sum(mix[m] * results[m]["max_win_rate"] for m in MODES),
+        "volatility": classify_volatility(hit_rate, sd),
+    }
+    return results
+
+
+if __name__ == "__main__":
+    print("Welcome to the Knight's Ascent Analytic RTP Calculator!")
+
+    variants = list(VARIANTS)
+    for i, name in enumerate(variants, 1):
+        print(f"{i}. {name}")
+    variant = variants[int(input(f"Enter variant (1-{len(variants)}): ")) - 1]
+    rtp = float(input("Enter desired RTP (e.g., 95 for 95%): "))
+    base_bet = float(input("Enter standard bet amount (e.g., 1.0): "))
+
+    for mode, r in analyze_variant(variant, rtp, base_bet).items():
+        print(f"\n**{mode} Mode Results**" if mode != "Overall" else "\n**Overall Results**")
+        print(f"RTP: {r['rtp']:.4f}%")
+        print(f"Mean Payout: {r['mean']:.4f}")
+        print(f"Standard Deviation: {r['sd']:.4f}")
+        print(f"Hit Rate: {r['hit_rate']:.4f}%")
+        print(f"Max Win Rate: {r['max_win_rate']:.6f}%")
+        print(f"Volatility: {r['volatility']}")
@@ -0,0 +1,352 @@
+import math
+import random
+import time
+
+import numpy as np
+
+from Calibrator import CACHE_PATH, cached_calibrate, calibrate, fingerprint
+from GameMath import BET_MULTIPLIERS
+from Instrument import count
+
+# The Knight's Ascent Markov model: one state per 0.1 step from 1.0x to 50.0x
+MULTIPLIERS = [1.0 + 0.1 * i for i in range(491)]
+INITIAL_CRASH_PROBS = {"Normal": 0.0118, "Additional": 0.0105, "Additional MAX": 0.0050}
+CASHOUT_PROB = 0.02  # Fixed for simplicity
+
+
+def compile_chain(multipliers, crash_prob, cashout_prob):
+    """
+    Banded form of create_transition_matrix: per-state crash, cashout and
+    continue probabilities. The transient part of the chain only ever moves
+    from state i to i + 1, so these three arrays describe it completely.
+    """
+    n = len(multipliers)
+    cont = np.full(n, 1 - crash_prob - cashout_prob)
+    cont[-1] = 0  # The last multiplier has no state above it
+    return {
+        "multipliers": np.asarray(multipliers, dtype=float),
+        "crash": np.full(n, crash_prob),
+        "cashout": np.full(n, cashout_prob),
+        "continue": cont,
+    }
+
+
+def kernel_tables(chain):
+    """
+    Per-state thresholds for simulate_chain_round as plain lists (built once per
+    chain and kept on it): a uniform below crash_below[i] crashes at state i,
+    below stop_below[i] cashes out, anything else continues.
+    """
+    if "tables" not in chain:
+        crash = chain["crash"]
+        chain["tables"] = (crash.tolist(), (crash + chain["cashout"]).tolist(), chain["multipliers"].tolist())
+    return chain["tables"]
+
+
+def simulate_chain_round(chain, bet, mode, meta_prob=0.05, rng=random):
+    """
+    Simulate one round on a compiled chain, drawing exactly as simulate_round
+    did on the dense matrix (so a seeded run gives the same payouts).
+    """
+    crash_below, stop_below, multipliers = kernel_tables(chain)
+    collects_metas = mode in ["Additional", "Additional MAX"]
+    meta_sum = 1 if mode == "Additional MAX" else 0  # Guaranteed 1x for MAX
+    n = len(multipliers)
+
+    for state in range(n):
+        r = rng.random()
+        if r < crash_below[state]:  # Crash
+            return 0
+        if r < stop_below[state]:  # Cashout
+            return min(bet * multipliers[state] * (1 + meta_sum), bet * 50000)
+        if collects_metas and rng.random() < meta_prob:
+            meta_sum += rng.uniform(1.0, 5.0)
+    return bet * multipliers[-1] * (1 + meta_sum)  # Max multiplier if reached
+
+
+def homogeneous_probs(chain):
+    """The (crash, cashout) probability shared by every state; ValueError if they differ."""
+    crash, cashout = chain["crash"], chain["cashout"]
+    if not (np.all(crash == crash[0]) and np.all(cashout == cashout[0])):
+        raise ValueError("Geometric sampling needs the same crash and cashout probability in every state")
+    return float(crash[0]), float(cashout[0])
+
+
+def log_continue(p):
+    """log(1 - p), the scale of a geometric draw (-inf for p = 1, 0 for p = 0)."""
+    return math.log1p(-p) if p < 1 else -math.inf
+
+
+def geometric_failures(u, log_q):
+    """Failures before the first success, from one uniform u and log_q = log_continue(p)."""
+    if log_q == 0:
+        return math.inf
+    return int(math.log(1 - u) / log_q)
+
+
+def jump_tables(chain):
+    """Constants of sample_chain_round, built once per chain and kept on it."""
+    if "jump" not in chain:
+        crash_prob, cashout_prob = homogeneous_probs(chain)
+        absorb = crash_prob + cashout_prob
+        chain["jump"] = (crash_prob, absorb, log_continue(absorb), chain["multipliers"].tolist())
+    return chain["jump"]
+
+
+def sample_chain_round(chain, bet, mode, meta_prob=0.05, rng=random):
+    """
+    Same payout distribution as simulate_chain_round, without walking the states.
+
+    Every state absorbs with the same probability crash + cashout, so the number
+    of steps up is geometric (running off the top after n of them) and the
+    outcome is crash or cashout in proportion. Metas are drawn on each step up,
+    so their count is binomial; it is sampled by jumping geometric gaps between
+    successes, which takes one draw per meta instead of one per step.
+    """
+    crash_prob, absorb, log_q, multipliers = jump_tables(chain)
+    n = len(multipliers)
+
+    steps = geometric_failures(rng.random(), log_q)
+    if steps < n:
+        if rng.random() * absorb < crash_prob:  # Crash
+            return 0
+        state = steps
+    else:
+        steps, state = n, n - 1  # Ran past the last multiplier
+
+    meta_sum = 1 if mode == "Additional MAX" else 0  # Guaranteed 1x for MAX
+    if mode in ["Additional", "Additional MAX"]:
+        log_meta = log_continue(meta_prob)
+        position = geometric_failures(rng.random(), log_meta) + 1
+        while position <= steps:
+            meta_sum += rng.uniform(1.0, 5.0)
+            position += geometric_failures(rng.random(), log_meta) + 1
+
+    payout = bet * multipliers[state] * (1 + meta_sum)
+    return payout if steps == n else min(payout, bet * 50000)
+
+
+def sample_chain_rounds(chain, bet, mode, size, meta_prob=0.05, rng=None, metrics=None):
+    """
+    Vectorized sample_chain_round: payouts of `size` rounds from a NumPy
+    Generator. With metrics, the steps climbed and the values drawn are counted.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    crash_prob, cashout_prob = homogeneous_probs(chain)
+    multipliers = chain["multipliers"]
+    n = len(multipliers)
+    absorb = crash_prob + cashout_prob
+
+    if absorb > 0:
+        steps = np.minimum(rng.geometric(absorb, size) - 1, n)
+    else:
+        steps = np.full(size, n)
+    top = steps == n
+    paid = top | (~top & (rng.random(size) * absorb >= crash_prob))
+    state = np.minimum(steps, n - 1)
+
+    draws = (2 if absorb > 0 else 1) * size
+    meta_sum = np.full(size, 1.0 if mode == "Additional MAX" else 0.0)
+    if mode in ["Additional", "Additional MAX"] and meta_prob > 0:
+        # Only paid rounds need their metas; crashed rounds pay 0 whatever they collected
+        counts = rng.binomial(steps[paid], meta_prob)
+        owners = np.repeat(np.flatnonzero(paid), counts)
+        meta_sum += np.bincount(owners, weights=rng.uniform(1.0, 5.0, counts.sum()), minlength=size)
+        draws += len(counts) + int(counts.sum())
+    if metrics is not None:
+        count(metrics, "steps", steps.sum())
+        count(metrics, "rng_draws", draws)
+
+    payouts = bet * multipliers[state] * (1 + meta_sum)
+    payouts = np.where(top, payouts, np.minimum(payouts, bet * 50000))
+    payouts[~paid] = 0
+    return payouts
+
+
+def chain_from_matrix(P):
+    """Extract the banded chain from a dense (n + 2) x (n + 2) transition matrix."""
+    n = P.shape[0] - 2
+    cont = np.zeros(n)
+    cont[:-1] = np.diagonal(P[:n, :n], offset=1)
+    return {"multipliers": None, "crash": P[:n, n].copy(), "cashout": P[:n, n + 1].copy(), "continue": cont}
+
+
+def absorption_probabilities(chain):
+    """
+    Probability of ending in crash / cashout from every transient state.
+    Same as the rows of N @ R with N = inv(I - Q), but solved by the backward
+    recurrence b[i] = r[i] + q[i] * b[i + 1] in O(n).
+    """
+    crash, cashout, cont = chain["crash"], chain["cashout"], chain["continue"]
+    n = len(cont)
+    b_crash = np.empty(n)
+    b_cashout = np.empty(n)
+    b_crash[-1] = crash[-1]
+    b_cashout[-1] = cashout[-1]
+    for i in range(n - 2, -1, -1):
+        b_crash[i] = crash[i] + cont[i] * b_crash[i + 1]
+        b_cashout[i] = cashout[i] + cont[i] * b_cashout[i + 1]
+    return b_crash, b_cashout
+
+
+def cashout_absorption(chain):
+    """
+    Vectorized cashout absorption probabilities for a chain whose continue
+    probability is the same q in every state but the last (compile_chain's shape):
+    b[i] = cashout * (1 - q^(n - i)) / (1 - q).
+    """
+    cont = chain["continue"]
+    q = cont[0] if len(cont) > 1 else 0.0
+    if len(cont) > 1 and not (np.all(cont[:-1] == q) and np.all(chain["cashout"] == chain["cashout"][0])):
+        return absorption_probabilities(chain)[1]
+    cashout = chain["cashout"][0]
+    remaining = np.arange(len(cont), 0, -1)
+    if q == 1:
+        return cashout * remaining.astype(float)
+    return cashout * (1 - q ** remaining) / (1 - q)
+
+
+def expected_payout(chain, bet, meta_multipliers=None):
+    """Expected payout of the chain, as compute_expected_payout but without an n x n inverse."""
+    multipliers = chain["multipliers"]
+    b_cashout = cashout_absorption(chain)
+    payouts = bet * multipliers
+    if meta_multipliers:
+        for i, metas in meta_multipliers.items():
+            meta_sum = sum(metas) if metas else 0
+            payouts[i] = bet * multipliers[i] * (1 + meta_sum)
+    return float(b_cashout @ np.minimum(payouts, bet * 50000))  # Cashout payout, capped
+
+
+def round_expected_payout(chain, bet, meta_factors=None, cap_multiplier=50000):
+    """
+    Expected payout of one round started at state 0, as simulate_chain_round plays it.
+
+    State i is reached with probability q[0] * ... * q[i - 1] and cashes out
+    there with cashout[i]; a round that continues past the last state pays the
+    last multiplier uncapped. meta_factors[i] is the expected (1 + meta sum) on
+    cashing out at state i, with one extra entry for running off the top.
+    """
+    multipliers = chain["multipliers"]
+    cont = chain["continue"]
+    n = len(multipliers)
+    factors = np.ones(n + 1) if meta_factors is None else np.asarray(meta_factors, dtype=float)
+    reach = np.ones(n)
+    reach[1:] = np.cumprod(cont[:-1])
+    payouts = np.minimum(bet * multipliers * factors[:n], bet * cap_multiplier)
+    past_top = reach[-1] * (1 - chain["crash"][-1] - chain["cashout"][-1])
+    return float(reach @ (chain["cashout"] * payouts) + past_top * bet * multipliers[-1] * factors[n])
+
+
+def expected_meta_factors(n, mode, meta_prob=0.05):
+    """
+    Expected (1 + meta sum) on cashing out at each state of sample_chain_round,
+    plus one entry for running past the last state. A meta is drawn with
+    meta_prob on each step up, averaging 3 (uniform 1 to 5).
+    """
+    if mode not in ["Additional", "Additional MAX"]:
+        return np.ones(n + 1)
+    initial = 1 if mode == "Additional MAX" else 0
+    return 1 + initial + 3.0 * meta_prob * np.arange(n + 1)
+
+
+def calibrate_crash_probs(rtp, multipliers=MULTIPLIERS, cashout_prob=CASHOUT_PROB, rel_tol=1e-6,
+                          cap_multiplier=50000, path=CACHE_PATH):
+    """Per-mode crash probability giving the target RTP (cached calibration results)."""
+    results = {}
+    for mode, bet_multiplier in BET_MULTIPLIERS.items():
+        meta_factors = expected_meta_factors(len(multipliers), mode)
+        guess, bounds = INITIAL_CRASH_PROBS[mode], (0, 1 - cashout_prob)
+
+        def mode_rtp(crash_prob):
+            chain = compile_chain(multipliers, crash_prob, cashout_prob)
+            return round_expected_payout(chain, bet_multiplier, meta_factors, cap_multiplier) / bet_multiplier * 100
+
+        # The meta model enters only through meta_factors, so its digest stands for it
+        params = {"multipliers": fingerprint(list(multipliers)), "cashout_prob": cashout_prob,
+                  "bet_multiplier": bet_multiplier, "meta_factors": fingerprint(meta_factors.tolist()),
+                  "cap_multiplier": cap_multiplier, "rel_tol": rel_tol, "guess": guess, "bounds": list(bounds)}
+        results[mode] = cached_calibrate(
+            "markov", mode, rtp, params, lambda: calibrate(mode_rtp, rtp, guess, bounds, rel_tol), path)
+    return results
+
+
+def dense_expected_payout(multipliers, crash_prob, cashout_prob, bet):
+    """Reference: the original dense fundamental-matrix computation."""
+    n = len(multipliers)
+    P = np.zeros((n + 2, n + 2))
+    for i in range(n):
+        if i < n - 1:
+            P[i, i + 1] = 1 - crash_prob - cashout_prob
+        P[i, n] = crash_prob
+        P[i, n + 1] = cashout_prob
+    P[n, n] = 1
+    P[n + 1, n + 1] = 1
+    N = np.linalg.inv(np.eye(n) - P[:n, :n])
+    B = N @ P[:n, n:]
+    return float(B[:, 1] @ np.minimum(bet * np.asarray(multipliers), bet * 50000))
+
+
+def time_tuning(multipliers, crash_prob, cashout_prob, bet, target_payout, evaluate, steps):
+    """Time `steps` iterations of the script's +/-0.0001 crash probability search."""
+    start = time.perf_counter()
+    for _ in range(steps):
+        expected = evaluate(multipliers, crash_prob, cashout_prob, bet)
+        crash_prob += 0.0001 if expected > target_payout else -0.0001
+    return time.perf_counter() - start
+
+
+def benchmark(state_counts=(491, 5000, 50000), steps=1000, dense_limit=5000, rtp=95.0):
+    """Time the crash probability tuning loop with the dense and banded solvers."""
+    def banded(multipliers, crash_prob, cashout_prob, bet):
+        return expected_payout(compile_chain(multipliers, crash_prob, cashout_prob), bet)
+
+    def dense(multipliers, crash_prob, cashout_prob, bet):
+        return dense_expected_payout(multipliers, crash_prob, cashout_prob, bet)
+
+    for n in state_counts:
+        multipliers = np.linspace(1.0, 50.0, n)
+        # Keep the per-state probabilities comparable to the 491-state model
+        scale = 491 / n
+        crash_prob, cashout_prob = 0.0118 * scale, 0.02 * scale
+        bet = 1.0
+        target = bet * rtp / 100
+
+        banded_time = time_tuning(multipliers, crash_prob, cashout_prob, bet, target, banded, steps)
+        print(f"\n{n} multiplier states, {steps} tuning steps")
+        print(f"Banded: {banded_time:.3f} s ({banded_time / steps * 1000:.3f} ms per step)")
+        if n <= dense_limit:
+            # Time a few dense steps and scale up; a full dense run takes hours at 5,000 states
+            dense_steps = max(1, min(steps, int(steps * 491 / n) // 10))
+            dense_time = time_tuning(multipliers, crash_prob, cashout_prob, bet, target, dense, dense_steps)
+            dense_time *= steps / dense_steps
+            difference = abs(dense(multipliers, crash_prob, cashout_prob, bet)
+                             - banded(multipliers, crash_prob, cashout_prob, bet))
+            print(f"Dense:  {dense_time:.3f} s ({dense_time / steps * 1000:.3f} ms per step, "
+                  f"{dense_time / banded_time:.0f}x slower, |difference| = {difference:.2e})")
+        else:
+            print(f"Dense:  skipped ({(n + 2) ** 2 * 8 / 1e9:.1f} GB transition matrix)")
+
+
+def compare_samplers(rounds=200_000, bet=150.0, mode="Additional", crash_prob=0.0889, cashout_prob=0.02):
+    """Time the state walk, the geometric-jump sampler and its vectorized form on the same chain."""
+    chain = compile_chain([1.0 + 0.1 * i for i in range(491)], crash_prob, cashout_prob)
+    factors = 1 + 3.0 * 0.05 * np.arange(492) + (mode == "Additional MAX") if mode != "Normal" else None
+    expected = round_expected_payout(chain, bet, factors)
+    print(f"\n{mode} mode, {rounds} rounds, expected payout {expected:.4f}")
+
+    for name, run in [
+        ("State walk", lambda: np.array([simulate_chain_round(chain, bet, mode) for _ in range(rounds)])),
+        ("Geometric jump", lambda: np.array([sample_chain_round(chain, bet, mode) for _ in range(rounds)])),
+        ("Vectorized jump", lambda: sample_chain_rounds(chain, bet, mode, rounds)),
+    ]:
+        start = time.perf_counter()
+        payouts = run()
+        elapsed = time.perf_counter() - start
+        print(f"{name:16s} {rounds / elapsed:12,.0f} rounds/s  mean {payouts.mean():9.4f}  "
+              f"sd {payouts.std():9.4f}  hit rate {np.mean(payouts > 0):.4f}")
+
+
+if __name__ == "__main__":
+    benchmark()
+    compare_samplers()
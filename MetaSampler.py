@@ -0,0 +1,248 @@
+import bisect
+import math
+import random
+import time
+
+import numpy as np
+
+from CrashRound import step_grid
+from GameMath import CASHOUT_LOW, STEP
+
+_count_cdfs = {}
+_total_tables = {}
+_sum_pmfs = {}
+_product_dists = {}
+
+
+def climb_steps(cashout_multiplier, crash_point):
+    """Iterations of `while multiplier < cashout_multiplier and multiplier < crash_point` (0.1 steps)."""
+    return step_grid(STEP).index(min(cashout_multiplier, crash_point))
+
+
+def count_cdf(steps, p):
+    """
+    Cached CDF of the number of metas collected in `steps` steps, Binomial(steps, p):
+    cdf[n] = P(count <= n). The negligible far tail is cut off (the last entry is 1).
+    """
+    key = (steps, p)
+    if key not in _count_cdfs:
+        cdf = []
+        total = 0.0
+        if p >= 1:
+            cdf = [0.0] * steps + [1.0]
+        else:
+            pmf = math.exp(steps * math.log1p(-p)) if p else 1.0
+            for n in range(steps + 1):
+                total += pmf
+                cdf.append(total)
+                if total >= 1 - 1e-16 or not p:
+                    break
+                pmf *= (steps - n) / (n + 1) * p / (1 - p)
+            cdf[-1] = 1.0
+        _count_cdfs[key] = cdf
+    return _count_cdfs[key]
+
+
+def meta_limit(config):
+    """Product of metas above which every cashout (>= 1.1x) hits the mode's cap."""
+    return config["cap"] / (config["bet_multiplier"] * CASHOUT_LOW)
+
+
+def sum_pmf(meta_range, count):
+    """
+    Cached distribution of the sum of `count` metas drawn from meta_range, as
+    a NumPy array indexed by the sum. Built from the count - 1 table.
+    """
+    key = (tuple(meta_range), count)
+    if key not in _sum_pmfs:
+        if count == 0:
+            _sum_pmfs[key] = np.ones(1)
+        else:
+            lo, hi = meta_range
+            one = np.r_[np.zeros(lo), np.full(hi - lo + 1, 1 / (hi - lo + 1))]
+            _sum_pmfs[key] = np.convolve(sum_pmf(meta_range, count - 1), one)
+    return _sum_pmfs[key]
+
+
+def product_dist(config, count, limit):
+    """
+    Cached {product: probability} of the initial metas times `count` collected
+    ones, products >= limit merged into math.inf. Built from the count - 1 table.
+    """
+    key = (config["meta_range"], tuple(config["initial_metas"]), count, limit)
+    if key not in _product_dists:
+        if count == 0:
+            initial = math.prod(config["initial_metas"])
+            dist = {initial if initial < limit else math.inf: 1.0}
+        else:
+            lo, hi = config["meta_range"]
+            width = hi - lo + 1
+            dist = {}
+            for m, q in product_dist(config, count - 1, limit).items():
+                for v in range(lo, hi + 1):
+                    t = m * v if m * v < limit else math.inf
+                    dist[t] = dist.get(t, 0.0) + q / width
+        _product_dists[key] = dist
+    return _product_dists[key]
+
+
+def total_table(config, count, limit=None):
+    """
+    Cached distribution of the combined meta-multiplier (the mode's product or
+    sum rule, initial metas included) when `count` metas are collected, as
+    (values, cdf) lists. For the product rule, products >= limit (meta_limit by
+    default) are merged into one math.inf entry: every such round hits the cap
+    anyway, and the exact products would make the tables explode.
+    """
+    if limit is None:
+        limit = meta_limit(config)
+    key = (config["meta_rule"], config["meta_range"], tuple(config["initial_metas"]), config["meta_divisor"],
+           count, limit)
+    if key not in _total_tables:
+        initial = config["initial_metas"]
+        if config["meta_rule"] == "sum":
+            pmf = sum_pmf(config["meta_range"], count)
+            sums = np.flatnonzero(pmf)
+            dist = dict(zip(((sums + sum(initial)) / config["meta_divisor"]).tolist(), pmf[sums].tolist()))
+            if not initial and count == 0:
+                dist = {1.0: 1.0}  # No metas at all leaves the payout unscaled
+        else:
+            dist = product_dist(config, count, limit)
+        values = sorted(dist)
+        cdf = list(np.cumsum([dist[v] for v in values]))
+        cdf[-1] = 1.0
+        _total_tables[key] = (values, cdf)
+    return _total_tables[key]
+
+
+def loop_meta_multipliers(config, steps, rng=random):
+    """The simulators' per-step loop: one draw per 0.1 step, a randint on each hit."""
+    meta_multipliers = list(config["initial_metas"])
+    meta_prob = config["meta_prob"]
+    for _ in range(steps):
+        if meta_prob and rng.random() < meta_prob:
+            meta_multipliers.append(rng.randint(*config["meta_range"]))
+    return meta_multipliers
+
+
+def sample_meta_multipliers(config, steps, rng=random):
+    """
+    Same distribution as loop_meta_multipliers, but the number of metas comes
+    from one draw on the cached binomial CDF, so the cost is one draw plus one
+    randint per collected meta instead of one draw per step.
+    """
+    meta_multipliers = list(config["initial_metas"])
+    if config["meta_prob"]:
+        count = bisect.bisect_right(count_cdf(steps, config["meta_prob"]), rng.random())
+        for _ in range(count):
+            meta_multipliers.append(rng.randint(*config["meta_range"]))
+    return meta_multipliers
+
+
+def sample_total_meta(config, steps, rng=random, limit=None):
+    """
+    Combined meta-multiplier after `steps` steps in two table lookups (count,
+    then total given count), for callers that don't need the individual metas.
+    """
+    count = bisect.bisect_right(count_cdf(steps, config["meta_prob"]), rng.random()) if config["meta_prob"] else 0
+    values, cdf = total_table(config, count, limit)
+    return values[bisect.bisect_right(cdf, rng.random())]
+
+
+def combine_counts(config, counts, rng):
+    """Combined meta-multipliers of rounds that collected `counts` metas: one block of draws, a reduceat per round."""
+    lo, hi = config["meta_range"]
+    initial = config["initial_metas"]
+    counts = np.asarray(counts)
+    draws = rng.integers(lo, hi + 1, counts.sum()).astype(np.float64)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    collected = counts > 0
+    if config["meta_rule"] == "sum":
+        totals = np.zeros(len(counts))
+        if draws.size:
+            totals[collected] = np.add.reduceat(draws, starts[collected])
+        totals = (totals + sum(initial)) / config["meta_divisor"]
+        if not initial:
+            totals[~collected] = 1  # No metas at all leaves the payout unscaled
+    else:
+        totals = np.ones(len(counts))
+        if draws.size:
+            totals[collected] = np.multiply.reduceat(draws, starts[collected])
+        totals *= math.prod(initial)
+    return totals
+
+
+def sample_meta_totals(config, steps, rng=None):
+    """Combined meta-multipliers for an array of step counts: binomial counts, then combine_counts."""
+    rng = np.random.default_rng() if rng is None else rng
+    steps = np.asarray(steps)
+    counts = rng.binomial(steps, config["meta_prob"]) if config["meta_prob"] else np.zeros(len(steps), dtype=np.int64)
+    return combine_counts(config, counts, rng)
+
+
+def validate(variant="KnightStats", mode="Additional", step_counts=(10, 100, 490), rounds=100_000, seed=1):
+    """
+    Compare the per-step loop with the three samplers on the count of metas
+    collected and on the combined meta-multiplier: its mean for the sum rule,
+    and for the product rule the mean log of the product clipped at
+    meta_limit (where payouts are capped). Prints z-scores of the differences;
+    |z| beyond ~4 means a real mismatch.
+    """
+    from GameMath import VARIANTS, combine_meta_multipliers
+
+    config = VARIANTS[variant][mode]
+    rng = random.Random(seed)
+    np_rng = np.random.default_rng(seed)
+    base = len(config["initial_metas"])
+
+    def transform(totals):
+        totals = np.asarray(totals, dtype=np.float64)
+        return totals if config["meta_rule"] == "sum" else np.log(np.minimum(totals, meta_limit(config)))
+
+    def z(a, b):
+        return (a.mean() - b.mean()) / math.sqrt(a.var() / len(a) + b.var() / len(b) or 1)
+
+    print(f"{variant} {mode} ({config['meta_rule']} rule), {rounds} rounds per sampler")
+    for steps in step_counts:
+        loop = [loop_meta_multipliers(config, steps, rng) for _ in range(rounds)]
+        sampled = [sample_meta_multipliers(config, steps, rng) for _ in range(rounds)]
+        loop_counts = np.array([len(m) - base for m in loop], dtype=np.float64)
+        sampled_counts = np.array([len(m) - base for m in sampled], dtype=np.float64)
+        loop_totals = transform([combine_meta_multipliers(config, m) for m in loop])
+        sampled_totals = transform([combine_meta_multipliers(config, m) for m in sampled])
+        table_totals = transform([sample_total_meta(config, steps, rng) for _ in range(rounds)])
+        batch_totals = transform(sample_meta_totals(config, np.full(rounds, steps), np_rng))
+        print(f"  {steps} steps: mean count loop {loop_counts.mean():.4f} vs sampled {sampled_counts.mean():.4f} "
+              f"(z {z(sampled_counts, loop_counts):+.2f}); total vs loop: sampled z "
+              f"{z(sampled_totals, loop_totals):+.2f}, tables z {z(table_totals, loop_totals):+.2f}, "
+              f"batch z {z(batch_totals, loop_totals):+.2f}")
+
+
+def benchmark(variant="KnightStats", mode="Additional", steps=490, rounds=50_000):
+    """Time one round's metas with the loop and each sampler at `steps` steps (a ~50x cashout)."""
+    from GameMath import VARIANTS
+
+    config = VARIANTS[variant][mode]
+    rng = random.Random(0)
+    timings = {}
+    for name, sample in (("loop", loop_meta_multipliers), ("sampled", sample_meta_multipliers),
+                         ("tables", sample_total_meta)):
+        sample(config, steps, rng)  # Build the cached tables first
+        began = time.perf_counter()
+        for _ in range(rounds):
+            sample(config, steps, rng)
+        timings[name] = (time.perf_counter() - began) / rounds
+    began = time.perf_counter()
+    sample_meta_totals(config, np.full(rounds, steps), np.random.default_rng(0))
+    timings["batch"] = (time.perf_counter() - began) / rounds
+    print(f"{variant} {mode}, {steps} steps: " + ", ".join(
+        f"{name} {seconds * 1e6:.2f} us/round" for name, seconds in timings.items()))
+
+
+if __name__ == "__main__":
+    from GameMath import MODES, VARIANTS
+
+    for variant in VARIANTS:
+        for mode in MODES[1:]:
+            validate(variant, mode, rounds=20_000)
+    benchmark()
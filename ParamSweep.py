@@ -0,0 +1,251 @@
+import argparse
+import csv
+import itertools
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from CrashRound import step_grid
+from GameMath import CASHOUT_HIGH, CASHOUT_LOW, MODES, STEP, VARIANTS, classify_volatility, crash_points
+from MetaSampler import count_cdf, meta_limit, sum_pmf, total_table
+from StreamStats import stats_from_payouts, summarize
+
+# The shared random draws of a sweep (one row per draw, one column per round)
+# and what the last point evaluated in this process derived from them
+_pool = None
+_crash_cache = {}
+_count_cache = {}
+_total_cache = {}
+
+
+def parse_range(text):
+    lo, _, hi = text.partition("-")
+    return int(lo), int(hi)
+
+
+def parse_metas(text):
+    return [int(m) for m in text.split("+") if m]
+
+
+# How the values of each grid axis are written on the command line: modes by
+# name, meta_range as "2-20", initial_metas as "10" or "10+5" ("" for none)
+PARSERS = {
+    "mode": str, "rtp": float, "base_bet": float, "bet_multiplier": float, "crash_scale": float,
+    "threshold_scale": float, "meta_prob": float, "meta_divisor": float, "cap": float, "meta_rule": str,
+    "meta_range": parse_range, "initial_metas": parse_metas,
+}
+
+
+def parse_axis(text):
+    """
+    Parse "key=v1,v2,..." (or "key=start:stop:count" for evenly spaced
+    numbers) into (key, values).
+    """
+    key, _, spec = text.partition("=")
+    key = key.strip()
+    if key not in PARSERS:
+        raise argparse.ArgumentTypeError(f"Unknown parameter {key!r} (expected one of {', '.join(PARSERS)})")
+    if PARSERS[key] is float and spec.count(":") == 2:
+        start, stop, count = spec.split(":")
+        return key, [float(x) for x in np.linspace(float(start), float(stop), int(count))]
+    try:
+        values = [PARSERS[key](part.strip()) for part in spec.split(",")]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Bad values {spec!r} for {key}") from None
+    if key == "mode" and any(mode not in MODES for mode in values):
+        raise argparse.ArgumentTypeError(f"Modes must be among {', '.join(MODES)}")
+    return key, values
+
+
+def grid_points(axes):
+    """Every combination of the axes' values, as {parameter: value} dicts (last axis varies fastest)."""
+    keys = [key for key, _ in axes]
+    return [dict(zip(keys, values)) for values in itertools.product(*(values for _, values in axes))]
+
+
+def new_pool(rounds, seed):
+    """
+    The draws every grid point shares (common random numbers): crash, cashout,
+    meta count and meta total uniforms for each round.
+    """
+    return np.random.default_rng(seed).random((4, rounds))
+
+
+def set_pool(rounds, seed):
+    """Build this process's pool (the worker initializer)."""
+    global _pool
+    _pool = new_pool(rounds, seed)
+    _crash_cache.clear()
+    _count_cache.clear()
+    _total_cache.clear()
+
+
+def climb_outcomes(rtp, config):
+    """Cashout targets, climb steps and hits of the pool's rounds, shared by points with the same crash model."""
+    key = (rtp, config["crash_scale"], config["threshold_scale"], config["crash_cap"])
+    if key not in _crash_cache:
+        _crash_cache.clear()  # Only the latest crash model is kept: points come sorted by it
+        crash_point = crash_points(_pool[0], rtp, config)
+        cashout = CASHOUT_LOW + (CASHOUT_HIGH - CASHOUT_LOW) * _pool[1]
+        grid = step_grid(STEP)
+        steps = grid.indexes(np.minimum(cashout, crash_point))
+        _crash_cache[key] = (cashout, steps, grid.values(steps) < crash_point)
+    return _crash_cache[key]
+
+
+def meta_counts(rtp, config, steps):
+    """
+    Metas collected in each round: the pool's count uniform through the
+    Binomial(steps, meta_prob) CDF. Returns the counts and the rounds of each
+    count, as (count, rows) pairs.
+    """
+    p = config["meta_prob"]
+    key = (rtp, config["crash_scale"], config["threshold_scale"], p)
+    if key not in _count_cache:
+        _count_cache.clear()
+        counts = np.zeros(len(steps), dtype=np.int64)
+        if p:
+            u = _pool[2]
+            for k, rows in group_rows(steps):
+                # bisect_right(cdf, u), as in sample_meta_multipliers
+                counts[rows] = np.searchsorted(count_cdf(k, p), u[rows], side="right")
+        _count_cache[key] = (counts, group_rows(counts))
+    return _count_cache[key]
+
+
+def group_rows(values):
+    """(value, indexes of the rows holding it) for each distinct value of an integer array."""
+    order = np.argsort(values, kind="stable")
+    rows = np.split(order, np.flatnonzero(np.diff(values[order])) + 1)
+    return [(int(values[r[0]]), r) for r in rows if len(r)]
+
+
+def meta_totals(rtp, config, groups):
+    """
+    Combined meta-multiplier of each round: the pool's total uniform through
+    its count's total distribution. Sums are kept before the divisor, so
+    points that only change it (or the bets) reuse them.
+    """
+    sum_rule = config["meta_rule"] == "sum"
+    initial = tuple(config["initial_metas"])
+    key = (rtp, config["crash_scale"], config["threshold_scale"], config["meta_prob"], config["meta_rule"],
+           config["meta_range"], initial, None if sum_rule else meta_limit(config))
+    if key not in _total_cache:
+        _total_cache.clear()
+        u = _pool[3]
+        totals = np.empty(len(u))
+        for count, rows in groups:
+            if sum_rule:
+                cdf = np.cumsum(sum_pmf(config["meta_range"], count))
+                totals[rows] = np.minimum(np.searchsorted(cdf, u[rows], side="right"), len(cdf) - 1) + sum(initial)
+            else:
+                values, cdf = total_table(config, count)
+                index = np.minimum(np.searchsorted(cdf, u[rows], side="right"), len(values) - 1)
+                totals[rows] = np.asarray(values)[index]
+        unscaled = None
+        if sum_rule and not initial and groups and groups[0][0] == 0:
+            unscaled = groups[0][1]  # No metas at all leaves the payout unscaled
+        _total_cache[key] = (totals, unscaled)
+    totals, unscaled = _total_cache[key]
+    if not sum_rule:
+        return totals
+    totals = totals / config["meta_divisor"]
+    if unscaled is not None:
+        totals[unscaled] = 1
+    return totals
+
+
+def evaluate(point, variant="KnightStats", mode="Additional", rtp=95.0, base_bet=1.0):
+    """
+    RTP, payout SD, hit rate, max-win rate and volatility of one grid point
+    over the shared pool of rounds. point overrides the mode, rtp, base_bet
+    or any of the mode's GameMath config keys; its axes are kept as given, so
+    the measured RTP is "achieved_rtp" (an "rtp" axis is the target).
+    """
+    config = dict(VARIANTS[variant][point.get("mode", mode)])
+    config.update({k: v for k, v in point.items() if k in config})
+    config["meta_range"] = tuple(config["meta_range"])
+    rtp = point.get("rtp", rtp)
+    base_bet = point.get("base_bet", base_bet)
+
+    cashout, steps, hit = climb_outcomes(rtp, config)
+    _, groups = meta_counts(rtp, config, steps)
+    bet = base_bet * config["bet_multiplier"]
+    cap = base_bet * config["cap"]
+    raw = bet * cashout * meta_totals(rtp, config, groups)
+    payouts = np.where(hit, np.minimum(raw, cap), 0.0)
+    s = summarize(stats_from_payouts(payouts, bet, cap))
+    return dict(point, achieved_rtp=s["rtp"], sd=s["sd"], hit_rate=s["hit_rate"], max_win_rate=s["max_win_rate"],
+                volatility=classify_volatility(s["hit_rate"], s["sd"]))
+
+
+def evaluate_all(points, variant="KnightStats", mode="Additional", rtp=95.0, base_bet=1.0):
+    """evaluate() for a contiguous run of points (one worker task)."""
+    return [evaluate(point, variant, mode, rtp, base_bet) for point in points]
+
+
+def sweep(axes, variant="KnightStats", mode="Additional", rtp=95.0, base_bet=1.0, rounds=1_000_000, seed=0,
+          workers=1):
+    """
+    Evaluate every point of the grid on the same `rounds` rounds of random
+    draws, so differences between points are not swamped by sampling noise.
+    Points are split into contiguous runs, one per worker task; within a run,
+    points that share the crash model (or also meta_prob) reuse its climbs (and
+    meta counts), so put the crash axes first and the cheap ones (bets, meta
+    divisors, ranges) last.
+    """
+    points = grid_points(axes)
+    if workers == 1:
+        set_pool(rounds, seed)
+        return evaluate_all(points, variant, mode, rtp, base_bet)
+    size = -(-len(points) // (workers * 4))
+    runs = [points[i:i + size] for i in range(0, len(points), size)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=set_pool, initargs=(rounds, seed)) as pool:
+        results = pool.map(evaluate_all, runs, *([x] * len(runs) for x in (variant, mode, rtp, base_bet)))
+        return [r for run in results for r in run]
+
+
+def write_rows(rows, fmt, out):
+    """Write the sweep as CSV (one row per point) or as one JSON list."""
+    if fmt == "json":
+        json.dump(rows, out, indent=2)
+        out.write("\n")
+        return
+    writer = csv.DictWriter(out, fieldnames=list(rows[0]))
+    writer.writeheader()
+    writer.writerows(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="RTP/volatility surface of a Knight's Ascent mode over a parameter grid.",
+        epilog='example: --grid "crash_scale=0.05:0.5:10" --grid "meta_prob=0.05,0.1" --grid "meta_range=2-20,2-100"')
+    parser.add_argument("--grid", type=parse_axis, action="append", required=True,
+                        help="one axis: key=v1,v2,... or key=start:stop:count (repeatable)")
+    parser.add_argument("--variant", choices=list(VARIANTS), default="KnightStats")
+    parser.add_argument("--mode", choices=MODES, default="Additional")
+    parser.add_argument("--rtp", type=float, default=95.0)
+    parser.add_argument("--bet", type=float, default=1.0, help="base bet")
+    parser.add_argument("--rounds", type=int, default=1_000_000, help="shared rounds per point")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--format", choices=["csv", "json"], default="csv")
+    parser.add_argument("--output", help="write the surface to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    began = time.perf_counter()
+    rows = sweep(args.grid, args.variant, args.mode, args.rtp, args.bet, args.rounds, args.seed, args.workers)
+    elapsed = time.perf_counter() - began
+    if args.output:
+        with open(args.output, "w", newline="") as out:
+            write_rows(rows, args.format, out)
+    else:
+        write_rows(rows, args.format, sys.stdout)
+    print(f"{len(rows)} points x {args.rounds:,} rounds in {elapsed:.1f} s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import math
+from array import array
+
+
+def new_histogram(cap, decades=7, bins_per_decade=20):
+    """
+    Empty payout histogram with logarithmic buckets.
+    Bucket 0 counts zero payouts, buckets 1..n split [cap / 10^decades, cap)
+    into equal log widths (anything smaller lands in bucket 1) and the last
+    bucket counts payouts at or above the cap.
+    """
+    return {
+        "cap": cap,
+        "low": cap / 10 ** decades,
+        "bins_per_decade": bins_per_decade,
+        "log_bins": decades * bins_per_decade,
+        "counts": array("q", [0] * (decades * bins_per_decade + 2)),
+    }
+
+
+def bucket_index(h, payout):
+    """Bucket that a payout falls into."""
+    if payout <= 0:
+        return 0
+    if payout >= h["cap"]:
+        return h["log_bins"] + 1
+    i = int(math.log10(payout / h["low"]) * h["bins_per_decade"]) + 1
+    return min(max(i, 1), h["log_bins"])
+
+
+def add_payout(h, payout):
+    """Count one payout."""
+    h["counts"][bucket_index(h, payout)] += 1
+
+
+def add_payouts(h, payouts):
+    """Count a NumPy array of payouts in one pass."""
+    import numpy as np
+
+    payouts = np.asarray(payouts, dtype=float)
+    index = np.zeros(payouts.shape, dtype=np.int64)
+    positive = payouts > 0
+    scaled = np.log10(payouts[positive] / h["low"]) * h["bins_per_decade"]
+    index[positive] = np.clip(scaled.astype(np.int64) + 1, 1, h["log_bins"])
+    index[payouts >= h["cap"]] = h["log_bins"] + 1
+    counts = np.bincount(index, minlength=len(h["counts"]))
+    for i in np.flatnonzero(counts):
+        h["counts"][i] += int(counts[i])
+
+
+def merge_histograms(a, b):
+    """Sum two histograms built with the same layout."""
+    if (a["cap"], a["low"], a["log_bins"]) != (b["cap"], b["low"], b["log_bins"]):
+        raise ValueError("Histograms have different bucket layouts")
+    merged = dict(a)
+    merged["counts"] = array("q", (x + y for x, y in zip(a["counts"], b["counts"])))
+    return merged
+
+
+def bucket_edges(h):
+    """Lower and upper payout edge of every bucket."""
+    step = 10 ** (1 / h["bins_per_decade"])
+    edges = [(0, 0)]
+    for i in range(h["log_bins"]):
+        edges.append((h["low"] * step ** i, h["low"] * step ** (i + 1)))
+    edges.append((h["cap"], h["cap"]))
+    return edges
+
+
+def quantile(h, q):
+    """Approximate payout quantile (q in [0, 1]), interpolated geometrically inside a bucket."""
+    total = sum(h["counts"])
+    if total == 0:
+        return 0
+    rank = q * total
+    seen = 0
+    for (lo, hi), count in zip(bucket_edges(h), h["counts"]):
+        if count and seen + count >= rank:
+            if lo == hi:
+                return lo
+            return lo * (hi / lo) ** ((rank - seen) / count)
+        seen += count
+    return h["cap"]
+
+
+def plot_histogram(h, title, log_y=False):
+    """Plot the bucket counts on a logarithmic payout axis."""
+    import matplotlib.pyplot as plt
+
+    edges = bucket_edges(h)
+    counts = h["counts"]
+    step = 10 ** (1 / h["bins_per_decade"])
+    lefts = [lo for lo, _ in edges[1:-1]] + [h["cap"]]
+    widths = [hi - lo for lo, hi in edges[1:-1]] + [h["cap"] * (step - 1)]
+
+    plt.figure(figsize=(8, 6))
+    plt.bar(lefts, counts[1:], width=widths, align='edge', color='skyblue', edgecolor='black')
+    plt.xscale('log')
+    if log_y:
+        plt.yscale('log')
+    plt.title(f"{title}\n(zero payouts: {counts[0]}, at or above cap: {counts[-1]})")
+    plt.xlabel("Payout (log scale)")
+    plt.ylabel("Frequency (Log Scale)" if log_y else "Frequency")
+    plt.grid(True, alpha=0.3)
+    plt.show()
@@ -0,0 +1,194 @@
+import os
+import struct
+
+from FairRNG import FairRandom
+
+CRASH_JOURNAL = "bathyscaphe_journal.bin"
+ASCENT_JOURNAL = "knight_journal.bin"
+
+MAGIC = b"GCJ3"
+HEADER = struct.Struct("<4s8sI")  # Magic, game name, record size
+
+# Fixed-size records, so round i starts at HEADER.size + i * RECORD.size. A
+# record names its server seed by its number in the journal's seed table.
+RECORDS = {
+    # Seed number, round index, RTP, bet, auto-cashout M, send multiplier, send percentage,
+    # fireproof M_f, winnings
+    "crash": struct.Struct("<IQddddddd"),
+    # Seed number, round index, RTP, mode index, base bet, cashout step (-1: collapsed), total win
+    "ascent": struct.Struct("<IQdBdid"),
+}
+SEED_SIZE = 32
+SEEDS_SUFFIX = ".seeds"  # The seed table: every server seed of the journal, 32 bytes each, in first-use order
+
+
+class Journal:
+    """
+    Append-only binary journal of played rounds.
+
+    Each round is stored as its FairRNG server seed and round index plus the
+    player's choices, which is all it takes to reproduce it; the recorded win
+    is kept to check the replay.
+    Records have a fixed size, so any round is read with one seek. A session
+    plays many rounds of one server seed, so the seeds are kept once each in
+    a table next to the journal (path + SEEDS_SUFFIX) and records hold their
+    seed's number in it.
+    """
+
+    def __init__(self, path, game):
+        self.path = path
+        self.game = game
+        self.record = RECORDS[game]
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        self.file = open(path, "r+b" if exists else "w+b")
+        if exists:
+            magic, name, size = HEADER.unpack(self.file.read(HEADER.size))
+            if magic[:3] == MAGIC[:3] and magic != MAGIC:
+                self.file.close()
+                raise ValueError(f"{path} is a round journal of another format version")
+            if magic != MAGIC or name.rstrip(b"\0").decode() != game or size != self.record.size:
+                self.file.close()
+                raise ValueError(f"{path} is not a {game} round journal")
+        else:
+            self.file.write(HEADER.pack(MAGIC, game.encode(), self.record.size))
+            self.file.flush()
+
+        self.seed_file = open(path + SEEDS_SUFFIX, "a+b")
+        self.seed_file.seek(0)
+        table = self.seed_file.read()
+        if len(table) % SEED_SIZE or (exists and not table and len(self)):
+            self.close()
+            raise ValueError(f"{path}{SEEDS_SUFFIX} is not the seed table of {path}")
+        self.seeds = [table[i:i + SEED_SIZE] for i in range(0, len(table), SEED_SIZE)]
+        self.seed_numbers = {seed: number for number, seed in enumerate(self.seeds)}
+
+    def __len__(self):
+        return (os.fstat(self.file.fileno()).st_size - HEADER.size) // self.record.size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.file.close()
+        self.seed_file.close()
+
+
+def open_journal(path, game):
+    """Open (creating if needed) the journal of "crash" or "ascent" rounds at path."""
+    return Journal(path, game)
+
+
+def seed_number(journal, server_seed):
+    """The server seed's number in the journal's seed table, adding it if it is new."""
+    number = journal.seed_numbers.get(server_seed)
+    if number is None:
+        if len(server_seed) != SEED_SIZE:
+            raise ValueError(f"Server seeds are {SEED_SIZE} bytes, not {len(server_seed)}")
+        number = journal.seed_numbers[server_seed] = len(journal.seeds)
+        journal.seeds.append(server_seed)
+        journal.seed_file.write(server_seed)
+        journal.seed_file.flush()
+    return number
+
+
+def append_round(journal, server_seed, *fields):
+    """Append one round's record (its server seed, then the record's other fields) and return its index."""
+    index = len(journal)
+    number = seed_number(journal, server_seed)
+    journal.file.seek(HEADER.size + index * journal.record.size)
+    journal.file.write(journal.record.pack(number, *fields))
+    journal.file.flush()
+    return index
+
+
+def read_round(journal, index):
+    """Fields of round `index` (its server seed first), read in O(1) from its fixed offset."""
+    if not 0 <= index < len(journal):
+        raise IndexError(f"Round {index} is not in {journal.path} ({len(journal)} rounds)")
+    journal.file.seek(HEADER.size + index * journal.record.size)
+    number, *fields = journal.record.unpack(journal.file.read(journal.record.size))
+    return (journal.seeds[number], *fields)
+
+
+def replay_crash_round(journal, index):
+    """Rebuild a Game.py round: its crash point and fireproof/send/cashout/crash events."""
+    from CrashRound import resolve_round
+    from GameMath import generate_crash_point
+
+    server_seed, round_index, rtp, bet, M, send_multiplier, send_percentage, M_f, winnings = read_round(
+        journal, index)
+    C = generate_crash_point(rtp, FairRandom(server_seed, round_index))
+    result = resolve_round(bet, M, send_multiplier, send_percentage, M_f, C)
+    return {
+        "server_seed": server_seed, "round_index": round_index, "rtp": rtp, "bet": bet, "M": M, "send_multiplier": send_multiplier,
+        "send_percentage": send_percentage, "M_f": M_f, "crash_point": C,
+        "events": result["events"], "winnings": result["winnings"],
+        "matches": result["winnings"] == winnings,
+    }
+
+
+def replay_ascent_round(journal, index):
+    """Rebuild a Knight's Ascent round: every 0.1 step with the meta-multiplier collected on it."""
+    from AscentRound import cashout_win, climb
+    from GameMath import ASCENT, MODES, generate_crash_point
+
+    server_seed, round_index, rtp, mode_index, base_bet, cashout_step, total_win = read_round(journal, index)
+    mode = MODES[mode_index]
+    bet = base_bet * ASCENT[mode]["bet_multiplier"]
+    rng = FairRandom(server_seed, round_index)
+    crash_point = generate_crash_point(rtp, rng, ASCENT[mode])
+    meta_multipliers = list(ASCENT[mode]["initial_metas"])
+    steps = []
+    win = 0
+    for step_num, (multiplier, new_meta, crashed) in enumerate(climb(crash_point, mode, rng)):
+        steps.append((multiplier, new_meta))
+        if new_meta is not None:
+            meta_multipliers.append(new_meta)
+        if step_num == cashout_step:
+            win = cashout_win(mode, bet, multiplier, meta_multipliers)[0]
+            break
+    return {
+        "server_seed": server_seed, "round_index": round_index, "rtp": rtp, "mode": mode, "bet": bet, "crash_point": crash_point,
+        "steps": steps, "meta_multipliers": meta_multipliers, "cashed_out": cashout_step >= 0,
+        "total_win": win, "matches": win == total_win,
+    }
+
+
+def print_replay(game, replay):
+    """Print a replayed round in the games' own messages."""
+    print(f"Server seed {replay['server_seed'].hex()}, round {replay['round_index']}, RTP {replay['rtp']}%, "
+          f"crash point {replay['crash_point']:.4f}")
+    if game == "crash":
+        print(f"Bet {replay['bet']}, auto-cashout at {replay['M']}, send {replay['send_percentage']}% at "
+              f"{replay['send_multiplier'] or 'N/A'}, fireproof at {replay['M_f'] or 'N/A'}")
+        for event, multiplier, amount in replay["events"]:
+            if event == "fireproof":
+                print(f"Fireproof level reached at {multiplier:.2f}, secured {amount:.2f}")
+            elif event == "send":
+                print(f"Sent {amount:.2f} at multiplier {multiplier:.2f}")
+            elif event == "cashout":
+                print(f"Cashed out remaining at {multiplier:.2f}, won {amount:.2f}")
+            else:
+                print(f"Crashed at {multiplier:.2f}, lost remaining bet {amount:.2f}")
+        print(f"Winnings: {replay['winnings']:.2f}")
+    else:
+        print(f"Mode: {replay['mode']}, Total Bet: {replay['bet']:.2f}")
+        for multiplier, new_meta in replay["steps"]:
+            print(f"Current Multiplier: {multiplier:.1f}x" + (f", collected x{new_meta}" if new_meta else ""))
+        outcome = "Cashed out" if replay["cashed_out"] else "The tower collapsed"
+        print(f"{outcome} at {replay['steps'][-1][0]:.1f}x, Total Win: {replay['total_win']:.2f}")
+    print("Replay matches the recorded win" if replay["matches"] else "WARNING: replay differs from the recorded win")
+
+
+if __name__ == "__main__":
+    import sys
+
+    # python RoundJournal.py crash|ascent INDEX [JOURNAL]
+    game, index = sys.argv[1], int(sys.argv[2])
+    path = sys.argv[3] if len(sys.argv) > 3 else {"crash": CRASH_JOURNAL, "ascent": ASCENT_JOURNAL}[game]
+    with open_journal(path, game) as journal:
+        replay = (replay_crash_round if game == "crash" else replay_ascent_round)(journal, index)
+    print_replay(game, replay)
@@ -0,0 +1,108 @@
+import gzip
+import heapq
+import io
+import struct
+
+from GameMath import MODES
+
+LEVELS = ["summary", "sample", "all", "trace"]
+
+# Trace record: round, mode index, hit flag, meta count, bet, payout, crash point, cashout
+# multiplier, followed by the (integer) meta-multipliers as 16-bit values
+RECORD = struct.Struct("<QBBHdddd")
+
+
+def new_round_log(level="all", every=0, top_k=0, path=None):
+    """
+    Per-round log of a Knight stats run.
+      summary: nothing per round
+      sample:  print every `every`-th round as it happens and the top_k biggest
+               payouts at the end
+      all:     print every round (the scripts' original output)
+      trace:   append every round as a binary record to a gzip file at `path`
+    """
+    if level not in LEVELS:
+        raise ValueError(f"Unknown log level {level!r} (expected one of {', '.join(LEVELS)})")
+    log = {"level": level, "every": every, "top_k": top_k, "top": [], "file": None}
+    if level == "trace":
+        log["file"] = io.BufferedWriter(gzip.open(path, "wb", compresslevel=1), buffer_size=1 << 20)
+    return log
+
+
+def format_round(round_num, mode, bet, payout, hit, crash_point, cashout_multiplier, meta_multipliers):
+    """The stats scripts' one-line description of a round."""
+    if not hit:
+        return f"Round {round_num} ({mode}): Bet = {bet:.2f}, Crash at {crash_point:.1f}x, Payout = {payout:.2f}"
+    meta_str = f", Meta-Multipliers = {'x' + ', x'.join(map(str, meta_multipliers))}" if meta_multipliers else ""
+    return f"Round {round_num} ({mode}): Bet = {bet:.2f}, Cashout at {cashout_multiplier:.1f}x{meta_str}, Payout = {payout:.2f}"
+
+
+def log_round(log, round_num, mode, bet, payout, hit, crash_point, cashout_multiplier, meta_multipliers):
+    """Record one round; nothing is formatted unless the round is printed."""
+    level = log["level"]
+    if level == "summary":
+        return
+    if level == "all":
+        print(format_round(round_num, mode, bet, payout, hit, crash_point, cashout_multiplier, meta_multipliers))
+    elif level == "trace":
+        count = len(meta_multipliers)
+        log["file"].write(RECORD.pack(round_num, MODES.index(mode), hit, count, bet, payout,
+                                      crash_point, cashout_multiplier))
+        if count:
+            log["file"].write(struct.pack(f"<{count}H", *meta_multipliers))
+    else:
+        if log["every"] and round_num % log["every"] == 0:
+            print(format_round(round_num, mode, bet, payout, hit, crash_point, cashout_multiplier, meta_multipliers))
+        top = log["top"]
+        if log["top_k"] and (len(top) < log["top_k"] or payout > top[0][0]):
+            entry = (payout, round_num, mode, bet, hit, crash_point, cashout_multiplier, meta_multipliers)
+            if len(top) < log["top_k"]:
+                heapq.heappush(top, entry)
+            else:
+                heapq.heapreplace(top, entry)
+
+
+def close_round_log(log):
+    """Print the sampled top payouts and flush the trace file."""
+    if log["top"]:
+        print(f"\n**Top {len(log['top'])} Payouts**")
+        for payout, round_num, mode, bet, hit, crash_point, cashout_multiplier, meta_multipliers in sorted(
+                log["top"], reverse=True):
+            print(format_round(round_num, mode, bet, payout, hit, crash_point, cashout_multiplier, meta_multipliers))
+    if log["file"]:
+        log["file"].close()
+        log["file"] = None
+
+
+def read_trace(path):
+    """Yield the rounds of a trace file as (round_num, mode, bet, payout, hit, crash_point, cashout, metas)."""
+    with gzip.open(path, "rb") as f:
+        f = io.BufferedReader(f, buffer_size=1 << 20)
+        while True:
+            header = f.read(RECORD.size)
+            if not header:
+                return
+            round_num, mode_index, hit, count, bet, payout, crash_point, cashout_multiplier = RECORD.unpack(header)
+            metas = list(struct.unpack(f"<{count}H", f.read(2 * count))) if count else []
+            yield round_num, MODES[mode_index], bet, payout, bool(hit), crash_point, cashout_multiplier, metas
+
+
+def prompt_round_log():
+    """Ask for the log level (and its options) the way the stats scripts ask for their inputs."""
+    level = input(f"Enter round log level ({'/'.join(LEVELS)}, blank for all): ").strip().lower() or "all"
+    if level == "sample":
+        every = int(input("Print every Nth round (0 for none): "))
+        top_k = int(input("Number of biggest payouts to show: "))
+        return new_round_log(level, every, top_k)
+    if level == "trace":
+        path = input("Enter trace file (blank for knight_trace.bin.gz): ").strip() or "knight_trace.bin.gz"
+        return new_round_log(level, path=path)
+    return new_round_log(level)
+
+
+if __name__ == "__main__":
+    import sys
+
+    # Print a trace file in the scripts' text format
+    for round_num, mode, bet, payout, hit, crash_point, cashout_multiplier, metas in read_trace(sys.argv[1]):
+        print(format_round(round_num, mode, bet, payout, hit, crash_point, cashout_multiplier, metas))
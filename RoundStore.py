@@ -0,0 +1,271 @@
+import json
+import os
+import struct
+import sys
+import time
+
+import numpy as np
+
+from GameMath import MODES, classify_volatility
+from StreamStats import merge_all, merge_stats, new_stats, stats_from_payouts, summarize
+
+MAGIC = b"GCRS"
+HEADER = struct.Struct("<4sI")  # Magic, format version
+TRAILER = struct.Struct("<Q4s")  # Footer offset, magic
+VERSION = 1
+ALIGN = 8  # Every column starts on an 8-byte boundary, so it can be viewed in place
+
+# One fixed-width column per round result, widest first. A chunk holds the
+# rounds of one mode, column after column.
+COLUMNS = [
+    ("round", np.dtype("<u8")),  # The round's index in its run (its FairRNG round)
+    ("bet", np.dtype("<f8")),
+    ("payout", np.dtype("<f8")),
+    ("crash_point", np.dtype("<f8")),
+    ("cashout", np.dtype("<f8")),  # Cashout target
+    ("meta_total", np.dtype("<f8")),  # Combined meta-multiplier (1 without metas)
+    ("meta_count", np.dtype("<u2")),  # Meta-multipliers held, initial ones included
+    ("hit", np.dtype("?")),
+    ("max_win", np.dtype("?")),
+]
+CHUNK_ROWS = 1 << 16
+
+
+def aligned(offset):
+    return -(-offset // ALIGN) * ALIGN
+
+
+def chunk_size(rows):
+    """Bytes a chunk of `rows` rounds takes, padding included."""
+    return aligned(sum(aligned(rows * dtype.itemsize) for _, dtype in COLUMNS))
+
+
+def column_offsets(offset, rows):
+    """File offset of each column of the chunk of `rows` rounds starting at `offset`."""
+    offsets = {}
+    for name, dtype in COLUMNS:
+        offsets[name] = offset
+        offset += aligned(rows * dtype.itemsize)
+    return offsets
+
+
+class RoundWriter:
+    """
+    Writes per-round results to a columnar store file.
+
+    Rounds are buffered per mode and written as chunks of up to chunk_rows
+    rounds; close() writes the footer, a JSON index of each mode's chunks
+    (offset and row count) plus the run's `meta`, and the trailer pointing
+    at it. A store without its footer (an interrupted run) is not readable.
+    """
+
+    def __init__(self, path, meta=None, chunk_rows=CHUNK_ROWS):
+        self.path = path
+        self.meta = dict(meta or {})
+        self.chunk_rows = chunk_rows
+        self.chunks = {mode: [] for mode in MODES}
+        self._rows = {mode: [] for mode in MODES}
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, VERSION))
+        self.file.write(b"\0" * (aligned(HEADER.size) - HEADER.size))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def add_round(self, mode, round_num, bet, payout, hit, max_win, crash_point, cashout, meta_count, meta_total):
+        """Buffer one round (the scalar simulators' path)."""
+        rows = self._rows[mode]
+        rows.append((round_num, bet, payout, crash_point, cashout, meta_total, meta_count, hit, max_win))
+        if len(rows) >= self.chunk_rows:
+            self._flush(mode)
+
+    def append(self, mode, columns):
+        """Write NumPy arrays of rounds ({column: array}, every column) of one mode (the batch path)."""
+        self._flush(mode)
+        size = len(columns["payout"])
+        for start in range(0, size, self.chunk_rows):
+            self._write_chunk(mode, {name: columns[name][start:start + self.chunk_rows] for name, _ in COLUMNS})
+
+    def _flush(self, mode):
+        rows = self._rows[mode]
+        if rows:
+            columns = zip(COLUMNS, zip(*rows))
+            self._write_chunk(mode, {name: np.fromiter(v, dtype, len(rows)) for (name, dtype), v in columns})
+            rows.clear()
+
+    def _write_chunk(self, mode, columns):
+        rows = len(columns["payout"])
+        offset = self.file.tell()
+        for name, dtype in COLUMNS:
+            data = np.ascontiguousarray(columns[name], dtype=dtype)
+            self.file.write(data.tobytes())
+            self.file.write(b"\0" * (aligned(data.nbytes) - data.nbytes))
+        self.chunks[mode].append([offset, rows])
+
+    def close(self):
+        if self.file is None:
+            return
+        for mode in MODES:
+            self._flush(mode)
+        footer = {"version": VERSION, "columns": [[name, dtype.str] for name, dtype in COLUMNS],
+                  "meta": self.meta, "chunks": self.chunks}
+        offset = self.file.tell()
+        self.file.write(json.dumps(footer).encode())
+        self.file.write(TRAILER.pack(offset, MAGIC))
+        self.file.close()
+        self.file = None
+
+
+class RoundStore:
+    """
+    A store file opened for reading. The whole file is memory-mapped once
+    and every column of every chunk is a NumPy view into it, so scanning a
+    mode reads only that mode's chunks and copies nothing.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        size = os.path.getsize(path)
+        with open(path, "rb") as f:
+            magic, version = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or size < aligned(HEADER.size) + TRAILER.size:
+                raise ValueError(f"{path} is not a round store")
+            f.seek(size - TRAILER.size)
+            offset, magic = TRAILER.unpack(f.read(TRAILER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} has no footer (was its run interrupted?)")
+            f.seek(offset)
+            footer = json.loads(f.read(size - TRAILER.size - offset))
+        if version != VERSION or footer["columns"] != [[name, dtype.str] for name, dtype in COLUMNS]:
+            raise ValueError(f"{path} is a round store of another format version")
+        self.meta = footer["meta"]
+        self.index = {mode: [tuple(chunk) for chunk in chunks] for mode, chunks in footer["chunks"].items()}
+        self._data = np.memmap(path, dtype=np.uint8, mode="r", shape=(offset,))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._data = None
+
+    @property
+    def modes(self):
+        """Modes with at least one round, in MODES order."""
+        return [mode for mode in MODES if self.index.get(mode)]
+
+    def rows(self, mode=None):
+        """Number of rounds of a mode (of every mode by default)."""
+        modes = [mode] if mode else self.modes
+        return sum(rows for m in modes for _, rows in self.index.get(m, []))
+
+    def chunks(self, mode=None, columns=None):
+        """Yield (mode, {column: view}) for each chunk of a mode (of every mode by default)."""
+        names = columns or [name for name, _ in COLUMNS]
+        dtypes = dict(COLUMNS)
+        for m in [mode] if mode else self.modes:
+            for offset, rows in self.index.get(m, []):
+                offsets = column_offsets(offset, rows)
+                yield m, {name: self._data[offsets[name]:offsets[name] + rows * dtypes[name].itemsize]
+                          .view(dtypes[name]) for name in names}
+
+    def column(self, name, mode=None):
+        """One column of a mode's rounds as a single array (a view if the mode has one chunk)."""
+        parts = [c[name] for _, c in self.chunks(mode, [name])]
+        if len(parts) == 1:
+            return parts[0]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=dict(COLUMNS)[name])
+
+
+def open_store(path):
+    """Open a store file written by RoundWriter."""
+    return RoundStore(path)
+
+
+def merge_stores(paths, path, meta=None):
+    """
+    Write the chunks of several stores (a sharded run's parts, in shard order)
+    into one store at path. Chunks are copied byte for byte.
+    """
+    chunks = {mode: [] for mode in MODES}
+    with open(path, "wb") as out:
+        out.write(HEADER.pack(MAGIC, VERSION))
+        out.write(b"\0" * (aligned(HEADER.size) - HEADER.size))
+        for part in paths:
+            with open_store(part) as store:
+                if meta is None:
+                    meta = store.meta
+                for mode in MODES:
+                    for offset, rows in store.index.get(mode, []):
+                        chunks[mode].append([out.tell(), rows])
+                        out.write(store._data[offset:offset + chunk_size(rows)].tobytes())
+        footer = {"version": VERSION, "columns": [[name, dtype.str] for name, dtype in COLUMNS],
+                  "meta": meta or {}, "chunks": chunks}
+        offset = out.tell()
+        out.write(json.dumps(footer).encode())
+        out.write(TRAILER.pack(offset, MAGIC))
+
+
+def chunk_payouts(store, c, cap=None):
+    """
+    A chunk's payouts and max-win flags, as recorded or, with cap (in base
+    bets, inf for none), re-capped from the uncapped win bet x cashout x meta.
+    """
+    if cap is None:
+        return c["payout"], c["max_win"]
+    raw = c["bet"] * c["cashout"] * c["meta_total"]
+    limit = store.meta.get("base_bet", 1.0) * cap
+    return np.where(c["hit"], np.minimum(raw, limit), 0.0), c["hit"] & (raw >= limit)
+
+
+def store_stats(store, mode=None, cap=None):
+    """
+    Accumulator of a mode's rounds (of every mode by default), computed chunk
+    by chunk from the mapped columns; see chunk_payouts for cap.
+    """
+    s = new_stats()
+    for _, c in store.chunks(mode, ["bet", "payout", "hit", "max_win", "cashout", "meta_total"]):
+        payouts, max_wins = chunk_payouts(store, c, cap)
+        chunk = stats_from_payouts(payouts, float(c["bet"].sum()) / len(payouts))
+        chunk["hits"] = int(np.count_nonzero(c["hit"]))
+        chunk["max_wins"] = int(np.count_nonzero(max_wins))
+        s = merge_stats(s, chunk)
+    return s
+
+
+def store_results(store, cap=None, classify=classify_volatility, modes=None):
+    """Per-mode and overall statistics of a store's modes, with the given cap and volatility rule."""
+    summary = {mode: store_stats(store, mode, cap) for mode in modes or store.modes}
+    results = {}
+    for mode, s in list(summary.items()) + [("Overall", merge_all(summary.values()))]:
+        r = summarize(s)
+        r["max_wins"] = s["max_wins"]
+        r["volatility"] = classify(r["hit_rate"], r["sd"])
+        results[mode] = r
+    return results
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Recompute a simulation's statistics from its round store.")
+    parser.add_argument("path")
+    parser.add_argument("--mode", choices=MODES, help="only this mode")
+    parser.add_argument("--cap", type=float, help="re-apply this max win (in base bets; inf for none)")
+    args = parser.parse_args(argv)
+
+    began = time.perf_counter()
+    with open_store(args.path) as store:
+        results = store_results(store, args.cap, modes=[args.mode] if args.mode else None)
+        report = {"store": args.path, "meta": store.meta, "rounds": store.rows(args.mode), "results": results}
+    json.dump(report, sys.stdout, indent=2)
+    print(f"\nScanned in {time.perf_counter() - began:.2f} s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, wait
+
+import numpy as np
+
+from FairRNG import FairRandom, server_seed_from_int
+from GameMath import MODES, VARIANTS, classify_volatility, combine_meta_multipliers, compile_mode
+from Instrument import (count, merge_metrics, metrics_state, new_metrics, phase, report_progress, start_profiler,
+                        stop_profiler)
+from PayoutHistogram import add_payout, merge_histograms, new_histogram
+from RoundLog import log_round
+from StreamStats import add_round, merge_all, merge_stats, new_stats, summarize
+
+
+_rounds_done = None  # In a worker: the rounds every shard has played, shared with the parent for its progress lines
+
+
+def share_rounds_done(counter):
+    """Pool initializer: count this worker's rounds into the shared counter."""
+    global _rounds_done
+    _rounds_done = counter
+
+
+def new_summary():
+    """Empty per-mode shard summary."""
+    return {mode: new_stats() for mode in MODES}
+
+
+def merge_summaries(a, b):
+    """Merge two shard summaries mode by mode."""
+    return {mode: merge_stats(a[mode], b[mode]) for mode in a}
+
+
+def split_rounds(num_rounds, workers):
+    """Split num_rounds into workers near-equal shards."""
+    base, extra = divmod(num_rounds, workers)
+    return [base + (1 if i < extra else 0) for i in range(workers)]
+
+
+def run_shard(variant, rtp, base_bet, first_round, num_rounds, server_seed, mix=None, store=None, meta=None,
+              histograms=False, round_log=None, metrics=None):
+    """
+    Simulate rounds first_round .. first_round + num_rounds - 1 of one logical
+    FairRNG stream and summarize them per mode.
+    mix gives each mode's relative weight (equal, like random.choice, by default).
+    With store (a path), every round is also written to a RoundStore file.
+    With histograms, each mode's payouts are also counted into a
+    PayoutHistogram capped at its max win, and (summary, histograms) is
+    returned. With round_log (RoundLog.new_round_log), every round is logged.
+    With metrics (Instrument.new_metrics), the rounds, 0.1 steps climbed and
+    RNG draws are counted and progress is reported (into the parent's shared
+    counter in a metered worker process).
+    """
+    rng = FairRandom(server_seed)
+    modes = {mode: compile_mode(VARIANTS[variant][mode], rtp) for mode in MODES}
+    weights = [mix.get(mode, 0) for mode in MODES] if mix else None
+    summary = new_summary()
+    payouts = {mode: new_histogram(base_bet * modes[mode].config["cap"]) for mode in MODES} if histograms else None
+    writer = None
+    if store:
+        from RoundStore import RoundWriter
+        writer = RoundWriter(store, meta)
+    steps = draws = 0
+    reported = first_round
+    with phase(metrics, "simulate"):
+        for round_index in range(first_round, first_round + num_rounds):
+            rng.set_round(round_index)
+            mode = rng.choices(MODES, weights)[0] if weights else rng.choice(MODES)
+            bet, payout, hit, max_win, crash_point, cashout, metas = modes[mode].play(base_bet, rng)
+            add_round(summary[mode], bet, payout, hit, max_win)
+            if payouts:
+                add_payout(payouts[mode], payout)
+            if round_log:
+                log_round(round_log, round_index, mode, bet, payout, hit, crash_point, cashout, metas)
+            if writer:
+                writer.add_round(mode, round_index, bet, payout, hit, max_win, crash_point, cashout, len(metas),
+                                 combine_meta_multipliers(modes[mode].config, metas))
+            if metrics is not None:
+                steps += modes[mode].grid.index(min(cashout, crash_point))
+                draws += rng.draws()
+                if round_index & 4095 == 0:
+                    if _rounds_done is None:
+                        report_progress(metrics, round_index - first_round, num_rounds)
+                    else:
+                        with _rounds_done.get_lock():
+                            _rounds_done.value += round_index - reported
+                        reported = round_index
+    if metrics is not None and _rounds_done is not None:
+        with _rounds_done.get_lock():
+            _rounds_done.value += first_round + num_rounds - reported
+    count(metrics, "rounds", num_rounds)
+    count(metrics, "steps", steps)
+    count(metrics, "rng_draws", draws)
+    if writer:
+        with phase(metrics, "store"):
+            writer.close()
+    return (summary, payouts) if histograms else summary
+
+
+def run_metered_shard(profile, *args):
+    """run_shard in a worker process with its own metrics; returns (summary, metrics_state)."""
+    metrics = new_metrics(profile=profile)
+    start_profiler(metrics)
+    summary = run_shard(*args, metrics=metrics)
+    return summary, metrics_state(metrics)
+
+
+def run_sharded(variant, rtp, base_bet, num_rounds, workers=1, master_seed=None, mix=None, store=None,
+                metrics=None, histograms=False, round_log=None):
+    """
+    Simulate num_rounds split across worker processes.
+    Every shard plays its own contiguous range of the rounds of one server
+    seed, so the rounds played don't depend on the worker count, and shards
+    are merged in shard order, so the result is bit-reproducible for a given
+    master seed and worker count. Without a master seed a random one is
+    drawn and printed to stderr (and kept in the store's meta), so the run
+    can still be repeated.
+    With store (a path), the rounds are also written to a RoundStore file:
+    each shard writes its own part, and the parts are joined in shard order.
+    With metrics, each worker keeps its own and they are merged (phases as
+    CPU seconds); the workers count their rounds into one shared counter and
+    this process prints the progress lines for the whole run.
+    With histograms, returns (summary, {mode: PayoutHistogram}) merged the
+    same way. A round_log can only follow the rounds of one process.
+    """
+    if round_log and round_log["level"] != "summary" and workers > 1:
+        raise ValueError("Rounds can only be logged with one worker")
+    if master_seed is None:
+        master_seed = int(np.random.SeedSequence().entropy)
+        print(f"Master seed: {master_seed}", file=sys.stderr)
+    server_seed = server_seed_from_int(master_seed)
+    sizes = split_rounds(num_rounds, workers)
+    firsts = [sum(sizes[:i]) for i in range(workers)]
+    parts = [None] * workers
+    if store:
+        parts = [store] if workers == 1 else [f"{store}.part{i}" for i in range(workers)]
+    meta = {"game": "knight", "variant": variant, "rtp": rtp, "base_bet": base_bet, "seed": master_seed,
+            "caps": {mode: VARIANTS[variant][mode]["cap"] for mode in MODES}}
+    args = ([variant] * workers, [rtp] * workers, [base_bet] * workers, firsts, sizes, [server_seed] * workers,
+            [mix] * workers, parts, [meta] * workers, [histograms] * workers)
+    if workers == 1:
+        results = [run_shard(*next(zip(*args)), round_log=round_log, metrics=metrics)]
+    elif metrics is None:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(run_shard, *args))
+    else:
+        stop_profiler(metrics)  # The workers profile themselves; this process only waits
+        rounds_done = multiprocessing.Value("q", 0)
+        with ProcessPoolExecutor(max_workers=workers, initializer=share_rounds_done,
+                                 initargs=(rounds_done,)) as pool:
+            futures = [pool.submit(run_metered_shard, metrics["profile"], *shard) for shard in zip(*args)]
+            while wait(futures, timeout=metrics["progress"] or None).not_done:
+                report_progress(metrics, rounds_done.value, num_rounds)
+            metered = [future.result() for future in futures]
+        results = [summary for summary, _ in metered]
+        for _, state in metered:
+            merge_metrics(metrics, state)
+    if store and workers > 1:
+        with phase(metrics, "store"):
+            from RoundStore import merge_stores
+            merge_stores(parts, store)
+            for part in parts:
+                os.remove(part)
+
+    if histograms:
+        results, shard_histograms = zip(*results)
+    merged = results[0]
+    for summary in results[1:]:
+        merged = merge_summaries(merged, summary)
+    if histograms:
+        payouts = shard_histograms[0]
+        for h in shard_histograms[1:]:
+            payouts = {mode: merge_histograms(payouts[mode], h[mode]) for mode in MODES}
+        return merged, payouts
+    return merged
+
+
+def print_results(summary, rtp, num_rounds):
+    """Print overall and per-mode results in the stats scripts' format."""
+    overall = summarize(merge_all(summary.values()))
+    overall_hit_rate = overall["hit_rate"]
+
+    print("\n**Overall Simulation Results**")
+    print(f"Total rounds: {num_rounds}")
+    print(f"Total spent: {overall['total_spent']:.2f}")
+    print(f"Total winnings: {overall['total_winnings']:.2f}")
+    print(f"RTP: {overall['rtp']:.2f}% (Target: {rtp}%)")
+    print(f"Mean Payout: {overall['mean']:.2f}")
+    print(f"Standard Deviation: {overall['sd']:.2f}")
+    print(f"Variance: {overall['variance']:.2f}")
+    print(f"Hit Rate: {overall_hit_rate:.2f}%")
+    print(f"Max Wins: {sum(summary[m]['max_wins'] for m in summary)}")
+    print(f"Max Win Rate: {overall['max_win_rate']:.2f}%")
+    print(f"Volatility: {classify_volatility(overall_hit_rate, overall['sd'])}")
+
+    for mode in summary:
+        s = summarize(summary[mode])
+        print(f"\n**{mode} Mode Results**")
+        print(f"Rounds: {s['rounds']}")
+        print(f"Total bets: {s['total_spent']:.2f}")
+        print(f"Total wins: {s['total_winnings']:.2f}")
+        print(f"RTP: {s['rtp']:.2f}%")
+        print(f"Mean Payout: {s['mean']:.2f}")
+        print(f"Standard Deviation: {s['sd']:.2f}")
+        print(f"Variance: {s['variance']:.2f}")
+        print(f"Hit Rate: {s['hit_rate']:.2f}%")
+        print(f"Max Wins: {summary[mode]['max_wins']}")
+        print(f"Max Win Rate: {s['max_win_rate']:.2f}%")
+        print(f"Volatility: {classify_volatility(s['hit_rate'], s['sd'])}")
+
+
+if __name__ == "__main__":
+    print("Welcome to the Knight's Ascent Sharded RTP Simulation!")
+
+    variants = list(VARIANTS)
+    for i, name in enumerate(variants, 1):
+        print(f"{i}. {name}")
+    variant = variants[int(input(f"Enter variant (1-{len(variants)}): ")) - 1]
+    rtp = float(input("Enter desired RTP (e.g., 95 for 95%): "))
+    base_bet = float(input("Enter standard bet amount (e.g., 1.0): "))
+    num_rounds = int(input("Enter number of rounds to simulate: "))
+    workers = int(input("Enter number of worker processes: "))
+    seed_input = input("Enter master seed (blank for random): ").strip()
+    master_seed = int(seed_input) if seed_input else None  # run_sharded draws and prints one
+
+    summary = run_sharded(variant, rtp, base_bet, num_rounds, workers, master_seed)
+    print_results(summary, rtp, num_rounds)
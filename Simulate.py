@@ -0,0 +1,253 @@
+import argparse
+import csv
+import json
+import sys
+
+import numpy as np
+
+from FairRNG import server_seed_from_int
+from GameMath import MODES, VARIANTS, classify_volatility
+from Instrument import count, finish_metrics, new_metrics, phase, report_progress, start_profiler, write_metrics
+from StreamStats import merge_all, merge_stats, new_stats, stats_from_payouts, summarize
+
+
+def parse_mix(text):
+    """Parse a mode mix such as "Normal=2,Additional=1,Additional MAX=1" into weights."""
+    mix = {}
+    for part in text.split(","):
+        mode, _, weight = part.partition("=")
+        mode = mode.strip()
+        if mode not in MODES:
+            raise argparse.ArgumentTypeError(f"Unknown mode {mode!r} (expected one of {', '.join(MODES)})")
+        try:
+            mix[mode] = float(weight)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"Bad weight {weight!r} for {mode}") from None
+    if sum(mix.values()) <= 0:
+        raise argparse.ArgumentTypeError("Mode weights must add up to more than 0")
+    return mix
+
+
+def new_seed():
+    """Fresh seed to report with the results so the run can be repeated."""
+    return int(np.random.SeedSequence().entropy)
+
+
+def mode_results(summary):
+    """Per-mode and overall statistics of a {mode: accumulator} summary."""
+    results = {}
+    for mode, s in list(summary.items()) + [("Overall", merge_all(summary.values()))]:
+        r = summarize(s)
+        r["max_wins"] = s["max_wins"]
+        r["volatility"] = classify_volatility(r["hit_rate"], r["sd"])
+        results[mode] = r
+    return results
+
+
+def run_crash(rtp, rounds, bet=1.0, seed=None, engine="batch", fair=False, metrics=None):
+    """
+    Bathyscaphe Depths cycles with GameStats' random parameters. The scalar
+    engine draws cycle i from FairRNG round i; the batch engine keeps NumPy's
+    generator for speed unless fair is set.
+    """
+    from GameStats import simulate_cycles
+
+    if engine == "batch":
+        from CrashBatch import simulate_batch
+        if fair:
+            return {"Overall": simulate_batch(rtp, rounds, bet, server_seed=server_seed_from_int(seed),
+                                              metrics=metrics)}
+        return {"Overall": simulate_batch(rtp, rounds, bet, seed=seed, metrics=metrics)}
+    return {"Overall": simulate_cycles(rtp, rounds, bet, server_seed=server_seed_from_int(seed), metrics=metrics)}
+
+
+def run_crash_adaptive(rtp, rtp_width, hit_width=None, max_rounds=100_000_000, bet=1.0, seed=None, metrics=None):
+    """
+    Bathyscaphe Depths batch-engine cycles until their RTP (and hit-rate)
+    confidence interval reaches the target width; max_rounds caps the total.
+    """
+    from AdaptiveRunner import run_adaptive_crash
+
+    with phase(metrics, "simulate"):
+        summary, status = run_adaptive_crash(rtp, bet, rtp_width, hit_width, max_rounds, seed=seed, metrics=metrics,
+                                             progress=lambda summary, needs: report_progress(
+                                                 metrics, summary["Overall"]["rounds"], max_rounds, "cycles"))
+    return adaptive_results(summary, status)
+
+
+def run_knight(variant, rtp, base_bet, rounds, seed=None, mix=None, workers=1, store=None, metrics=None):
+    """
+    Knight's Ascent rounds of one stats script variant, sharded over worker
+    processes; with store, every round is also written to that RoundStore file.
+    """
+    from ShardRunner import run_sharded
+
+    return mode_results(run_sharded(variant, rtp, base_bet, rounds, workers, seed, mix, store, metrics))
+
+
+def run_knight_adaptive(variant, rtp, base_bet, rtp_width, hit_width=None, max_rounds=100_000_000, seed=None,
+                        workers=1, engine="batch", metrics=None):
+    """
+    Knight's Ascent rounds per mode until the RTP (and hit-rate) confidence
+    intervals reach the target widths; max_rounds caps the total. The engine
+    is AdaptiveRunner's (only the scalar one uses workers), so a seed gives
+    the same run whatever the worker count.
+    """
+    from AdaptiveRunner import run_adaptive
+
+    with phase(metrics, "simulate"):
+        summary, status = run_adaptive(variant, rtp, base_bet, rtp_width, hit_width, max_rounds, seed=seed,
+                                       workers=workers, engine=engine, metrics=metrics,
+                                       progress=lambda summary, needs: report_progress(
+                                           metrics, sum(s["rounds"] for s in summary.values()), max_rounds))
+    return adaptive_results(summary, status)
+
+
+def adaptive_results(summary, status):
+    """Statistics of an adaptive run's groups, with their intervals and whether they converged."""
+    results = {}
+    for group, s in summary.items():
+        r = summarize(s)
+        r["max_wins"] = s["max_wins"]
+        r["volatility"] = classify_volatility(r["hit_rate"], r["sd"])
+        r.update(status[group])
+        results[group] = r
+    return results
+
+
+def run_markov(rtp, base_bet, rounds, seed=None, mix=None, chunk_size=1_000_000, metrics=None):
+    """Markov-chain Knight's Ascent rounds, sampled in vectorized chunks per mode."""
+    from MarkovChain import (BET_MULTIPLIERS, CASHOUT_PROB, MULTIPLIERS, calibrate_crash_probs, compile_chain,
+                             sample_chain_rounds)
+
+    rng = np.random.default_rng(seed)
+    weights = np.array([(mix or {}).get(mode, 0 if mix else 1) for mode in MODES], dtype=float)
+    counts = rng.multinomial(rounds, weights / weights.sum())
+    with phase(metrics, "calibrate"):
+        crash_probs = calibrate_crash_probs(rtp)
+
+    summary = {}
+    done = 0
+    for mode, mode_rounds in zip(MODES, counts):
+        with phase(metrics, "compile"):
+            chain = compile_chain(MULTIPLIERS, crash_probs[mode]["value"], CASHOUT_PROB)
+        bet = base_bet * BET_MULTIPLIERS[mode]
+        stats = new_stats()
+        for start in range(0, mode_rounds, chunk_size):
+            size = min(chunk_size, mode_rounds - start)
+            with phase(metrics, "simulate"):
+                payouts = sample_chain_rounds(chain, bet, mode, size, rng=rng, metrics=metrics)
+            with phase(metrics, "reduce"):
+                stats = merge_stats(stats, stats_from_payouts(payouts, bet, base_bet * 50000))
+            done += size
+            count(metrics, "rounds", size)
+            report_progress(metrics, done, rounds)
+        summary[mode] = stats
+    return mode_results(summary)
+
+
+def write_results(report, fmt, out):
+    """Write the report as one JSON document or as CSV rows (one per result group)."""
+    if fmt == "json":
+        json.dump(report, out, indent=2)
+        out.write("\n")
+        return
+    groups = report["results"]
+    columns = sorted({key for r in groups.values() for key in r})
+    writer = csv.writer(out)
+    writer.writerow(["command", "group"] + columns)
+    for group, r in groups.items():
+        writer.writerow([report["command"], group] + [r.get(key, "") for key in columns])
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Run a simulation without prompts and print one summary.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def add_common(sub, rtp_default):
+        sub.add_argument("--rtp", type=float, default=rtp_default, help="target RTP in percent")
+        sub.add_argument("--bet", type=float, default=1.0, help="(base) bet amount")
+        sub.add_argument("--rounds", type=int, required=True,
+                         help="number of rounds to simulate (the round budget with --rtp-width)")
+        sub.add_argument("--seed", type=int, help="master seed (random if omitted; reported in the output)")
+        sub.add_argument("--format", choices=["json", "csv"], default="json", help="output format")
+        sub.add_argument("--output", help="write the summary to this file instead of stdout")
+        sub.add_argument("--metrics", nargs="?", const="-",
+                         help="write run metrics (phase timers, rates, RNG draws, peak RSS) as JSON to this file "
+                              "(stderr without one)")
+        sub.add_argument("--progress", type=float, default=0.0, help="print a progress line every this many seconds")
+        sub.add_argument("--profile", action="store_true", help="sample the running stack into the metrics")
+
+    crash = commands.add_parser("crash", help="Bathyscaphe Depths (GameStats.py)")
+    add_common(crash, 97.0)
+    crash.add_argument("--engine", choices=["batch", "scalar"], default="batch")
+    crash.add_argument("--fair", action="store_true", help="draw batch cycles from FairRNG rounds (slower)")
+    crash.add_argument("--rtp-width", type=float,
+                       help="simulate batch cycles until the RTP CI is this wide (percentage points); no --fair")
+    crash.add_argument("--hit-width", type=float, help="with --rtp-width, also the target hit-rate CI width")
+
+    knight = commands.add_parser("knight", help="Knight's Ascent stats scripts")
+    add_common(knight, 95.0)
+    knight.add_argument("--variant", choices=list(VARIANTS), default="KnightStats")
+    knight.add_argument("--mix", type=parse_mix, help='mode weights, e.g. "Normal=2,Additional=1"')
+    knight.add_argument("--workers", type=int, default=1, help="worker processes")
+    knight.add_argument("--rtp-width", type=float,
+                        help="simulate each mode until its RTP CI is this wide (percentage points); no --mix")
+    knight.add_argument("--hit-width", type=float, help="with --rtp-width, also the target hit-rate CI width")
+    knight.add_argument("--engine", choices=["batch", "scalar"],
+                        help="with --rtp-width: NumPy batches (default; one process) or FairRNG rounds over --workers")
+    knight.add_argument("--store",
+                        help="also write every round to this round store file (see RoundStore.py); no --rtp-width")
+
+    markov = commands.add_parser("markov", help="Knight Game with Markov Chain.py")
+    add_common(markov, 95.0)
+    markov.add_argument("--mix", type=parse_mix, help='mode weights, e.g. "Normal=2,Additional=1"')
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == "knight":
+        if args.engine and args.rtp_width is None:
+            parser.error("--engine only applies with --rtp-width")
+        if args.rtp_width is not None and (args.mix or args.store):
+            parser.error("--rtp-width can't be combined with --mix or --store")
+        if args.rtp_width is not None and args.workers > 1 and args.engine != "scalar":
+            parser.error("--workers with --rtp-width needs --engine scalar")
+    if args.command == "crash" and args.rtp_width is not None and (args.fair or args.engine != "batch"):
+        parser.error("--rtp-width runs the NumPy batch engine; drop --fair and --engine scalar")
+    seed = args.seed if args.seed is not None else new_seed()
+    metrics = None
+    if args.metrics or args.progress or args.profile:
+        metrics = new_metrics(args.progress, args.profile)
+        start_profiler(metrics)
+
+    if args.command == "crash" and args.rtp_width is not None:
+        results = run_crash_adaptive(args.rtp, args.rtp_width, args.hit_width, args.rounds, args.bet, seed, metrics)
+    elif args.command == "crash":
+        results = run_crash(args.rtp, args.rounds, args.bet, seed, args.engine, args.fair, metrics)
+    elif args.command == "knight" and args.rtp_width is not None:
+        results = run_knight_adaptive(args.variant, args.rtp, args.bet, args.rtp_width, args.hit_width, args.rounds,
+                                      seed, args.workers, args.engine or "batch", metrics)
+    elif args.command == "knight":
+        results = run_knight(args.variant, args.rtp, args.bet, args.rounds, seed, args.mix, args.workers,
+                             args.store, metrics)
+    else:
+        results = run_markov(args.rtp, args.bet, args.rounds, seed, args.mix, metrics=metrics)
+    if metrics is not None and (args.metrics or args.profile):
+        write_metrics(finish_metrics(metrics), args.metrics or "-")
+
+    parameters = {k: v for k, v in vars(args).items()
+                  if k not in ("command", "format", "output", "metrics", "progress", "profile")}
+    parameters["seed"] = seed
+    report = {"command": args.command, "parameters": parameters, "results": results}
+    if args.output:
+        with open(args.output, "w", newline="") as out:
+            write_results(report, args.format, out)
+    else:
+        write_results(report, args.format, sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
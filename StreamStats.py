@@ -0,0 +1,131 @@
+import math
+
+
+def new_stats():
+    """
+    Empty one-pass payout accumulator.
+    Holds totals, counts and the central moment sums m2..m4 of the payouts,
+    so memory stays constant however many rounds are added.
+    """
+    return {"rounds": 0, "total_spent": 0, "total_winnings": 0, "hits": 0, "max_wins": 0,
+            "mean": 0.0, "m2": 0.0, "m3": 0.0, "m4": 0.0, "min": math.inf, "max": -math.inf}
+
+
+def add_round(s, bet, payout, hit=False, max_win=False):
+    """Add one round to the accumulator (Welford/Terriberry update)."""
+    n1 = s["rounds"]
+    n = n1 + 1
+    s["rounds"] = n
+    s["total_spent"] += bet
+    s["total_winnings"] += payout
+    if hit:
+        s["hits"] += 1
+    if max_win:
+        s["max_wins"] += 1
+    if payout < s["min"]:
+        s["min"] = payout
+    if payout > s["max"]:
+        s["max"] = payout
+
+    delta = payout - s["mean"]
+    delta_n = delta / n
+    delta_n2 = delta_n * delta_n
+    term1 = delta * delta_n * n1
+    s["mean"] += delta_n
+    s["m4"] += term1 * delta_n2 * (n * n - 3 * n + 3) + 6 * delta_n2 * s["m2"] - 4 * delta_n * s["m3"]
+    s["m3"] += term1 * delta_n * (n - 2) - 3 * delta_n * s["m2"]
+    s["m2"] += term1
+
+
+def stats_from_payouts(payouts, bet, max_win_at=math.inf):
+    """
+    Accumulator for a NumPy array of payouts that all staked `bet`, computed in
+    one vectorized pass. Payouts above 0 count as hits, at or above max_win_at
+    as max wins. Merge it into a running accumulator with merge_stats.
+    """
+    import numpy as np
+
+    payouts = np.asarray(payouts, dtype=float)
+    s = new_stats()
+    n = len(payouts)
+    if n == 0:
+        return s
+    mean = payouts.mean()
+    centered = payouts - mean
+    squared = centered * centered
+    s.update({
+        "rounds": n,
+        "total_spent": bet * n,
+        "total_winnings": float(payouts.sum()),
+        "hits": int(np.count_nonzero(payouts > 0)),
+        "max_wins": int(np.count_nonzero(payouts >= max_win_at)),
+        "mean": float(mean),
+        "m2": float(squared.sum()),
+        "m3": float((squared * centered).sum()),
+        "m4": float((squared * squared).sum()),
+        "min": float(payouts.min()),
+        "max": float(payouts.max()),
+    })
+    return s
+
+
+def merge_stats(a, b):
+    """Combine the accumulators of two disjoint samples (Chan/Pébay)."""
+    na, nb = a["rounds"], b["rounds"]
+    n = na + nb
+    if na == 0:
+        return dict(b)
+    if nb == 0:
+        return dict(a)
+    delta = b["mean"] - a["mean"]
+    delta2 = delta * delta
+    m2 = a["m2"] + b["m2"] + delta2 * na * nb / n
+    m3 = (a["m3"] + b["m3"] + delta2 * delta * na * nb * (na - nb) / n ** 2
+          + 3 * delta * (na * b["m2"] - nb * a["m2"]) / n)
+    m4 = (a["m4"] + b["m4"] + delta2 * delta2 * na * nb * (na * na - na * nb + nb * nb) / n ** 3
+          + 6 * delta2 * (na * na * b["m2"] + nb * nb * a["m2"]) / n ** 2
+          + 4 * delta * (na * b["m3"] - nb * a["m3"]) / n)
+    return {
+        "rounds": n,
+        "total_spent": a["total_spent"] + b["total_spent"],
+        "total_winnings": a["total_winnings"] + b["total_winnings"],
+        "hits": a["hits"] + b["hits"],
+        "max_wins": a["max_wins"] + b["max_wins"],
+        "mean": a["mean"] + delta * nb / n,
+        "m2": m2,
+        "m3": m3,
+        "m4": m4,
+        "min": min(a["min"], b["min"]),
+        "max": max(a["max"], b["max"]),
+    }
+
+
+def merge_all(accumulators):
+    """Merge an iterable of accumulators in order."""
+    merged = new_stats()
+    for s in accumulators:
+        merged = merge_stats(merged, s)
+    return merged
+
+
+def summarize(s):
+    """Derived statistics of an accumulator, matching the stats scripts' definitions."""
+    n = s["rounds"]
+    variance = s["m2"] / (n - 1) if n > 1 else 0
+    skewness = math.sqrt(n) * s["m3"] / s["m2"] ** 1.5 if s["m2"] > 0 else 0
+    kurtosis = n * s["m4"] / s["m2"] ** 2 - 3 if s["m2"] > 0 else 0
+    return {
+        "rounds": n,
+        "total_spent": s["total_spent"],
+        "total_winnings": s["total_winnings"],
+        "rtp": (s["total_winnings"] / s["total_spent"]) * 100 if s["total_spent"] > 0 else 0,
+        "mean": s["mean"] if n > 0 else 0,
+        "sd": math.sqrt(variance),
+        "variance": variance,
+        "min": s["min"] if n > 0 else 0,
+        "max": s["max"] if n > 0 else 0,
+        "skewness": skewness,
+        "kurtosis": kurtosis,
+        "hit_rate": (s["hits"] / n) * 100 if n > 0 else 0,
+        "max_win_rate": (s["max_wins"] / n) * 100 if n > 0 else 0,
+    }
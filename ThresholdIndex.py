@@ -0,0 +1,222 @@
+import random
+import time
+
+import numpy as np
+
+from CrashRound import MAX_MULTIPLIER, step_grid
+
+# Same-tick events fire in Game.py's loop order: fireproof, send, cashout
+FIREPROOF, SEND, CASHOUT, CRASH = 0, 1, 2, 3
+KINDS = ("fireproof", "send", "cashout", "crash")
+
+
+def check_thresholds(*thresholds):
+    """
+    Raise ValueError unless every threshold (a number or a sequence of them)
+    is finite and at most MAX_MULTIPLIER: the step grid is extended up to the
+    largest one, so an unbounded threshold would never finish indexing.
+    """
+    for values in thresholds:
+        values = np.asarray(values, dtype=np.float64)
+        if not np.isfinite(values).all():
+            raise ValueError("Bet thresholds must be finite numbers")
+        if values.size and values.max() > MAX_MULTIPLIER:
+            raise ValueError(f"Bet thresholds can't exceed {MAX_MULTIPLIER:,}x")
+
+
+class ArrayThresholdIndex:
+    """
+    The bets of one crash round, indexed by the grid tick at which each of
+    their events fires, on NumPy arrays. Payouts are the same as
+    resolve_round's for every bet.
+
+    start() converts all thresholds to ticks in one pass and precomputes every
+    event's amount (a send always fires before its own cashout, so the stake
+    left at cashout is known up front). advance() is then a searchsorted and
+    a slice of the sorted events, and settle() resolves every bet for a known
+    crash point without going through the events at all. Events come back as
+    parallel arrays (bet numbers, kinds, multipliers, amounts); bet number i is
+    the i-th bet added and keys[i] its key.
+    """
+
+    def __init__(self, step=0.01):
+        self.grid = step_grid(step)
+        self.keys = []
+        self._columns = ([], [], [], [], [])  # bet, M, send multiplier, send percentage, M_f
+        self.started = False
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add_bet(self, key, bet, M, send_multiplier=0, send_percentage=0, M_f=0):
+        """Add one bet and return its bet number."""
+        return self.add_bets([key], [bet], [M], [send_multiplier], [send_percentage], [M_f])
+
+    def add_bets(self, keys, bet, M, send_multiplier, send_percentage, M_f):
+        """Add many bets at once (one sequence per setting); returns the first one's bet number."""
+        if self.started:
+            raise RuntimeError("The round has already started")
+        check_thresholds(M, send_multiplier, M_f)
+        first = len(self.keys)
+        self.keys.extend(keys)
+        for column, values in zip(self._columns, (bet, M, send_multiplier, send_percentage, M_f)):
+            column.extend(values)
+        return first
+
+    def start(self):
+        """Close betting: compute every bet's event ticks and amounts and sort the events."""
+        grid = self.grid
+        bet, M, send_multiplier, send_percentage, M_f = (np.array(c, dtype=np.float64) for c in self._columns)
+        self.bet = bet
+        self.k_cashout = grid.indexes(M)
+        self.k_send = grid.indexes(send_multiplier)
+        self.k_fireproof = grid.indexes(M_f)
+        # Sends and fireproofs past the cashout tick can never fire
+        self.has_send = (send_multiplier > 0) & (self.k_send <= self.k_cashout)
+        self.has_fireproof = (M_f > 0) & (self.k_fireproof <= self.k_cashout)
+
+        self.remaining_bet = np.where(self.has_send, (1 - send_percentage / 100) * bet, bet)
+        self.fireproof_amount = bet * M_f
+        self.send_amount = (send_percentage / 100) * bet * grid.values(self.k_send)
+        self.cashout_amount = self.remaining_bet * grid.values(self.k_cashout)
+
+        numbers = np.arange(len(bet))
+        send, fireproof = np.flatnonzero(self.has_send), np.flatnonzero(self.has_fireproof)
+        ticks = np.concatenate([self.k_fireproof[fireproof], self.k_send[send], self.k_cashout])
+        kinds = np.concatenate([np.full(len(fireproof), FIREPROOF), np.full(len(send), SEND),
+                                np.full(len(numbers), CASHOUT)])
+        event_numbers = np.concatenate([fireproof, send, numbers])
+        amounts = np.concatenate([self.fireproof_amount[fireproof], self.send_amount[send], self.cashout_amount])
+        order = np.lexsort((event_numbers, kinds, ticks))
+        self.ticks = ticks[order]
+        self.kinds = kinds[order]
+        self.numbers = event_numbers[order]
+        self.multipliers = grid.values(self.ticks)
+        self.amounts = amounts[order]
+        self._next = 0
+        self.started = True
+
+    def crash_tick(self, C):
+        """First tick the round doesn't reach (the loop stops once multiplier >= C)."""
+        return self.grid.index(C)
+
+    def advance(self, tick):
+        """Fire every event up to and including tick: (numbers, kinds, multipliers, amounts) in loop order."""
+        end = int(np.searchsorted(self.ticks, tick, side="right"))
+        fired = slice(self._next, max(end, self._next))
+        self._next = fired.stop
+        return self.numbers[fired], self.kinds[fired], self.multipliers[fired], self.amounts[fired]
+
+    def crash(self, C):
+        """End the round at C: every bet still riding loses its remaining stake."""
+        k_crash = self.crash_tick(C)
+        lost = np.flatnonzero(self.k_cashout >= k_crash)
+        sent = self.has_send[lost] & (self.k_send[lost] < k_crash)
+        amounts = np.where(sent, self.remaining_bet[lost], self.bet[lost])
+        return lost, np.full(len(lost), CRASH), np.full(len(lost), C), amounts
+
+    def settle(self, C):
+        """
+        Every bet's outcome at crash point C in one vectorized pass: winnings
+        (bit-identical to resolve_round), cashed_out and remaining_bet arrays.
+        """
+        k_crash = self.crash_tick(C)
+        cashed_out = self.k_cashout < k_crash
+        sent = self.has_send & (self.k_send < k_crash)
+        fireproof = self.has_fireproof & (self.k_fireproof < k_crash)
+        # Cashout fires last; the other two commute, so this is the loop's summation order
+        winnings = ((np.where(fireproof, self.fireproof_amount, 0.0) + np.where(sent, self.send_amount, 0.0))
+                    + np.where(cashed_out, self.cashout_amount, 0.0))
+        return {
+            "winnings": winnings,
+            "cashed_out": cashed_out,
+            "remaining_bet": np.where(sent, self.remaining_bet, self.bet),
+        }
+
+
+def naive_scan(bets, C, step=0.01):
+    """
+    Game.py's loop for a whole round of bets: every step checks every bet that
+    hasn't cashed out, so the cost is O(bets x steps). Returns each bet's winnings.
+    """
+    winnings = [0] * len(bets)
+    remaining = [bet[0] for bet in bets]
+    sent = [False] * len(bets)
+    fireproof_reached = [False] * len(bets)
+    active = list(range(len(bets)))
+    multiplier = 1.00
+    while multiplier < C and active:
+        still_active = []
+        for i in active:
+            bet, M, send_multiplier, send_percentage, M_f = bets[i]
+            if M_f > 0 and multiplier >= M_f and not fireproof_reached[i]:
+                winnings[i] += bet * M_f
+                fireproof_reached[i] = True
+            if send_multiplier > 0 and multiplier >= send_multiplier and not sent[i]:
+                winnings[i] += (send_percentage / 100) * bet * multiplier
+                remaining[i] = (1 - send_percentage / 100) * bet
+                sent[i] = True
+            if multiplier >= M:
+                winnings[i] += remaining[i] * multiplier
+            else:
+                still_active.append(i)
+        active = still_active
+        multiplier += step
+    return winnings
+
+
+def random_bets(n, seed=0):
+    """n bets of 1.0 with random auto-cashout and, sometimes, send and fireproof thresholds."""
+    rng = random.Random(seed)
+    bets = []
+    for _ in range(n):
+        M = round(1 + rng.expovariate(1 / 1.5), 2)
+        send_multiplier, send_percentage, M_f = 0, 0, 0
+        if rng.random() < 0.2:
+            send_multiplier, send_percentage = round(rng.uniform(1.0, M), 2), rng.randint(10, 90)
+        if rng.random() < 0.1:
+            M_f = round(rng.uniform(1.0, 3.0), 2)
+        bets.append((1.0, M, send_multiplier, send_percentage, M_f))
+    return bets
+
+
+def benchmark(sizes=(1000, 10000, 100000), C=5.0, steps_per_tick=5):
+    """
+    Resolve a round of each size with the naive per-step scan and with
+    ArrayThresholdIndex (live ticks of steps_per_tick steps, and settle).
+    """
+    for n in sizes:
+        bets = random_bets(n)
+        began = time.perf_counter()
+        expected = naive_scan(bets, C)
+        naive = time.perf_counter() - began
+
+        columns = list(zip(*bets))
+        began = time.perf_counter()
+        arrays = ArrayThresholdIndex()
+        arrays.add_bets(range(n), *columns)
+        arrays.start()
+        built = time.perf_counter() - began
+        began = time.perf_counter()
+        outcome = arrays.settle(C)
+        settled = time.perf_counter() - began
+
+        last_tick = arrays.crash_tick(C) - 1
+        tick_times = []
+        for tick in range(steps_per_tick - 1, last_tick + steps_per_tick, steps_per_tick):
+            began = time.perf_counter()
+            arrays.advance(min(tick, last_tick))
+            tick_times.append(time.perf_counter() - began)
+        began = time.perf_counter()
+        arrays.crash(C)
+        tick_times.append(time.perf_counter() - began)
+
+        matches = outcome["winnings"].tolist() == expected
+        print(f"{n} bets, crash at {C}x: naive scan {naive * 1000:.1f} ms, "
+              f"arrays {built * 1000:.1f} ms build + {settled * 1000:.2f} ms settle "
+              f"({naive / (built + settled):.0f}x), live ticks mean {np.mean(tick_times) * 1e6:.0f} us "
+              f"max {max(tick_times) * 1e6:.0f} us, {'matches' if matches else 'DIFFERS from'} naive scan")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,258 @@
+import argparse
+import math
+
+import numpy as np
+
+from CrashRound import step_grid
+from GameMath import CASHOUT_HIGH, CASHOUT_LOW, MODES, STEP, VARIANTS, crash_points
+from KnightAnalytic import analyze_mode
+from MetaSampler import combine_counts, sum_pmf, total_table
+
+CONTROL_CAP = CASHOUT_HIGH  # Control variate min(max(C, 1), 50): no cashout target goes higher
+METRICS = {"rtp": "RTP", "hit_rate": "Hit Rate", "max_win_rate": "Max Win Rate"}
+
+# Importance-sampling tilt toward max wins (see sample_rounds): high crash points,
+# cashout targets near 50x and twice as many metas, mixed 50/50 with the real game
+TILT = {"crash": 0.3, "cashout": 3.0, "meta": 2.0, "mix": 0.5}
+
+# Preset estimators. strata: equal-probability strata of the crash draw; tilt:
+# importance sampling; control: use min(C, 50) as a control variate;
+# conditional: count max wins by their probability given the meta count.
+METHODS = {
+    "plain": {"strata": 1, "tilt": {}, "control": False, "conditional": False},
+    "stratified": {"strata": 64, "tilt": {}, "control": False, "conditional": False},
+    "control": {"strata": 1, "tilt": {}, "control": True, "conditional": False},
+    "importance": {"strata": 1, "tilt": TILT, "control": False, "conditional": True},
+    "combined": {"strata": 64, "tilt": TILT, "control": True, "conditional": True},
+}
+
+
+def control_mean(config, rtp, cap=CONTROL_CAP):
+    """
+    Exact E[min(max(C, 1), cap)] under generate_crash_point: 1 plus the
+    integral of P(C > x) = min(s / x, s * threshold_scale, 1) over [1, cap].
+    """
+    s = (rtp / 100) * config["crash_scale"]
+    flat = min(s * config["threshold_scale"], 1.0)
+    knee = min(max(s / flat, 1.0), cap)  # Where s / x drops below the flat part
+    return 1 + flat * (knee - 1) + s * math.log(cap / knee)
+
+
+def meta_tail(config, counts, thresholds):
+    """
+    P(combined meta-multiplier >= threshold | count metas collected), exactly,
+    for arrays of counts and thresholds: sums from MetaSampler's cached sum
+    distributions, products from total_table.
+    """
+    counts = np.asarray(counts)
+    initial = config["initial_metas"]
+    tail = np.zeros(len(counts))
+    if config["meta_rule"] == "sum":
+        # Smallest sum of collected metas reaching the threshold
+        needed = np.ceil(thresholds * config["meta_divisor"] - sum(initial) - 1e-9)
+        for count in np.unique(counts):
+            same = counts == count
+            survival = np.r_[np.cumsum(sum_pmf(config["meta_range"], int(count))[::-1])[::-1], 0.0]
+            tail[same] = survival[np.clip(needed[same], 0, len(survival) - 1).astype(np.int64)]
+        if not initial:
+            tail[counts == 0] = thresholds[counts == 0] <= 1  # No metas at all leaves the payout unscaled
+    else:
+        for count in np.unique(counts):
+            same = counts == count
+            values, cdf = total_table(config, int(count))
+            below = np.searchsorted(values, thresholds[same], side="left")
+            tail[same] = 1 - np.where(below > 0, np.asarray(cdf)[below - 1], 0.0)
+    return tail
+
+
+def sample_rounds(config, rtp, base_bet, size, rng, strata=1, tilt=None, conditional=False):
+    """
+    size rounds of play_round's model, vectorized and driven by explicit uniforms.
+
+    The crash draw v = 1 - u is stratified into `strata` equal-probability
+    strata (equal allocation). With a tilt, each round is drawn from the real
+    game with probability tilt["mix"] and otherwise from the tilted game: v
+    with density a * v^(a - 1) for tilt["crash"] = a < 1 (toward high crash
+    points), the cashout position w in [0, 1) with density b * w^(b - 1) for
+    tilt["cashout"] = b > 1 (toward 50x), and metas collected with probability
+    meta_prob * tilt["meta"] per step. With conditional, "max_win" is the
+    probability of a capped win given the round's meta count. Each round's "weight" is the likelihood
+    ratio of the real game to that defensive mixture, p / (mix * p + (1 - mix) * q),
+    so no weight exceeds 1 / mix.
+    """
+    tilt = tilt or {}
+    a, b = tilt.get("crash", 1.0), tilt.get("cashout", 1.0)
+    p = config["meta_prob"]
+    q = min(p * tilt.get("meta", 1.0), 0.5) if p else 0
+    mix = tilt.get("mix", 1.0) if tilt else 1.0
+    bet = base_bet * config["bet_multiplier"]
+    cap = base_bet * config["cap"]
+    grid = step_grid(STEP)
+
+    tilted = rng.random(size) >= mix
+    stratum = np.arange(size) * strata // size
+    v = 1 - (stratum + rng.random(size)) / strata  # In (0, 1]
+    v = np.where(tilted, v ** (1 / a), v)
+    crash_point = crash_points(1 - v, rtp, config)
+
+    w = 1 - rng.random(size)
+    w = np.where(tilted, w ** (1 / b), w)
+    cashout = CASHOUT_LOW + (CASHOUT_HIGH - CASHOUT_LOW) * w
+
+    steps = grid.indexes(np.minimum(cashout, crash_point))
+    hit = grid.values(steps) < crash_point
+    counts = np.zeros(size, dtype=np.int64)
+    if p:
+        counts = rng.binomial(steps, np.where(tilted, q, p))
+
+    # q / p of the whole round under the tilted game
+    ratio = a * v ** (a - 1) * b * w ** (b - 1)
+    if p and q != p:
+        ratio *= np.exp(counts * math.log(q / p) + (steps - counts) * math.log((1 - q) / (1 - p)))
+    weight = 1 / (mix + (1 - mix) * ratio)
+
+    raw = bet * cashout * combine_counts(config, counts, rng)
+    if conditional:
+        # The max-win indicator averaged over the meta values given the count
+        # (conditional Monte Carlo): the event hinges on a few large metas, which
+        # the count tilt alone can't steer toward
+        max_win = np.where(hit, meta_tail(config, counts, cap / (bet * cashout)), 0.0)
+    else:
+        max_win = hit & (raw >= cap)
+    return {
+        "bet": bet,
+        "payout": np.where(hit, np.minimum(raw, cap), 0.0),
+        "hit": hit,
+        "max_win": max_win,
+        "control": np.clip(crash_point, 1.0, CONTROL_CAP),
+        "weight": weight,
+        "stratum": stratum,
+    }
+
+
+def metric_values(rounds, metric):
+    """Per-round values whose mean is the metric (in percent)."""
+    if metric == "rtp":
+        return rounds["payout"] / rounds["bet"] * 100
+    return rounds["hit" if metric == "hit_rate" else "max_win"] * 100.0
+
+
+def new_moments(strata):
+    """Per-stratum running sums of an estimator: n, weights, values, control and their products."""
+    return {name: np.zeros(strata) for name in ("n", "w", "ww", "v", "vv", "c", "cc", "vc")}
+
+
+def add_rounds(moments, values, weights, control, stratum):
+    """Fold a batch of weighted values (and control values) into the per-stratum sums."""
+    strata = len(moments["n"])
+    v = weights * values
+    c = weights * control
+    for name, x in (("n", np.ones_like(v)), ("w", weights), ("ww", weights * weights), ("v", v),
+                    ("vv", v * v), ("c", c), ("cc", c * c), ("vc", v * c)):
+        moments[name] += np.bincount(stratum, weights=x, minlength=strata)
+
+
+def estimate(moments, mu=None, z=1.96):
+    """
+    Stratified (equal-allocation) importance-sampling estimate from running
+    sums, with min(C, 50) as a control variate when its exact mean mu is given.
+    Returns the estimate, its standard error, the confidence interval and its
+    width, the effective sample size (sum w)^2 / sum w^2 and the control
+    coefficient.
+    """
+    n = moments["n"]
+    mean_v, mean_c = moments["v"] / n, moments["c"] / n
+    var_v = (moments["vv"] - n * mean_v ** 2) / (n - 1)
+    var_c = (moments["cc"] - n * mean_c ** 2) / (n - 1)
+    cov = (moments["vc"] - n * mean_v * mean_c) / (n - 1)
+    beta = 0.0
+    if mu is not None and var_c.sum() > 0:
+        beta = cov.sum() / var_c.sum()  # Pooled within-stratum regression coefficient
+    adjusted = mean_v - beta * (mean_c - (mu if mu is not None else 0))
+    var = np.maximum(var_v - 2 * beta * cov + beta ** 2 * var_c, 0)
+    strata = len(n)
+    value = adjusted.mean()
+    se = math.sqrt((var / n).sum()) / strata
+    return {
+        "estimate": value,
+        "se": se,
+        "ci": (value - z * se, value + z * se),
+        "width": 2 * z * se,
+        "ess": moments["w"].sum() ** 2 / moments["ww"].sum(),
+        "rounds": int(n.sum()),
+        "beta": beta,
+    }
+
+
+def run_estimate(config, rtp, metric="rtp", method="combined", base_bet=1.0, rounds=1_000_000, target_width=None,
+                 batch=200_000, max_rounds=100_000_000, seed=None, z=1.96):
+    """
+    Estimate a mode's metric (percent) with one of METHODS. With target_width,
+    keep adding batches until the confidence interval is that narrow (or
+    max_rounds is reached); otherwise simulate `rounds` rounds.
+    """
+    settings = METHODS[method]
+    rng = np.random.default_rng(seed)
+    mu = control_mean(config, rtp) if settings["control"] else None
+    moments = new_moments(settings["strata"])
+    done = 0
+    limit = max_rounds if target_width is not None else rounds
+    while done < limit:
+        size = min(batch, limit - done)
+        sampled = sample_rounds(config, rtp, base_bet, size, rng, settings["strata"], settings["tilt"],
+                                settings["conditional"])
+        add_rounds(moments, metric_values(sampled, metric), sampled["weight"], sampled["control"],
+                   sampled["stratum"])
+        done += size
+        if target_width is not None and done >= 2 * settings["strata"]:
+            if estimate(moments, mu, z)["width"] <= target_width:
+                break
+    return estimate(moments, mu, z)
+
+
+def plain_variance(exact, metric):
+    """Per-round variance of plain Monte Carlo for the metric, from KnightAnalytic's exact results."""
+    if metric == "rtp":
+        return exact["variance"] / exact["bet"] ** 2 * 100 ** 2
+    rate = exact[metric]
+    return rate * (100 - rate)
+
+
+def compare(variant, mode, rtp, metric="rtp", rounds=1_000_000, target_width=None, seed=0, z=1.96):
+    """
+    Run every method on one mode and print its estimate, CI, ESS, efficiency
+    (plain Monte Carlo's per-round variance over the method's) and the rounds
+    plain Monte Carlo would need for the same CI width.
+    """
+    config = VARIANTS[variant][mode]
+    exact = analyze_mode(config, rtp)
+    plain_var = plain_variance(exact, metric)
+    print(f"{variant} {mode}, {METRICS[metric]} (exact {exact[metric]:.6g}%)")
+    for method in METHODS:
+        r = run_estimate(config, rtp, metric, method, rounds=rounds, target_width=target_width, seed=seed, z=z)
+        line = (f"  {method:>10}: {r['estimate']:.6g}% [{r['ci'][0]:.6g}, {r['ci'][1]:.6g}] "
+                f"({r['rounds']:,} rounds, ESS {r['ess']:,.0f}")
+        if r["se"] > 0:
+            gain = plain_var / (r["se"] ** 2 * r["rounds"])
+            plain_rounds = (2 * z) ** 2 * plain_var / r["width"] ** 2
+            line += f", {gain:,.1f}x plain efficiency, plain needs {plain_rounds:,.3g} rounds for this width)"
+        else:
+            line += ", no events seen)"
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Variance-reduced RTP, hit-rate and max-win-rate estimates.")
+    parser.add_argument("--variant", choices=list(VARIANTS), default="Knight Visuals")
+    parser.add_argument("--mode", choices=MODES, default="Additional MAX")
+    parser.add_argument("--rtp", type=float, default=95.0)
+    parser.add_argument("--metric", choices=list(METRICS), default="max_win_rate")
+    parser.add_argument("--rounds", type=int, default=1_000_000)
+    parser.add_argument("--target-width", type=float, help="run each method until its CI is this wide")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    compare(args.variant, args.mode, args.rtp, args.metric, args.rounds, args.target_width, args.seed)
+
+
+if __name__ == "__main__":
+    main()
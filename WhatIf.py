@@ -0,0 +1,207 @@
+import argparse
+import json
+import math
+
+import numpy as np
+
+from CrashBatch import CAP, cycle_payouts
+from CrashRound import step_grid
+from GameMath import CASHOUT_HIGH, CASHOUT_LOW, MODES, STEP, VARIANTS, calculate_fireproof_cost, crash_points
+from ParamSweep import PARSERS
+
+# Config keys that shape the raw draws themselves: a rule may change any other key
+DRAW_KEYS = ("crash_scale", "threshold_scale", "crash_cap", "meta_prob", "meta_range")
+CRASH_RULE = {"rtp": 97.0, "cap": CAP}  # GameStats.py's defaults
+
+
+def knight_draws(config, rtp, rounds, rng):
+    """
+    Rule-independent draws of `rounds` rounds of a Knight mode: the cashout
+    target, whether it was reached, and the count, sum and product of the
+    metas collected on the way (initial metas are the rule's). Rounds that
+    crash keep their metas too, so a rule can only change what a hit pays.
+    """
+    cashout = CASHOUT_LOW + (CASHOUT_HIGH - CASHOUT_LOW) * rng.random(rounds)
+    crash = crash_points(rng.random(rounds), rtp, config)
+    grid = step_grid(STEP)
+    steps = grid.indexes(np.minimum(cashout, crash))
+    counts = rng.binomial(steps, config["meta_prob"]) if config["meta_prob"] else np.zeros(rounds, dtype=np.int64)
+
+    # Every round's metas in one array, round after round
+    lo, hi = config["meta_range"]
+    values = rng.integers(lo, hi + 1, int(counts.sum())).astype(float)
+    meta_sum = np.zeros(rounds)
+    meta_product = np.ones(rounds)
+    held = np.flatnonzero(counts)
+    if len(held):
+        starts = (np.cumsum(counts) - counts)[held]
+        meta_sum[held] = np.add.reduceat(values, starts)
+        meta_product[held] = np.multiply.reduceat(values, starts)
+    return {"game": "knight", "rtp": rtp, "model": {key: config[key] for key in DRAW_KEYS}, "cashout": cashout,
+            "hit": grid.values(steps) < crash, "meta_count": counts, "meta_sum": meta_sum,
+            "meta_product": meta_product}
+
+
+def crash_draws(rounds, rng):
+    """Rule-independent draws of `rounds` GameStats.py cycles: the player's choices and the crash uniform."""
+    draws = rng.random((7, rounds))
+    M = 1.1 + 8.9 * draws[0]
+    return {"game": "crash", "M": M, "send_multiplier": np.where(draws[1] < 0.5, 1.1 + (M - 1.1) * draws[2], 0.0),
+            "send_fraction": draws[3], "M_f": np.where(draws[4] < 0.5, 1.1 + 1.9 * draws[5], 0.0), "u": draws[6]}
+
+
+def knight_payouts(draws, rule, base_bet=1.0):
+    """Each round's (spent, payout, max win) under a mode config; its DRAW_KEYS must be the draws'."""
+    model = draws["model"]
+    changed = [key for key in DRAW_KEYS if tuple(np.atleast_1d(rule[key])) != tuple(np.atleast_1d(model[key]))]
+    if changed:
+        raise ValueError(f"The rule's {', '.join(changed)} differ from the draws' (they depend on them)")
+    initial = rule["initial_metas"]
+    held = draws["meta_count"] + len(initial) > 0
+    if rule["meta_rule"] == "sum":
+        total = np.where(held, (draws["meta_sum"] + sum(initial)) / rule["meta_divisor"], 1.0)
+    else:
+        total = draws["meta_product"] * math.prod(initial)
+    bet = base_bet * rule["bet_multiplier"]
+    raw = np.where(draws["hit"], bet * draws["cashout"] * total, 0.0)
+    cap = math.inf if rule["cap"] is None else base_bet * rule["cap"]
+    return np.full(len(raw), bet), np.minimum(raw, cap), raw >= cap
+
+
+def crash_payouts(draws, rule, bet=1.0):
+    """Each cycle's (spent, payout, max win) under a {"rtp", "cap"} rule."""
+    payout = cycle_payouts(draws["M"], draws["send_multiplier"], draws["send_fraction"], draws["M_f"],
+                           crash_points(draws["u"], rule["rtp"]), bet, rule["cap"])
+    used = draws["M_f"] > 0
+    spent = bet + np.where(used, calculate_fireproof_cost(bet, np.where(used, draws["M_f"], 1.0), rule["rtp"]), 0.0)
+    return spent, payout, payout >= rule["cap"] * bet
+
+
+def rule_payouts(draws, rule, base_bet=1.0):
+    return (knight_payouts if draws["game"] == "knight" else crash_payouts)(draws, rule, base_bet)
+
+
+def paired_difference(base, alt, z=1.96):
+    """
+    RTP and max-win rate of two rules evaluated on the same draws, and their
+    differences with z-intervals. RTP is a ratio of sums, so its standard
+    errors come from the linearized per-round terms (payout - RTP x spent) /
+    mean spent. Pairing cancels the noise both rules share; "independent_se"
+    is what the difference's standard error would be with fresh draws for
+    each rule.
+    """
+    n = len(base[0])
+    result = {"rounds": n}
+    terms = []
+    for name, (spent, payout, max_win) in (("base", base), ("alt", alt)):
+        rtp = payout.sum() / spent.sum()
+        terms.append((payout - rtp * spent) / spent.mean())
+        result[f"rtp_{name}"] = rtp * 100
+        result[f"max_win_rate_{name}"] = max_win.mean() * 100
+    for metric, a, b in (("rtp", terms[1], terms[0]), ("max_win_rate", alt[2] * 1.0, base[2] * 1.0)):
+        diff = result[f"{metric}_alt"] - result[f"{metric}_base"]
+        se = np.std(a - b, ddof=1) / math.sqrt(n) * 100
+        independent = math.sqrt((np.var(a, ddof=1) + np.var(b, ddof=1)) / n) * 100
+        result[metric] = {"diff": diff, "ci": (diff - z * se, diff + z * se), "se": se, "independent_se": independent,
+                          "variance_ratio": (independent / se) ** 2 if se else (math.inf if independent else 1.0)}
+    return result
+
+
+def what_if(draws, base, rules, base_bet=1.0, z=1.96):
+    """paired_difference of every rule against the base rule on the same draws."""
+    base_rounds = rule_payouts(draws, base, base_bet)
+    return [paired_difference(base_rounds, rule_payouts(draws, rule, base_bet), z) for rule in rules]
+
+
+def save_draws(draws, path):
+    """Store the draws (uncompressed .npz) to evaluate more rules later without redrawing."""
+    arrays = {key: value for key, value in draws.items() if isinstance(value, np.ndarray)}
+    header = {key: value for key, value in draws.items() if key not in arrays}
+    np.savez(path, header=np.array(json.dumps(header)), **arrays)
+
+
+def load_draws(path):
+    with np.load(path) as data:
+        draws = json.loads(str(data["header"]))
+        draws.update({key: data[key] for key in data.files if key != "header"})
+    return draws
+
+
+def parse_rule(text):
+    """Parse "key=value,key=value" (values written as for ParamSweep's grid) into overrides."""
+    rule = {}
+    for part in text.split(","):
+        key, _, value = part.partition("=")
+        key = key.strip()
+        if key not in PARSERS or key == "mode":
+            raise argparse.ArgumentTypeError(f"Unknown rule parameter {key!r}")
+        try:
+            rule[key] = PARSERS[key](value.strip())
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"Bad value {value!r} for {key}") from None
+    return rule
+
+
+def describe(overrides):
+    return ", ".join(f"{key}={value}" for key, value in overrides.items()) or "baseline"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Compare payout rules on one set of stored draws (paired RTP and max-win differences).",
+        epilog='example: knight --mode "Additional MAX" --rule "cap=20000" --rule "meta_rule=sum,meta_divisor=150"')
+    parser.add_argument("game", choices=["knight", "crash"])
+    parser.add_argument("--variant", choices=list(VARIANTS), default="KnightStats")
+    parser.add_argument("--mode", choices=MODES, default="Additional")
+    parser.add_argument("--rtp", type=float, help="RTP the draws are made at (95 for knight, 97 for crash)")
+    parser.add_argument("--bet", type=float, default=1.0, help="(base) bet")
+    parser.add_argument("--rounds", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rule", type=parse_rule, action="append", default=[],
+                        help="alternative rule: overrides of the baseline, key=value,... (repeatable)")
+    parser.add_argument("--save", help="store the draws in this .npz file")
+    parser.add_argument("--load", help="use the draws stored in this .npz file instead of drawing")
+    args = parser.parse_args(argv)
+
+    if args.game == "knight":
+        base = VARIANTS[args.variant][args.mode]
+    else:
+        base = dict(CRASH_RULE, rtp=args.rtp if args.rtp is not None else CRASH_RULE["rtp"])
+    for overrides in args.rule:
+        unknown = [key for key in overrides if key not in base]
+        if unknown:
+            parser.error(f"A {args.game} rule can't set {', '.join(unknown)} (expected some of {', '.join(base)})")
+
+    rng = np.random.default_rng(args.seed)
+    if args.load:
+        draws = load_draws(args.load)
+        if draws["game"] != args.game:
+            parser.error(f"{args.load} holds {draws['game']} draws")
+        # Knight draws are made at an RTP; a crash rule sets its own
+        if "rtp" in draws and args.rtp is not None and args.rtp != draws["rtp"]:
+            parser.error(f"{args.load} holds draws made at RTP {draws['rtp']}%, not {args.rtp}%")
+    elif args.game == "knight":
+        draws = knight_draws(base, args.rtp if args.rtp is not None else 95.0, args.rounds, rng)
+    else:
+        draws = crash_draws(args.rounds, rng)
+    if args.save:
+        save_draws(draws, args.save)
+
+    rules = [dict(base, **overrides) for overrides in args.rule]
+    try:
+        results = what_if(draws, base, rules, args.bet)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"{len(draws['u' if args.game == 'crash' else 'cashout']):,} shared rounds; baseline "
+          + (f"{args.variant} {args.mode} at RTP {draws['rtp']}%" if args.game == "knight" else f"RTP {base['rtp']}%, cap {base['cap']}x"))
+    for overrides, r in zip(args.rule, results):
+        print(f"\n{describe(overrides)}:")
+        for metric, label in (("rtp", "RTP"), ("max_win_rate", "Max win rate")):
+            d = r[metric]
+            print(f"  {label}: {r[metric + '_base']:.4f}% -> {r[metric + '_alt']:.4f}%, "
+                  f"diff {d['diff']:+.4f} [{d['ci'][0]:+.4f}, {d['ci'][1]:+.4f}], "
+                  f"SE {d['se']:.4f} vs {d['independent_se']:.4f} independent ({d['variance_ratio']:.1f}x variance)")
+
+
+if __name__ == "__main__":
+    main()
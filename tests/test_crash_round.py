@@ -0,0 +1,41 @@
+import random
+
+import pytest
+
+from CrashRound import resolve_round, step_grid
+from ThresholdIndex import naive_scan, random_bets
+
+
+def loop_grid(limit, step=0.01):
+    """Every multiplier Game.py's loop visits below limit."""
+    values = []
+    multiplier = 1.00
+    while multiplier < limit:
+        values.append(multiplier)
+        multiplier += step
+    return values
+
+
+@pytest.mark.parametrize("step", [0.01, 0.1])
+def test_grid_matches_the_float_loop(step):
+    grid = step_grid(step)
+    for k, multiplier in enumerate(loop_grid(60, step)):
+        assert grid.value(k) == multiplier
+        assert grid.index(multiplier) == k
+
+
+def test_resolve_round_matches_the_step_loop():
+    rng = random.Random(1)
+    for bet in random_bets(2000, seed=2):
+        C = round(1 + rng.expovariate(1 / 2), 2) if rng.random() < 0.5 else 1 + rng.expovariate(1 / 2)
+        assert resolve_round(*bet, C)["winnings"] == naive_scan([bet], C)[0]
+
+
+def test_resolve_round_event_order():
+    result = resolve_round(10, 3.0, 2.0, 50, 1.5, C=4.0)
+    assert [kind for kind, _, _ in result["events"]] == ["fireproof", "send", "cashout"]
+    assert result["cashed_out"] and result["remaining_bet"] == 5
+
+    crashed = resolve_round(10, 3.0, 2.0, 50, 0, C=2.5)
+    assert crashed["events"][-1] == ("crash", 2.5, 5)
+    assert not crashed["cashed_out"]
@@ -0,0 +1,25 @@
+import math
+
+import numpy as np
+import pytest
+
+from GameMath import MODES, VARIANTS, compile_mode
+from KnightAnalytic import analyze_mode
+
+ROUNDS = 400_000
+
+
+@pytest.mark.parametrize("variant", list(VARIANTS))
+@pytest.mark.parametrize("mode", MODES)
+def test_analytic_moments_match_play_batch(variant, mode):
+    config = VARIANTS[variant][mode]
+    exact = analyze_mode(config, 95.0)
+    rounds = compile_mode(config, 95.0).play_batch(1.0, ROUNDS, np.random.default_rng(5))
+    payout = rounds["payout"]
+
+    # Five standard errors either way
+    assert payout.mean() == pytest.approx(exact["mean"], abs=5 * exact["sd"] / math.sqrt(ROUNDS))
+    p = exact["hit_rate"] / 100
+    assert rounds["hit"].mean() == pytest.approx(p, abs=5 * math.sqrt(p * (1 - p) / ROUNDS))
+    q = exact["max_win_rate"] / 100
+    assert rounds["max_win"].mean() == pytest.approx(q, abs=5 * math.sqrt(q * (1 - q) / ROUNDS) + 1e-6)
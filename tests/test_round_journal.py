@@ -0,0 +1,64 @@
+import pytest
+
+from CrashRound import resolve_round
+from FairRNG import FairRandom, server_seed_from_int
+from GameMath import generate_crash_point
+from RoundJournal import SEEDS_SUFFIX, append_round, open_journal, read_round, replay_crash_round
+
+BETS = [(1.0, 2.0, 0, 0, 0), (5.0, 1.5, 1.2, 40, 0), (2.0, 3.0, 0, 0, 1.1), (1.0, 40.0, 2.0, 50, 1.3)]
+
+
+def play(server_seed, round_index, bet, rtp=97.0):
+    C = generate_crash_point(rtp, FairRandom(server_seed, round_index))
+    return resolve_round(*bet, C)["winnings"]
+
+
+def write_rounds(path):
+    seeds = [server_seed_from_int(1), server_seed_from_int(2)]
+    rounds = []
+    with open_journal(path, "crash") as journal:
+        for i in range(40):
+            seed, bet = seeds[i // 20], BETS[i % len(BETS)]
+            fields = (i, 97.0, *bet, play(seed, i, bet))
+            assert append_round(journal, seed, *fields) == i
+            rounds.append((seed, *fields))
+    return rounds
+
+
+def test_seek_reads_every_round(tmp_path):
+    path = str(tmp_path / "journal.bin")
+    rounds = write_rounds(path)
+    assert (tmp_path / ("journal.bin" + SEEDS_SUFFIX)).stat().st_size == 2 * 32
+    with open_journal(path, "crash") as journal:
+        assert len(journal) == len(rounds)
+        for index in [39, 0, 21, 20, 7]:
+            assert read_round(journal, index) == rounds[index]
+        with pytest.raises(IndexError):
+            read_round(journal, len(rounds))
+
+
+def test_replay_matches_recorded_winnings(tmp_path):
+    path = str(tmp_path / "journal.bin")
+    rounds = write_rounds(path)
+    with open_journal(path, "crash") as journal:
+        for index in range(len(rounds)):
+            replay = replay_crash_round(journal, index)
+            assert replay["matches"]
+            assert replay["winnings"] == rounds[index][-1]
+
+
+def test_reopening_appends_after_existing_rounds(tmp_path):
+    path = str(tmp_path / "journal.bin")
+    rounds = write_rounds(path)
+    seed = server_seed_from_int(3)
+    with open_journal(path, "crash") as journal:
+        assert append_round(journal, seed, 99, 97.0, *BETS[0], 0.0) == len(rounds)
+        assert read_round(journal, 0) == rounds[0]
+        assert read_round(journal, len(rounds))[0] == seed
+
+
+def test_rejects_another_game(tmp_path):
+    path = str(tmp_path / "journal.bin")
+    write_rounds(path)
+    with pytest.raises(ValueError):
+        open_journal(path, "ascent")
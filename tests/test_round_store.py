@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from RoundStore import COLUMNS, RoundWriter, merge_stores, open_store, store_stats
+from StreamStats import stats_from_payouts, summarize
+
+
+def random_rounds(n, seed):
+    rng = np.random.default_rng(seed)
+    hit = rng.random(n) < 0.4
+    return {
+        "round": np.arange(n, dtype=np.uint64),
+        "bet": np.full(n, 2.0),
+        "payout": np.where(hit, rng.random(n) * 10, 0.0),
+        "crash_point": 1 + rng.pareto(1.0, n),
+        "cashout": rng.uniform(1.1, 50, n),
+        "meta_total": np.ones(n),
+        "meta_count": rng.integers(0, 5, n).astype(np.uint16),
+        "hit": hit,
+        "max_win": np.zeros(n, dtype=bool),
+    }
+
+
+def test_columns_round_trip(tmp_path):
+    path = str(tmp_path / "rounds.gcrs")
+    normal = random_rounds(1000, 1)
+    extra = random_rounds(37, 2)
+    with RoundWriter(path, meta={"base_bet": 1.0}, chunk_rows=256) as writer:
+        writer.append("Normal", normal)
+        for i in range(37):
+            writer.add_round("Additional", *(extra[name][i] for name in
+                                              ["round", "bet", "payout", "hit", "max_win", "crash_point", "cashout",
+                                               "meta_count", "meta_total"]))
+
+    with open_store(path) as store:
+        assert store.meta == {"base_bet": 1.0}
+        assert store.modes == ["Normal", "Additional"]
+        assert store.rows() == 1037 and store.rows("Normal") == 1000
+        assert len(store.index["Normal"]) == 4
+        for mode, rounds in [("Normal", normal), ("Additional", extra)]:
+            for name, dtype in COLUMNS:
+                column = store.column(name, mode)
+                assert column.dtype == dtype
+                assert np.array_equal(column, rounds[name])
+
+
+def test_store_stats_match_the_payouts(tmp_path):
+    path = str(tmp_path / "rounds.gcrs")
+    rounds = random_rounds(5000, 3)
+    with RoundWriter(path, chunk_rows=1000) as writer:
+        writer.append("Additional MAX", rounds)
+    with open_store(path) as store:
+        stats = summarize(store_stats(store))
+    expected = summarize(stats_from_payouts(rounds["payout"], 2.0))
+    for key, value in expected.items():
+        assert stats[key] == pytest.approx(value, rel=1e-9), key
+
+
+def test_merged_stores_keep_shard_order(tmp_path):
+    parts = []
+    for shard in range(3):
+        parts.append(str(tmp_path / f"part{shard}.gcrs"))
+        with RoundWriter(parts[-1], meta={"shard": shard}) as writer:
+            writer.append("Normal", random_rounds(100, shard))
+    merge_stores(parts, str(tmp_path / "all.gcrs"))
+    with open_store(str(tmp_path / "all.gcrs")) as store:
+        assert store.meta == {"shard": 0}
+        expected = np.concatenate([random_rounds(100, shard)["payout"] for shard in range(3)])
+        assert np.array_equal(store.column("payout"), expected)
+
+
+def test_unfinished_store_is_rejected(tmp_path):
+    path = tmp_path / "rounds.gcrs"
+    writer = RoundWriter(str(path))
+    writer.append("Normal", random_rounds(10, 4))
+    writer.file.flush()
+    with pytest.raises(ValueError):
+        open_store(str(path))
+    writer.close()
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from StreamStats import add_round, merge_all, new_stats, stats_from_payouts, summarize
+
+
+def payouts(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.where(rng.random(n) < 0.3, rng.pareto(2.5, n) * 3, 0.0)
+
+
+def numpy_moments(x):
+    centered = x - x.mean()
+    m2 = (centered ** 2).mean()
+    return {
+        "mean": x.mean(),
+        "variance": x.var(ddof=1),
+        "skewness": (centered ** 3).mean() / m2 ** 1.5,
+        "kurtosis": (centered ** 4).mean() / m2 ** 2 - 3,
+    }
+
+
+def assert_matches(s, x):
+    r = summarize(s)
+    for key, value in numpy_moments(x).items():
+        assert r[key] == pytest.approx(value, rel=1e-9), key
+    assert r["rounds"] == len(x)
+    assert r["min"] == x.min() and r["max"] == x.max()
+    assert r["hit_rate"] == pytest.approx(np.count_nonzero(x > 0) / len(x) * 100)
+
+
+def test_add_round_matches_numpy():
+    x = payouts(5000)
+    s = new_stats()
+    for payout in x:
+        add_round(s, 1.0, payout, payout > 0)
+    assert_matches(s, x)
+
+
+def test_stats_from_payouts_matches_numpy():
+    x = payouts(100_000, seed=1)
+    assert_matches(stats_from_payouts(x, 1.0), x)
+
+
+@pytest.mark.parametrize("sizes", [[1, 1], [10, 90_000], [33_333, 1, 66_666], [0, 500, 0, 7]])
+def test_merge_matches_one_pass(sizes):
+    x = payouts(sum(sizes), seed=2)
+    parts = np.split(x, np.cumsum(sizes)[:-1])
+    merged = merge_all(stats_from_payouts(part, 1.0) for part in parts)
+    assert_matches(merged, x)
+    assert merged["total_winnings"] == pytest.approx(x.sum())
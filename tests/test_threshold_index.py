@@ -0,0 +1,36 @@
+import pytest
+
+from ThresholdIndex import ArrayThresholdIndex, naive_scan, random_bets
+
+
+def indexed(bets):
+    index = ArrayThresholdIndex()
+    index.add_bets(range(len(bets)), *zip(*bets))
+    index.start()
+    return index
+
+
+@pytest.mark.parametrize("C", [1.0, 1.37, 2.0, 5.0, 12.34])
+def test_settle_matches_the_naive_scan(C):
+    bets = random_bets(3000, seed=3)
+    assert indexed(bets).settle(C)["winnings"].tolist() == naive_scan(bets, C)
+
+
+def test_advance_fires_every_event_once():
+    bets = random_bets(500, seed=4)
+    index = indexed(bets)
+    C = 4.0
+    winnings = [0.0] * len(bets)
+    crash_tick = index.crash_tick(C)
+    for tick in range(0, crash_tick, 7):
+        for number, _, _, amount in zip(*index.advance(min(tick + 6, crash_tick - 1))):
+            winnings[number] += amount
+    assert winnings == pytest.approx(naive_scan(bets, C))
+    lost = index.crash(C)[0]
+    assert lost.tolist() == [number for number, out in enumerate(index.settle(C)["cashed_out"]) if not out]
+
+
+def test_no_bets_after_start():
+    index = indexed(random_bets(3))
+    with pytest.raises(RuntimeError):
+        index.add_bet("late", 1.0, 2.0)